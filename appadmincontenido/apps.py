@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppadmincontenidoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appadmincontenido'
+
+    def ready(self):
+        import appadmincontenido.signals
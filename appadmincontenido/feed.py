@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.db.models import CharField, Value
+
+from .models import Articulo, Noticia, Reportaje
+
+# Claves usadas en los filtros (?tipo=) y en las filas del feed
+TIPOS_CONTENIDO = {
+    "articulo": Articulo,
+    "noticia": Noticia,
+    "reportaje": Reportaje,
+}
+
+# Contenido reciente cacheado: se guardan los N más recientes y se invalida con señales
+CLAVE_CONTENIDO_RECIENTE = "appadmincontenido:contenido_reciente"
+MAX_CONTENIDO_RECIENTE = 12
+# Con caché local por proceso la invalidación solo alcanza al worker que guardó;
+# el timeout acota cuánto puede quedar desactualizado el resto
+TIMEOUT_CONTENIDO_RECIENTE = 600
+
+# Orden total del feed: el tipo desempata filas de distintas tablas con igual fecha e id
+ORDEN_FEED = ("-publicado_en", "-id", "-tipo")
+
+
+def feed_contenido(tipo="", categoria=None, condicion=None, orden=ORDEN_FEED):
+    """
+    Feed unificado de Artículos, Noticias y Reportajes resuelto en la base de datos.
+
+    Retorna un queryset UNION ALL con filas {"tipo", "id", "publicado_en"} ordenadas
+    de la más reciente a la más antigua, de modo que el filtrado por tipo y categoría,
+    el orden y el LIMIT de la paginación se ejecutan en SQL. `categoria` es una
+    Categoria (o su pk): el filtro cruza solo la tabla intermedia del M2M, por su
+    índice, sin unir la tabla de categorías. `condicion` (un Q sobre esas columnas)
+    se aplica a cada parte del UNION; la usa la paginación por cursor.
+    """
+    if tipo in TIPOS_CONTENIDO:
+        modelos = {tipo: TIPOS_CONTENIDO[tipo]}
+    else:
+        modelos = TIPOS_CONTENIDO
+
+    partes = []
+    for clave, modelo in modelos.items():
+        qs = modelo.objects.all()
+        if categoria is not None:
+            qs = qs.filter(categorias=categoria)
+        qs = qs.annotate(tipo=Value(clave, output_field=CharField()))
+        if condicion is not None:
+            qs = qs.filter(condicion)
+        partes.append(qs.values("tipo", "id", "publicado_en").order_by())
+
+    feed = partes[0].union(*partes[1:], all=True) if len(partes) > 1 else partes[0]
+    return feed.order_by(*orden)
+
+
+def cargar_contenido(filas):
+    """
+    Convierte filas del feed en instancias de su modelo, conservando el orden.
+    Hace una consulta por tipo presente en las filas (más el prefetch de categorías).
+    """
+    ids_por_tipo = {}
+    for fila in filas:
+        ids_por_tipo.setdefault(fila["tipo"], []).append(fila["id"])
+
+    instancias = {}
+    for clave, ids in ids_por_tipo.items():
+        modelo = TIPOS_CONTENIDO[clave]
+        for obj in modelo.objects.filter(pk__in=ids).prefetch_related("categorias"):
+            instancias[(clave, obj.pk)] = obj
+
+    return [instancias[(f["tipo"], f["id"])] for f in filas if (f["tipo"], f["id"]) in instancias]
+
+
+def _ultimos_por_tipo(n):
+    # A lo sumo n filas por tipo: el top-n global está necesariamente entre ellas
+    candidatos = []
+    for modelo in TIPOS_CONTENIDO.values():
+        candidatos.extend(modelo.objects.order_by("-publicado_en", "-id")[:n])
+    candidatos.sort(key=lambda x: x.publicado_en, reverse=True)
+    return candidatos[:n]
+
+
+def contenido_reciente(n=3):
+    """
+    Los n contenidos más recientes entre Artículos, Noticias y Reportajes.
+    Se leen desde caché; en un fallo se consultan a lo sumo n filas por tipo.
+    """
+    if n > MAX_CONTENIDO_RECIENTE:
+        return _ultimos_por_tipo(n)
+
+    contenido = cache.get(CLAVE_CONTENIDO_RECIENTE)
+    if contenido is None:
+        contenido = _ultimos_por_tipo(MAX_CONTENIDO_RECIENTE)
+        cache.set(CLAVE_CONTENIDO_RECIENTE, contenido, TIMEOUT_CONTENIDO_RECIENTE)
+    return contenido[:n]
+
+
+def invalidar_contenido_reciente():
+    cache.delete(CLAVE_CONTENIDO_RECIENTE)
@@ -0,0 +1,44 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from descubrecurico.cache_publico import invalidar_paginas, CONTENIDO, EVENTOS
+from .feed import invalidar_contenido_reciente
+from .models import (
+    Actividad, Articulo, Categoria, Evento, Noticia, Reportaje,
+    BloqueArticulo, BloqueNoticia, BloqueReportaje,
+)
+
+
+@receiver([post_save, post_delete], sender=Articulo)
+@receiver([post_save, post_delete], sender=Noticia)
+@receiver([post_save, post_delete], sender=Reportaje)
+def invalidar_cache_contenido(sender, instance, **kwargs):
+    """
+    Señal que descarta el contenido reciente cacheado y las páginas públicas de
+    contenido al crear, editar o eliminar un Artículo, Noticia o Reportaje
+    """
+    invalidar_contenido_reciente()
+    invalidar_paginas(CONTENIDO)
+
+
+@receiver(m2m_changed, sender=Articulo.categorias.through)
+@receiver(m2m_changed, sender=Noticia.categorias.through)
+@receiver(m2m_changed, sender=Reportaje.categorias.through)
+@receiver([post_save, post_delete], sender=Categoria)
+def invalidar_cache_categorias(sender, **kwargs):
+    """Las categorías se muestran en el listado y en su filtro"""
+    invalidar_paginas(CONTENIDO)
+
+
+@receiver([post_save, post_delete], sender=BloqueArticulo)
+@receiver([post_save, post_delete], sender=BloqueNoticia)
+@receiver([post_save, post_delete], sender=BloqueReportaje)
+def invalidar_cache_bloques(sender, **kwargs):
+    """Los bloques se muestran en el detalle y no cambian actualizado_en de su publicación"""
+    invalidar_paginas(CONTENIDO)
+
+
+@receiver([post_save, post_delete], sender=Evento)
+@receiver([post_save, post_delete], sender=Actividad)
+def invalidar_cache_eventos(sender, instance, **kwargs):
+    invalidar_paginas(EVENTOS)
@@ -1,3 +1,160 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .feed import cargar_contenido, contenido_reciente, feed_contenido
+from .models import Articulo, BloqueArticulo, Categoria, Noticia, Reportaje
+
+
+class ListadoArticulosConsultasTests(TestCase):
+    """El listado de contenido debe costar un número fijo de consultas."""
+
+    # categorías + UNION del feed + (contenido + prefetch de categorías) por cada tipo
+    CONSULTAS_LISTADO = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def crear_contenido(self, cantidad, categorias):
+        ahora = timezone.now()
+        for i in range(cantidad):
+            for modelo in (Articulo, Noticia, Reportaje):
+                post = modelo.objects.create(
+                    titulo=f"{modelo.__name__} {i}",
+                    publicado_en=ahora - timedelta(hours=i),
+                )
+                post.categorias.add(*categorias[i % len(categorias):][:2])
+
+    def assertConsultasListado(self, parametros):
+        url = reverse("appadmincontenido:articulos")
+        with self.assertNumQueries(self.CONSULTAS_LISTADO):
+            respuesta = self.client.get(url, parametros)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_consultas_no_dependen_de_la_cantidad_de_contenido(self):
+        categorias = [Categoria.objects.create(nombre=f"Categoría {i}") for i in range(6)]
+        for cantidad in (2, 40):
+            with self.subTest(cantidad=cantidad):
+                self.crear_contenido(cantidad, categorias)
+                self.assertConsultasListado({})
+                self.assertConsultasListado({"categoria": categorias[0].slug})
+
+    def test_filtro_por_categoria_y_tipo(self):
+        vinos = Categoria.objects.create(nombre="Vinos")
+        cultura = Categoria.objects.create(nombre="Cultura")
+        self.crear_contenido(4, [vinos, cultura])
+
+        respuesta = self.client.get(
+            reverse("appadmincontenido:articulos"), {"categoria": vinos.slug, "tipo": "noticia"}
+        )
+
+        contenido = list(respuesta.context["page_obj"])
+        self.assertTrue(contenido)
+        for post in contenido:
+            self.assertIsInstance(post, Noticia)
+            self.assertIn(vinos, post.categorias.all())
+
+    def test_categoria_inexistente_no_consulta_el_feed(self):
+        self.crear_contenido(3, [Categoria.objects.create(nombre="Vinos")])
+
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(reverse("appadmincontenido:articulos"), {"categoria": "no-existe"})
+
+        self.assertEqual(len(respuesta.context["page_obj"]), 0)
+
+    def test_cursor_con_valores_de_otro_tipo_vuelve_a_la_primera_pagina(self):
+        self.crear_contenido(2, [Categoria.objects.create(nombre="Vinos")])
+        url = reverse("appadmincontenido:articulos")
+        primera = [post.pk for post in self.client.get(url).context["page_obj"]]
+
+        for valores in (["x", 1, "a"], ["2024-01-01T00:00:00+00:00", "a", "articulo"], [None, [], {}]):
+            with self.subTest(valores=valores):
+                token = base64.urlsafe_b64encode(json.dumps(["next", valores]).encode()).decode()
+                respuesta = self.client.get(url, {"cursor": token})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual([post.pk for post in respuesta.context["page_obj"]], primera)
+
+
+class DetalleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Vinos")
+        self.articulo = Articulo.objects.create(titulo="Vendimia", publicado_en=timezone.now())
+        self.articulo.categorias.add(self.categoria)
+        self.bloque = BloqueArticulo.objects.create(articulo=self.articulo, texto="Texto original")
+
+    def detalle(self):
+        return self.client.get(self.articulo.get_absolute_url()).content.decode()
+
+    def test_editar_categoria_o_bloque_renueva_el_fragmento(self):
+        self.assertIn("Texto original", self.detalle())
+
+        self.categoria.nombre = "Vinos y Cepas"
+        self.categoria.save()
+        self.assertIn("Vinos y Cepas", self.detalle())
+
+        self.bloque.texto = "Texto corregido"
+        self.bloque.save()
+        html = self.detalle()
+        self.assertIn("Texto corregido", html)
+        self.assertNotIn("Texto original", html)
+
+
+class FeedContenidoTests(TestCase):
+    """El feed mezcla los tres tipos en un solo orden por fecha, resuelto en la base."""
+
+    def setUp(self):
+        ahora = timezone.now()
+        self.vinos = Categoria.objects.create(nombre="Vinos")
+        self.esperado = []
+        # Fechas intercaladas entre tipos: el orden no puede salir de recorrer tabla por tabla
+        for horas, modelo in enumerate((Noticia, Articulo, Reportaje, Articulo, Noticia)):
+            post = modelo.objects.create(titulo=f"{modelo.__name__} {horas}", publicado_en=ahora - timedelta(hours=horas))
+            if horas % 2 == 0:
+                post.categorias.add(self.vinos)
+            self.esperado.append(post)
+
+    def test_orden_global_por_fecha(self):
+        with self.assertNumQueries(1):
+            filas = list(feed_contenido())
+        self.assertEqual([(fila["tipo"], fila["id"]) for fila in filas],
+                         [(post._meta.model_name, post.pk) for post in self.esperado])
+        self.assertEqual(cargar_contenido(filas), self.esperado)
+
+    def test_filtros_por_tipo_y_categoria(self):
+        self.assertEqual(
+            [fila["id"] for fila in feed_contenido("articulo")],
+            [post.pk for post in self.esperado if isinstance(post, Articulo)],
+        )
+        self.assertEqual(
+            cargar_contenido(feed_contenido(categoria=self.vinos)), self.esperado[::2]
+        )
+
+
+class ContenidoRecienteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ahora = timezone.now()
+        self.posts = [
+            modelo.objects.create(titulo=f"{modelo.__name__} {i}", publicado_en=ahora - timedelta(hours=i))
+            for i, modelo in enumerate((Reportaje, Articulo, Noticia, Noticia, Articulo))
+        ]
+
+    def test_top_n_entre_tipos_desde_cache(self):
+        self.assertEqual(contenido_reciente(3), self.posts[:3])
+        with self.assertNumQueries(0):
+            self.assertEqual(contenido_reciente(2), self.posts[:2])
+
+    def test_guardar_invalida(self):
+        contenido_reciente(3)
+        nuevo = Noticia.objects.create(titulo="Última hora", publicado_en=timezone.now())
+        self.assertEqual(contenido_reciente(1), [nuevo])
 
-# Create your tests here.
+    def test_home_muestra_lo_mas_reciente(self):
+        respuesta = self.client.get(reverse("home"))
+        self.assertEqual(respuesta.context["contenido_destacado"], self.posts[:3])
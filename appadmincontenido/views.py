@@ -1,8 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
+from descubrecurico.cache_publico import cache_publico, version, CONTENIDO, EVENTOS
+from descubrecurico.paginacion import CursorPaginator, PaginaCursor
 from django.contrib import messages
 from applogin.decorators import solo_admin, solo_socio
 from .models import Evento, Articulo, Categoria, Actividad, Noticia, Reportaje, BloqueArticulo, BloqueNoticia, BloqueReportaje
+from .feed import ORDEN_FEED, feed_contenido, cargar_contenido
 from .forms import (
     ArticuloForm, 
     BloqueArticuloFormSet, 
@@ -14,32 +16,27 @@ from .forms import (
 from django.utils import timezone
 from django.utils.text import slugify
 
+@cache_publico(CONTENIDO)
 def articulos(request):
-    articulos_qs = Articulo.objects.prefetch_related("categorias")
-    noticias_qs = Noticia.objects.prefetch_related("categorias")
-    reportajes_qs = Reportaje.objects.prefetch_related("categorias")
-    
-    todos = list(articulos_qs) + list(noticias_qs) + list(reportajes_qs)
-    
     tipo_filter = request.GET.get('tipo', '')
-    if tipo_filter == 'articulo':
-        todos = [a for a in todos if a.__class__.__name__ == 'Articulo']
-    elif tipo_filter == 'noticia':
-        todos = [a for a in todos if a.__class__.__name__ == 'Noticia']
-    elif tipo_filter == 'reportaje':
-        todos = [a for a in todos if a.__class__.__name__ == 'Reportaje']
-    
     categoria_filter = request.GET.get('categoria', '')
-    if categoria_filter:
-        todos = [a for a in todos if a.categorias.filter(slug=categoria_filter).exists()]
-    
-    todos.sort(key=lambda x: x.publicado_en, reverse=True)
-    
-    paginator = Paginator(todos, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    
-    categorias = Categoria.objects.all().order_by("nombre")
+
+    # La lista de categorías se necesita para el filtro; se reutiliza para resolver
+    # el slug sin otra consulta
+    categorias = list(Categoria.objects.all().order_by("nombre"))
+    categoria = next((c for c in categorias if c.slug == categoria_filter), None)
+
+    if categoria_filter and categoria is None:
+        page_obj = PaginaCursor([])
+    else:
+        # El filtrado, el orden y el LIMIT se resuelven en la base de datos; la página
+        # se ubica por cursor (publicado_en, id) en vez de OFFSET
+        paginator = CursorPaginator(ORDEN_FEED, por_pagina=12)
+        page_obj = paginator.get_page(
+            lambda condicion, orden: feed_contenido(tipo_filter, categoria, condicion, orden),
+            request.GET.get("cursor"),
+        )
+        page_obj.object_list = cargar_contenido(page_obj.object_list)
     
     return render(request, 'appadmincontenido/articulos.html', {
         "page_obj": page_obj,
@@ -49,8 +46,9 @@ def articulos(request):
     })
 
 def articulo_detalle(request, slug):
+    # Categorías y bloques se leen dentro del fragmento cacheado de la plantilla
     articulo = get_object_or_404(
-        Articulo.objects.prefetch_related("categorias", "bloques", "comentarios"),
+        Articulo.objects.prefetch_related("comentarios"),
         slug=slug
     )
     if request.method == "POST":
@@ -63,13 +61,12 @@ def articulo_detalle(request, slug):
             return redirect(articulo.get_absolute_url())
     else:
         form = ComentarioForm()
-    return render(request, "appadmincontenido/articulo_detalle.html", {"articulo": articulo, "form": form})
+    return render(request, "appadmincontenido/articulo_detalle.html", {
+        "articulo": articulo, "form": form, "version_contenido": version(CONTENIDO),
+    })
 
 def noticia_detalle(request, slug):
-    noticia = get_object_or_404(
-        Noticia.objects.prefetch_related("categorias", "bloques"),
-        slug=slug
-    )
+    noticia = get_object_or_404(Noticia, slug=slug)
     if request.method == "POST":
         form = ComentarioForm(request.POST)
         if form.is_valid():
@@ -80,13 +77,12 @@ def noticia_detalle(request, slug):
             return redirect(noticia.get_absolute_url())
     else:
         form = ComentarioForm()
-    return render(request, "appadmincontenido/articulo_detalle.html", {"articulo": noticia, "form": form})
+    return render(request, "appadmincontenido/articulo_detalle.html", {
+        "articulo": noticia, "form": form, "version_contenido": version(CONTENIDO),
+    })
 
 def reportaje_detalle(request, slug):
-    reportaje = get_object_or_404(
-        Reportaje.objects.prefetch_related("categorias", "bloques"),
-        slug=slug
-    )
+    reportaje = get_object_or_404(Reportaje, slug=slug)
     if request.method == "POST":
         form = ComentarioForm(request.POST)
         if form.is_valid():
@@ -97,7 +93,9 @@ def reportaje_detalle(request, slug):
             return redirect(reportaje.get_absolute_url())
     else:
         form = ComentarioForm()
-    return render(request, "appadmincontenido/articulo_detalle.html", {"articulo": reportaje, "form": form})
+    return render(request, "appadmincontenido/articulo_detalle.html", {
+        "articulo": reportaje, "form": form, "version_contenido": version(CONTENIDO),
+    })
 
 def _get_formset_for_tipo(tipo):
     """Retorna el formset correcto según el tipo"""
@@ -209,6 +207,7 @@ def articulo_eliminar(request, slug, tipo):
         "tipo": tipo.capitalize(),
     })
 
+@cache_publico(EVENTOS)
 def eventos(request):
     now = timezone.now()
     
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppdashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appdashboard'
+
+    def ready(self):
+        import appdashboard.signals
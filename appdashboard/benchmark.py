@@ -0,0 +1,165 @@
+"""
+Harness de benchmarks de las vistas más usadas.
+
+Recorre cada escenario con el cliente de pruebas de Django y mide latencia (p50/p95),
+consultas SQL y memoria pico por vista. Lo usan el comando `benchmark` y los tests de
+presupuestos de consultas.
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from appadmincontenido.models import Articulo, Categoria, Noticia, Reportaje
+from applogin.models import Rol, UsuarioRol
+
+# Usuario administrador que crean los benchmarks
+USUARIO_BENCHMARK = "benchmark_admin"
+
+# Páginas que se avanzan con el cursor para medir una página profunda del listado
+PAGINAS_PROFUNDAS = 20
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal entre rangos."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def cliente_admin():
+    usuario, creado = User.objects.get_or_create(username=USUARIO_BENCHMARK)
+    if creado:
+        rol, _ = Rol.objects.get_or_create(nombre='admin', defaults={'descripcion': 'Administrador del sistema'})
+        UsuarioRol.objects.create(usuario=usuario, rol=rol)
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente
+
+
+def _cursor_profundo(cliente, url, parametros, paginas):
+    # Sigue el enlace "Siguiente" hasta la página pedida (o la última disponible)
+    cursor = None
+    for _ in range(paginas - 1):
+        # Una respuesta servida desde caché no trae contexto
+        cache.clear()
+        respuesta = cliente.get(url, {**parametros, **({'cursor': cursor} if cursor else {})})
+        pagina = respuesta.context['page_obj']
+        if not pagina.has_next():
+            break
+        cursor = pagina.next_token
+    return cursor
+
+
+def escenarios(clientes):
+    """
+    Lista de (nombre, cliente, url, parámetros GET) a medir. Las URLs que dependen de
+    los datos (slugs, categorías, cursores) se resuelven contra la base actual.
+    """
+    anonimo = clientes['anonimo']
+    articulos = reverse('appadmincontenido:articulos')
+    lista = [
+        ('home', anonimo, reverse('home'), {}),
+        ('articulos', anonimo, articulos, {}),
+        ('articulos?tipo=noticia', anonimo, articulos, {'tipo': 'noticia'}),
+    ]
+
+    categoria = Categoria.objects.order_by('pk').first()
+    if categoria:
+        lista.append(('articulos?categoria', anonimo, articulos, {'categoria': categoria.slug}))
+        lista.append(('articulos?categoria&tipo=reportaje', anonimo, articulos,
+                      {'categoria': categoria.slug, 'tipo': 'reportaje'}))
+
+    cursor = _cursor_profundo(anonimo, articulos, {}, PAGINAS_PROFUNDAS)
+    if cursor:
+        lista.append((f'articulos (página {PAGINAS_PROFUNDAS})', anonimo, articulos, {'cursor': cursor}))
+
+    lista += [
+        ('lista_empresas', anonimo, reverse('appsocios:lista_empresas'), {}),
+        ('eventos', anonimo, reverse('appadmincontenido:eventos'), {}),
+    ]
+
+    for modelo, nombre_url in (
+        (Articulo, 'appadmincontenido:articulo_detalle'),
+        (Noticia, 'appadmincontenido:noticia_detalle'),
+        (Reportaje, 'appadmincontenido:reportaje_detalle'),
+    ):
+        slug = modelo.objects.order_by('-publicado_en').values_list('slug', flat=True).first()
+        if slug:
+            lista.append((nombre_url.split(':')[1], anonimo, reverse(nombre_url, args=[slug]), {}))
+
+    lista.append(('lista_empresas_admin', clientes['admin'], reverse('appdashboard:lista_empresas_admin'), {}))
+    return lista
+
+
+def medir(cliente, url, parametros=None, repeticiones=20, limpiar_cache=True):
+    """
+    Ejecuta la petición `repeticiones` veces (más una de calentamiento) y retorna
+    latencias en ms, el número de consultas de la última ejecución, la memoria pico
+    en KiB de una ejecución adicional bajo tracemalloc y el código de estado.
+    """
+    parametros = parametros or {}
+
+    def pedir():
+        if limpiar_cache:
+            cache.clear()
+        respuesta = cliente.get(url, parametros)
+        if respuesta.streaming:
+            # Las consultas de una respuesta en streaming ocurren al recorrerla
+            b''.join(respuesta.streaming_content)
+        return respuesta
+
+    pedir()
+    tiempos = []
+    for _ in range(repeticiones):
+        # Con DEBUG activo el registro de consultas puede estar lleno (maxlen) y
+        # CaptureQueriesContext contaría cero
+        reset_queries()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = pedir()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        # Se cuenta enseguida: la siguiente petición vacía el registro de consultas
+        consultas = len(capturadas)
+
+    # La memoria se mide aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    try:
+        pedir()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': respuesta.status_code,
+        'p50_ms': round(percentil(tiempos, 50), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'media_ms': round(statistics.fmean(tiempos), 2),
+        'consultas': consultas,
+        'memoria_pico_kib': round(pico / 1024, 1),
+        'repeticiones': repeticiones,
+    }
+
+
+def ejecutar(repeticiones=20, limpiar_cache=True, filtro=None):
+    """Mide todos los escenarios y retorna {nombre: resultado de medir()}."""
+    clientes = {'anonimo': Client(), 'admin': cliente_admin()}
+    resultados = {}
+    for nombre, cliente, url, parametros in escenarios(clientes):
+        if filtro and filtro not in nombre:
+            continue
+        resultados[nombre] = {
+            'url': url,
+            **medir(cliente, url, parametros, repeticiones=repeticiones, limpiar_cache=limpiar_cache),
+        }
+    return resultados
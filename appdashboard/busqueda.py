@@ -0,0 +1,332 @@
+import operator
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import reduce
+
+from django.apps import apps as apps_globales
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.urls import reverse
+
+from .models import DocumentoBusqueda, TerminoBusqueda
+
+# Tipos de documento indexados
+EMPRESA = 'empresa'
+SOCIO = 'socio'
+ARTICULO = 'articulo'
+NOTICIA = 'noticia'
+REPORTAJE = 'reportaje'
+
+# Peso de cada campo en el puntaje: coincidir en el nombre pesa más que en el texto
+PESO_TITULO = 5
+PESO_DETALLE = 2
+PESO_TEXTO = 1
+
+MAX_TERMINOS_CONSULTA = 6
+LARGO_MAXIMO_TERMINO = 64
+
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los',
+    'para', 'por', 'que', 'se', 'su', 'sus', 'un', 'una', 'y', 'o',
+}
+
+# Los puntos y guiones de un RUT se eliminan para que "12.345.678-5" sea un solo término
+_SEPARADORES_RUT = re.compile(r'(?<=\d)[.\-](?=[\dk])')
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni diéresis, con los RUT compactados."""
+    texto = unicodedata.normalize('NFKD', texto or '').lower()
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _SEPARADORES_RUT.sub('', texto)
+
+
+def terminos(texto):
+    return [
+        termino[:LARGO_MAXIMO_TERMINO]
+        for termino in _NO_ALFANUMERICO.split(normalizar(texto))
+        if termino and termino not in PALABRAS_VACIAS
+    ]
+
+
+# --- Qué se indexa de cada modelo ---
+def _texto_bloques(publicacion):
+    return ' '.join(
+        ' '.join((b.subtitulo, b.texto, b.pie_de_foto)) for b in publicacion.bloques.all()
+    )
+
+
+def _documento_empresa(empresa):
+    return {
+        'titulo': empresa.nombre,
+        'detalle': empresa.direccion_completa or empresa.calle or '',
+        'url': '',
+        'campos': [
+            (empresa.nombre, PESO_TITULO),
+            (empresa.rut or '', PESO_TITULO),
+            (empresa.direccion_completa or '', PESO_DETALLE),
+            (empresa.calle or '', PESO_DETALLE),
+        ],
+    }
+
+
+def _documento_socio(socio):
+    nombre = f"{socio.socio_nombre} {socio.socio_apellido_paterno} {socio.socio_apellido_materno}"
+    return {
+        'titulo': nombre,
+        'detalle': socio.socio_rut,
+        'url': '',
+        'campos': [
+            (nombre, PESO_TITULO),
+            (socio.socio_rut, PESO_TITULO),
+            (socio.socio_correo, PESO_DETALLE),
+        ],
+    }
+
+
+def _documento_publicacion(publicacion):
+    # La URL se arma como get_absolute_url() para servir también a los modelos históricos
+    # de las migraciones, que no tienen los métodos del modelo
+    url = reverse(f"appadmincontenido:{publicacion._meta.model_name}_detalle", args=[publicacion.slug])
+    return {
+        'titulo': publicacion.titulo,
+        'detalle': publicacion.resumen[:255],
+        'url': url,
+        'campos': [
+            (publicacion.titulo, PESO_TITULO),
+            (publicacion.resumen, PESO_DETALLE),
+            (_texto_bloques(publicacion), PESO_TEXTO),
+        ],
+    }
+
+
+PUBLICACIONES = (ARTICULO, NOTICIA, REPORTAJE)
+
+# Campos que leen las funciones _documento_*: un save() con update_fields que no toque
+# ninguno no cambia el documento
+CAMPOS_INDEXADOS = {
+    EMPRESA: {'nombre', 'rut', 'direccion_completa', 'calle'},
+    SOCIO: {'socio_nombre', 'socio_apellido_paterno', 'socio_apellido_materno', 'socio_rut', 'socio_correo'},
+    **{tipo: {'titulo', 'resumen', 'slug'} for tipo in PUBLICACIONES},
+}
+
+# Modelo indexado y función que arma su documento, por tipo
+_INDEXADOS = {
+    EMPRESA: ('appsocios', 'Empresa', _documento_empresa),
+    SOCIO: ('appsocios', 'Socio', _documento_socio),
+    ARTICULO: ('appadmincontenido', 'Articulo', _documento_publicacion),
+    NOTICIA: ('appadmincontenido', 'Noticia', _documento_publicacion),
+    REPORTAJE: ('appadmincontenido', 'Reportaje', _documento_publicacion),
+}
+
+
+def _modelos(apps=apps_globales):
+    # Los modelos indexados viven en otras apps; `apps` permite usar los históricos
+    return {
+        tipo: (apps.get_model(app, nombre), documento_de)
+        for tipo, (app, nombre, documento_de) in _INDEXADOS.items()
+    }
+
+
+def tipo_de(instancia):
+    for tipo, (modelo, _) in _modelos().items():
+        if isinstance(instancia, modelo):
+            return tipo
+    return None
+
+
+def _pesos(campos):
+    pesos = Counter()
+    for texto, peso in campos:
+        for termino in terminos(texto):
+            pesos[termino] += peso
+    return pesos
+
+
+def _terminos_documento(documento, datos, termino_busqueda=TerminoBusqueda):
+    return [
+        termino_busqueda(termino=termino, documento=documento, peso=peso)
+        for termino, peso in _pesos(datos['campos']).items()
+    ]
+
+
+@transaction.atomic
+def indexar(instancia):
+    """Crea o reemplaza la entrada del índice de una instancia."""
+    tipo = tipo_de(instancia)
+    datos = _modelos()[tipo][1](instancia)
+    documento, _ = DocumentoBusqueda.objects.update_or_create(
+        tipo=tipo, objeto_id=instancia.pk,
+        defaults={'titulo': datos['titulo'][:255], 'detalle': datos['detalle'][:255], 'url': datos['url']},
+    )
+    documento.terminos.all().delete()
+    TerminoBusqueda.objects.bulk_create(_terminos_documento(documento, datos))
+
+
+def desindexar(tipo, objeto_id):
+    DocumentoBusqueda.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def reindexar_objeto(tipo, objeto_id):
+    """Indexa el objeto según está en la base, o lo quita del índice si ya no existe."""
+    consulta = _modelos()[tipo][0].objects.filter(pk=objeto_id)
+    if tipo in PUBLICACIONES:
+        consulta = consulta.prefetch_related('bloques')
+    instancia = consulta.first()
+    if instancia is None:
+        desindexar(tipo, objeto_id)
+    else:
+        indexar(instancia)
+
+
+_pendientes = threading.local()
+
+
+def indexar_al_confirmar(tipo, objeto_id):
+    """
+    Agenda la reindexación de un objeto para cuando se confirme la transacción en
+    curso (de inmediato si no hay una). Los cambios a un mismo objeto dentro de la
+    transacción, como los bloques de un formset, se indexan una sola vez, y una
+    transacción revertida no escribe en el índice.
+    """
+    if not hasattr(_pendientes, 'claves'):
+        _pendientes.claves = set()
+    _pendientes.claves.add((tipo, objeto_id))
+    transaction.on_commit(_indexar_pendientes)
+
+
+def _indexar_pendientes():
+    # El primer callback de la transacción indexa todo; los demás no encuentran nada.
+    # Las claves de una transacción revertida quedan y se indexan con la siguiente,
+    # según lo que haya en la base, lo que no cambia el resultado
+    claves, _pendientes.claves = getattr(_pendientes, 'claves', set()), set()
+    for tipo, objeto_id in claves:
+        reindexar_objeto(tipo, objeto_id)
+
+
+@transaction.atomic
+def reindexar(tipos=None, tamano_lote=500, apps=apps_globales):
+    """
+    Reconstruye el índice completo (o el de los tipos indicados). `apps` es el
+    registro de modelos a usar; la migración que puebla el índice pasa el histórico.
+    """
+    documento_busqueda = apps.get_model('appdashboard', 'DocumentoBusqueda')
+    termino_busqueda = apps.get_model('appdashboard', 'TerminoBusqueda')
+    total = 0
+    for tipo, (modelo, documento_de) in _modelos(apps).items():
+        if tipos and tipo not in tipos:
+            continue
+        documento_busqueda.objects.filter(tipo=tipo).delete()
+        consulta = modelo.objects.order_by('pk')
+        if tipo in PUBLICACIONES:
+            consulta = consulta.prefetch_related('bloques')
+        for inicio in range(0, consulta.count(), tamano_lote):
+            lote = [(obj.pk, documento_de(obj)) for obj in consulta[inicio:inicio + tamano_lote]]
+            documentos = documento_busqueda.objects.bulk_create([
+                documento_busqueda(
+                    tipo=tipo, objeto_id=pk,
+                    titulo=datos['titulo'][:255], detalle=datos['detalle'][:255], url=datos['url'],
+                )
+                for pk, datos in lote
+            ])
+            # bulk_create no retorna pk en todos los motores; se leen de vuelta
+            por_objeto = dict(
+                documento_busqueda.objects.filter(tipo=tipo, objeto_id__in=[pk for pk, _ in lote])
+                .values_list('objeto_id', 'pk')
+            )
+            termino_busqueda.objects.bulk_create(
+                [
+                    termino
+                    for pk, datos in lote
+                    for termino in _terminos_documento(
+                        documento_busqueda(pk=por_objeto[pk]), datos, termino_busqueda
+                    )
+                ],
+                batch_size=2000,
+            )
+            total += len(documentos)
+    return total
+
+
+def _terminos_consulta(consulta):
+    return list(dict.fromkeys(terminos(consulta)))[:MAX_TERMINOS_CONSULTA]
+
+
+def _ranking(buscados, tipos=None):
+    """
+    values('documento') con `puntaje` de los documentos que contienen (un prefijo de)
+    cada término buscado. Sin ordenar ni cortar: sirve como subconsulta.
+    """
+    coincidencias = TerminoBusqueda.objects.filter(
+        reduce(operator.or_, (Q(termino__startswith=t) for t in buscados))
+    )
+    if tipos:
+        coincidencias = coincidencias.filter(documento__tipo__in=tipos)
+
+    por_termino = {
+        f'coincide_{i}': Max(Case(When(termino__startswith=t, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, t in enumerate(buscados)
+    }
+    return (
+        coincidencias.values('documento')
+        .annotate(puntaje=Sum('peso'), **por_termino)
+        .filter(**{nombre: 1 for nombre in por_termino})
+    )
+
+
+def buscar(consulta, tipos=None, limite=50):
+    """
+    Documentos que contienen todos los términos de la consulta, ordenados por
+    puntaje (suma de pesos de los términos coincidentes). Cada término se compara
+    como prefijo, de modo que la búsqueda funciona mientras se escribe. Retorna
+    una lista de DocumentoBusqueda con el atributo `puntaje`.
+    """
+    buscados = _terminos_consulta(consulta)
+    if not buscados:
+        return []
+
+    ranking = _ranking(buscados, tipos).order_by('-puntaje', 'documento')[:limite]
+    puntajes = {fila['documento']: fila['puntaje'] for fila in ranking}
+
+    documentos = DocumentoBusqueda.objects.in_bulk(list(puntajes))
+    resultado = []
+    for pk, puntaje in puntajes.items():
+        documento = documentos[pk]
+        documento.puntaje = puntaje
+        resultado.append(documento)
+    return resultado
+
+
+def ids_coincidentes(consulta, tipo, limite=50):
+    """
+    Pks de los mejores `limite` objetos de un tipo que coinciden con la consulta, por
+    relevancia. Para sugerencias y respuestas acotadas; para filtrar un listado se usa
+    filtrar(), que no corta resultados.
+    """
+    return [documento.objeto_id for documento in buscar(consulta, tipos=[tipo], limite=limite)]
+
+
+def filtrar(queryset, consulta, tipo, por_relevancia=False):
+    """
+    Restringe `queryset` (de objetos del tipo indicado) a los que coinciden con la
+    consulta. La búsqueda va como subconsulta dentro de la consulta del llamador, así
+    que se combina con sus demás filtros y no tiene tope. Con `por_relevancia` anota
+    `puntaje` y ordena por él. Una consulta sin términos indexables (solo palabras
+    vacías o signos, p. ej. "de") no filtra.
+    """
+    buscados = _terminos_consulta(consulta)
+    if not buscados:
+        return queryset
+
+    ranking = _ranking(buscados, [tipo])
+    objetos = DocumentoBusqueda.objects.filter(tipo=tipo, pk__in=ranking.values('documento'))
+    queryset = queryset.filter(pk__in=objetos.values('objeto_id'))
+    if por_relevancia:
+        puntaje = ranking.filter(documento__objeto_id=OuterRef('pk')).values('puntaje')
+        # Los empates conservan el orden que ya tenía el listado
+        desempate = queryset.query.order_by or queryset.model._meta.ordering
+        queryset = queryset.annotate(puntaje=Subquery(puntaje)).order_by('-puntaje', *desempate, 'pk')
+    return queryset
@@ -0,0 +1,199 @@
+"""
+Contadores materializados del dashboard.
+
+ContadorDashboard guarda una fila por indicador: total de empresas y empresas por
+estado de solicitud, estado de pago, visibilidad y encuesta; total de socios; total de
+mensajes y mensajes sin leer. Las señales de appdashboard los ajustan con un UPDATE
+(valor = valor + n) en cada alta, cambio o baja, así que leerlos todos es una consulta
+sobre unas pocas filas sin importar el tamaño de las tablas.
+
+Empresa, Socio y MensajeContacto heredan de EscrituraAtomica: cada save() y delete()
+bloquea la fila, lee sus valores previos y escribe dentro de una transacción en la que
+también corren las señales. El ajuste se calcula contra la fila tal como estaba al
+escribir (no contra la instancia, que puede estar desactualizada) y se confirma o
+revierte junto con ella.
+
+Las escrituras masivas (bulk_create, QuerySet.update()) no disparan señales:
+después de ellas se llama a reconstruir(), como hace populate_db. El comando
+verificar_contadores compara los valores guardados con un conteo real.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from appsocios.models import Empresa, Socio
+from .models import ContadorDashboard, MensajeContacto
+
+EMPRESAS = 'empresas'
+SOCIOS = 'socios'
+MENSAJES = 'mensajes'
+MENSAJES_NO_LEIDOS = 'mensajes.no_leidos'
+
+# Campos de Empresa con un contador por valor (los mismos filtros de lista_empresas_admin)
+DIMENSIONES_EMPRESA = {
+    'estado_solicitud': [valor for valor, _ in Empresa.ESTADOS_SOLICITUD],
+    'estado_pago': [valor for valor, _ in Empresa.ESTADOS_PAGO],
+    'activo': [True, False],
+    'encuesta_respondida': [True, False],
+}
+
+
+def _valor_filtro(valor):
+    # Los booleanos se nombran como en los filtros del dashboard (?activo=si)
+    if isinstance(valor, bool):
+        return 'si' if valor else 'no'
+    return valor
+
+
+def clave_empresa(campo, valor):
+    """Clave del contador de empresas con campo=valor, p. ej. 'empresas.activo.si'."""
+    return f'{EMPRESAS}.{campo}.{_valor_filtro(valor)}'
+
+
+# clave -> (modelo, filtro) que define cada contador
+DEFINICIONES = {
+    EMPRESAS: (Empresa, None),
+    SOCIOS: (Socio, None),
+    MENSAJES: (MensajeContacto, None),
+    MENSAJES_NO_LEIDOS: (MensajeContacto, Q(leido=False)),
+}
+for _campo, _valores in DIMENSIONES_EMPRESA.items():
+    for _valor in _valores:
+        DEFINICIONES[clave_empresa(_campo, _valor)] = (Empresa, Q(**{_campo: _valor}))
+
+
+def claves_de(instancia, valores=None):
+    """Contadores en los que cuenta la instancia, o la fila con esos `valores` si se dan."""
+    valor = valores.__getitem__ if valores is not None else lambda campo: getattr(instancia, campo)
+    if isinstance(instancia, Empresa):
+        claves = {EMPRESAS}
+        claves.update(clave_empresa(campo, valor(campo)) for campo in DIMENSIONES_EMPRESA)
+    elif isinstance(instancia, Socio):
+        claves = {SOCIOS}
+    else:
+        claves = {MENSAJES} if valor('leido') else {MENSAJES, MENSAJES_NO_LEIDOS}
+    # Un valor fuera de las opciones del modelo no tiene contador
+    return claves & DEFINICIONES.keys()
+
+
+# --- Conteo real ---
+
+def contar(modelo=None):
+    """Valores exactos calculados desde las tablas: una consulta por modelo."""
+    valores = {}
+    for actual in (Empresa, Socio, MensajeContacto):
+        if modelo is not None and actual is not modelo:
+            continue
+        claves = [clave for clave, (m, _) in DEFINICIONES.items() if m is actual]
+        agregados = {
+            f'c{i}': Count('pk', filter=DEFINICIONES[clave][1]) for i, clave in enumerate(claves)
+        }
+        resultado = actual.objects.order_by().aggregate(**agregados)
+        valores.update((clave, resultado[f'c{i}']) for i, clave in enumerate(claves))
+    return valores
+
+
+def reconstruir():
+    """Reemplaza todos los contadores por el conteo real."""
+    valores = contar()
+    with transaction.atomic():
+        ContadorDashboard.objects.all().delete()
+        ContadorDashboard.objects.bulk_create(
+            ContadorDashboard(clave=clave, valor=valor) for clave, valor in valores.items()
+        )
+    return valores
+
+
+def verificar():
+    """Contadores desalineados, como {clave: (guardado, real)}."""
+    guardados = dict(ContadorDashboard.objects.values_list('clave', 'valor'))
+    return {
+        clave: (guardados.get(clave), real)
+        for clave, real in contar().items()
+        if guardados.get(clave) != real
+    }
+
+
+# --- Lectura ---
+
+def leer():
+    """Todos los contadores en una consulta; si falta alguno (base recién migrada) se reconstruyen."""
+    valores = dict(ContadorDashboard.objects.values_list('clave', 'valor'))
+    if not DEFINICIONES.keys() <= valores.keys():
+        valores = reconstruir()
+    return valores
+
+
+def por_dimension(valores):
+    """Conteos de empresas por filtro para las plantillas: {'activo': {'si': 3, 'no': 1}, ...}."""
+    return {
+        campo: {_valor_filtro(valor): valores[clave_empresa(campo, valor)] for valor in opciones}
+        for campo, opciones in DIMENSIONES_EMPRESA.items()
+    }
+
+
+def conteo_empresas(valores, **filtros):
+    """
+    Empresas que cumplen a lo más un filtro (con el valor del formulario, p. ej.
+    activo='si'), o None si la combinación no tiene contador y hay que contar en la base.
+    """
+    filtros = {campo: valor for campo, valor in filtros.items() if valor}
+    if not filtros:
+        return valores[EMPRESAS]
+    if len(filtros) > 1:
+        return None
+    (campo, valor), = filtros.items()
+    return valores.get(clave_empresa(campo, valor))
+
+
+# --- Mantenimiento desde señales ---
+
+def registrar_guardado(instancia, creado, update_fields=None):
+    if not creado and not set(update_fields or instancia.CAMPOS_PREVIOS) & set(instancia.CAMPOS_PREVIOS):
+        # Sin campos con contador propio (Socio) o sin tocarlos: nada cambia
+        return
+    previos = getattr(instancia, '_valores_previos', None)
+    instancia._valores_previos = None
+    nuevas = claves_de(instancia)
+    if creado:
+        previas = set()
+    elif previos is None:
+        # Guardado sin pasar por save() (p. ej. loaddata): no se sabe de dónde viene
+        _recalcular(type(instancia))
+        return
+    else:
+        previas = claves_de(instancia, previos)
+    _sumar({**{clave: -1 for clave in previas - nuevas}, **{clave: 1 for clave in nuevas - previas}})
+
+
+def registrar_eliminacion(instancia):
+    if hasattr(instancia, '_valores_previos'):
+        previos = instancia._valores_previos
+        if previos is None:
+            # Otra escritura ya eliminó la fila: no hay nada que descontar
+            return
+        claves = claves_de(instancia, previos)
+    else:
+        # QuerySet.delete(): el Collector no pasa por delete() del modelo
+        claves = claves_de(instancia)
+    _sumar({clave: -1 for clave in claves})
+
+
+def _sumar(deltas):
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Un solo UPDATE con CASE para todas las claves afectadas
+        actualizados = ContadorDashboard.objects.filter(clave__in=deltas).update(
+            valor=F('valor') + Case(*(When(clave=clave, then=Value(delta)) for clave, delta in deltas.items()))
+        )
+        if actualizados < len(deltas):
+            # Sin fila todavía: se parte del conteo real, que ya incluye esta escritura
+            existentes = set(ContadorDashboard.objects.filter(clave__in=deltas).values_list('clave', flat=True))
+            modelo = DEFINICIONES[next(clave for clave in deltas if clave not in existentes)][0]
+            _recalcular(modelo)
+
+
+def _recalcular(modelo):
+    with transaction.atomic():
+        for clave, valor in contar(modelo).items():
+            ContadorDashboard.objects.update_or_create(clave=clave, defaults={'valor': valor})
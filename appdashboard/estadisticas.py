@@ -0,0 +1,64 @@
+"""
+Indicadores del dashboard de administración.
+
+Los contadores se leen de la tabla materializada ContadorDashboard (ver contadores.py).
+Se guardan un momento en caché por separado (lista_mensajes solo necesita los
+contadores) y junto a las tres listas de "últimos" del home. Las señales de
+appdashboard descartan ambas instantáneas al escribir en Empresa, Socio o
+MensajeContacto.
+"""
+from django.core.cache import cache
+
+from appsocios.models import Empresa, Socio
+from .contadores import EMPRESAS, MENSAJES_NO_LEIDOS, SOCIOS, clave_empresa, leer as leer_contadores
+
+CLAVE_CONTADORES = "appdashboard:estadisticas:contadores"
+CLAVE_ESTADISTICAS = "appdashboard:estadisticas"
+TIMEOUT_ESTADISTICAS = 60
+
+# Elementos de cada lista de "últimos" del dashboard
+CANTIDAD_RECIENTES = 5
+
+
+def _calcular_contadores():
+    valores = leer_contadores()
+    return {
+        'total_socios': valores[SOCIOS],
+        'total_empresas': valores[EMPRESAS],
+        'solicitudes_pendientes': valores[clave_empresa('estado_solicitud', 'pendiente')],
+        'mensajes_no_leidos': valores[MENSAJES_NO_LEIDOS],
+    }
+
+
+def _calcular_recientes():
+    return {
+        'ultimos_socios': list(Socio.objects.order_by('-socio_id')[:CANTIDAD_RECIENTES]),
+        'ultimas_empresas': list(
+            Empresa.objects.select_related('rubro').order_by('-fecha_creacion')[:CANTIDAD_RECIENTES]
+        ),
+        'solicitudes_recientes': list(
+            Empresa.objects.filter(estado_solicitud='pendiente').order_by('fecha_creacion')[:CANTIDAD_RECIENTES]
+        ),
+    }
+
+
+def _desde_cache(clave, calcular):
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, TIMEOUT_ESTADISTICAS)
+    return datos
+
+
+def contadores():
+    """total_socios, total_empresas, solicitudes_pendientes y mensajes_no_leidos."""
+    return _desde_cache(CLAVE_CONTADORES, _calcular_contadores)
+
+
+def estadisticas():
+    """Contadores más las listas de últimos socios, empresas y solicitudes pendientes."""
+    return _desde_cache(CLAVE_ESTADISTICAS, lambda: {**contadores(), **_calcular_recientes()})
+
+
+def invalidar_estadisticas():
+    cache.delete_many([CLAVE_CONTADORES, CLAVE_ESTADISTICAS])
@@ -0,0 +1,136 @@
+"""
+Exportación a CSV de socios, empresas y mensajes de contacto.
+
+Cada exportación es una sola consulta proyectada con values_list() (las relaciones
+van por JOIN) que se recorre con iterator(chunk_size=LOTE) y se escribe a medida que
+el cliente descarga (StreamingHttpResponse): la memoria no depende de la cantidad de
+filas, a diferencia de cargar los objetos con sus relaciones como hacen los listados.
+"""
+import csv
+import re
+from datetime import datetime
+
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from appsocios.models import Empresa, Encuesta, Socio
+from .models import MensajeContacto
+
+# Filas que se traen de la base por vuelta
+LOTE = 2000
+
+# Prefijos que una planilla interpretaría como fórmula
+_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+# Teléfonos y números ("+56 9 1234 5678", "-12.5"): empiezan con + o - pero no son
+# fórmulas y no deben llevar el apóstrofo
+_NUMERO = re.compile(r'[+-]?[\d\s().-]*\d[\d\s().-]*')
+
+COLUMNAS_SOCIOS = [
+    ('RUT', 'socio_rut'),
+    ('Nombre', 'socio_nombre'),
+    ('Apellido paterno', 'socio_apellido_paterno'),
+    ('Apellido materno', 'socio_apellido_materno'),
+    ('Correo', 'socio_correo'),
+    ('Celular', 'socio_celular'),
+    ('Teléfono fijo', 'socio_fijo'),
+    ('Dirección', 'socio_direccion'),
+    ('Número', 'socio_numero'),
+    ('Comuna', 'socio_comuna__comuna'),
+    ('Región', 'socio_region__region'),
+    ('Estado', 'socio_estado'),
+    ('Empresas', 'cantidad_empresas'),
+    ('Fecha de registro', 'socio_fecha_creacion'),
+]
+
+COLUMNAS_EMPRESAS = [
+    ('Nombre', 'nombre'),
+    ('RUT', 'rut'),
+    ('Rubro', 'rubro__nombre_rubro'),
+    ('Tipo de comercialización', 'tipo_comercializacion__nombre_tipo'),
+    ('Dirección', 'direccion_completa'),
+    ('Calle', 'calle'),
+    ('Comuna', 'comuna__comuna'),
+    ('Teléfono', 'telefono'),
+    ('Correo', 'correo'),
+    ('Instagram', 'instagram'),
+    ('Facebook', 'facebook'),
+    ('Web', 'web'),
+    ('RUT socio', 'socio__socio_rut'),
+    ('Nombre socio', 'socio__socio_nombre'),
+    ('Apellido socio', 'socio__socio_apellido_paterno'),
+    ('Estado solicitud', 'estado_solicitud'),
+    ('Estado pago', 'estado_pago'),
+    ('Encuesta respondida', 'encuesta_respondida'),
+    ('Activa', 'activo'),
+    ('Visible en el directorio', 'visible_publico'),
+    ('Fecha de creación', 'fecha_creacion'),
+] + [
+    # Respuestas de la encuesta, con la pregunta como encabezado
+    (campo.verbose_name, f'encuesta__{campo.name}')
+    for campo in Encuesta._meta.fields if campo.name.startswith('pregunta_')
+]
+
+COLUMNAS_MENSAJES = [
+    ('Fecha', 'fecha_envio'),
+    ('Nombre', 'nombre'),
+    ('Correo', 'email'),
+    ('Teléfono', 'telefono'),
+    ('Mensaje', 'mensaje'),
+    ('Leído', 'leido'),
+]
+
+
+class _Eco:
+    """Archivo mínimo para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def _celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sí' if valor else 'No'
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.strftime('%Y-%m-%d %H:%M')
+    if isinstance(valor, str) and valor.startswith(_FORMULA) and not _NUMERO.fullmatch(valor):
+        # Los mensajes y datos vienen de formularios públicos: no deben ejecutarse al abrir el archivo
+        return "'" + valor
+    return valor
+
+
+def respuesta_csv(nombre, columnas, queryset):
+    """Descarga en streaming de `queryset` con las columnas [(encabezado, campo)]."""
+    escritor = csv.writer(_Eco())
+    campos = [campo for _, campo in columnas]
+
+    def lineas():
+        # BOM para que Excel abra el archivo como UTF-8
+        yield '\ufeff' + escritor.writerow([encabezado for encabezado, _ in columnas])
+        for fila in queryset.values_list(*campos).iterator(chunk_size=LOTE):
+            yield escritor.writerow([_celda(valor) for valor in fila])
+
+    respuesta = StreamingHttpResponse(lineas(), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}-{timezone.localdate():%Y%m%d}.csv"'
+    return respuesta
+
+
+def socios(queryset=None):
+    queryset = Socio.objects.all() if queryset is None else queryset
+    return respuesta_csv(
+        'socios', COLUMNAS_SOCIOS,
+        queryset.annotate(cantidad_empresas=Count('empresas')).order_by('socio_id'),
+    )
+
+
+def empresas(queryset=None):
+    queryset = Empresa.objects.all() if queryset is None else queryset
+    return respuesta_csv('empresas', COLUMNAS_EMPRESAS, queryset.order_by('-fecha_creacion', '-id_empresa'))
+
+
+def mensajes(queryset=None):
+    queryset = MensajeContacto.objects.all() if queryset is None else queryset
+    return respuesta_csv('mensajes', COLUMNAS_MENSAJES, queryset)
@@ -0,0 +1,72 @@
+import json
+import platform
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from appdashboard import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95), consultas y memoria pico de las vistas más usadas "
+        "sobre una base de pruebas poblada con populate_db"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socios', type=int, default=500, help="Socios a generar (default: 500)")
+        parser.add_argument('--empresas', type=int, default=2000, help="Empresas a generar (default: 2000)")
+        parser.add_argument('--posts', type=int, default=500, help="Publicaciones por tipo (default: 500)")
+        parser.add_argument('--eventos', type=int, default=200, help="Eventos y actividades (default: 200)")
+        parser.add_argument('--seed', type=int, default=42, help="Semilla de populate_db (default: 42)")
+        parser.add_argument('--repeticiones', type=int, default=20, help="Mediciones por vista (default: 20)")
+        parser.add_argument('--con-cache', action='store_true',
+                            help="No vaciar la caché entre peticiones (mide el camino cacheado)")
+        parser.add_argument('--solo', help="Medir solo los escenarios cuyo nombre contenga este texto")
+        parser.add_argument('--salida', help="Archivo donde escribir el JSON (por defecto, la salida estándar)")
+        parser.add_argument('--base-actual', action='store_true',
+                            help="Usar la base configurada tal como está, sin crear ni poblar una de pruebas")
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError("--repeticiones debe ser al menos 1")
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        bases = None if options['base_actual'] else runner.setup_databases()
+        try:
+            if bases is not None:
+                self.stderr.write("Poblando la base de pruebas...")
+                call_command(
+                    'populate_db',
+                    socios=options['socios'], empresas=options['empresas'], posts=options['posts'],
+                    eventos=options['eventos'], seed=options['seed'], bloques_per_post=2,
+                    stdout=self.stderr,
+                )
+            resultados = benchmark.ejecutar(
+                repeticiones=options['repeticiones'],
+                limpiar_cache=not options['con_cache'],
+                filtro=options['solo'],
+            )
+        finally:
+            if bases is not None:
+                runner.teardown_databases(bases)
+            teardown_test_environment()
+
+        informe = {
+            'parametros': {
+                clave: options[clave]
+                for clave in ('socios', 'empresas', 'posts', 'eventos', 'seed', 'repeticiones', 'con_cache', 'base_actual')
+            },
+            'python': platform.python_version(),
+            'vistas': resultados,
+        }
+        documento = json.dumps(informe, indent=2, ensure_ascii=False, sort_keys=True)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(documento + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+        else:
+            self.stdout.write(documento)
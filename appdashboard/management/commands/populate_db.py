@@ -1,20 +1,56 @@
 import random
 from datetime import timedelta
+from decimal import Decimal
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
+from django.utils.text import slugify
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from appsocios.geo import celda
 from appsocios.models import (
-    Socio, Empresa, Rubro, TipoComercializacion, 
-    Region, Provincia, Comuna
+    Socio, Empresa, Rubro, TipoComercializacion,
+    Region, Provincia, Comuna, digito_verificador
 )
+from appadmincontenido.feed import invalidar_contenido_reciente
 from appadmincontenido.models import (
-    Articulo, Noticia, Reportaje, Evento, Actividad, Categoria
+    Articulo, Noticia, Reportaje, Evento, Actividad, Categoria,
+    BloqueArticulo, BloqueNoticia, BloqueReportaje
 )
+from appdashboard import busqueda, contadores, estadisticas
+from descubrecurico.cache_publico import invalidar_paginas, CONTENIDO, EVENTOS, EMPRESAS
+
+# Centro aproximado de Curicó, para repartir las empresas a su alrededor
+LATITUD_CENTRO = -34.98
+LONGITUD_CENTRO = -71.24
+
+
+# Rangos de donde se sortean los RUT de prueba de personas y de empresas
+CUERPOS_RUT_SOCIO = (10_000_000, 26_000_000)
+CUERPOS_RUT_EMPRESA = (76_000_000, 78_000_000)
+
+
+def rut(cuerpo):
+    # Formato almacenado: sin puntos ni guion (ver appsocios.models.normalizar_run)
+    return f"{cuerpo}{digito_verificador(cuerpo)}"
+
 
 class Command(BaseCommand):
     help = "Poblar la base de datos con datos de prueba (Socios, Empresas, Contenido)"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--socios', type=int, default=10, help="Cantidad de socios (default: 10)")
+        parser.add_argument('--empresas', type=int, default=10, help="Cantidad de empresas (default: 10)")
+        parser.add_argument('--posts', type=int, default=10, help="Publicaciones por tipo: artículos, noticias y reportajes (default: 10)")
+        parser.add_argument('--bloques-per-post', type=int, default=0, help="Bloques de texto por publicación (default: 0)")
+        parser.add_argument('--eventos', type=int, default=5, help="Cantidad de eventos y de actividades (default: 5)")
+        parser.add_argument('--seed', type=int, default=42, help="Semilla: la misma semilla genera los mismos datos")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Filas por inserción masiva (default: 2000)")
+        parser.add_argument('--sin-indice', action='store_true', help="No reconstruir el índice de búsqueda al terminar")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.lote = options['batch_size']
         self.stdout.write(self.style.WARNING("Iniciando población de datos..."))
 
         # --- 1. Asegurar Datos Geográficos Básicos ---
@@ -27,142 +63,244 @@ class Command(BaseCommand):
             Comuna.objects.create(comuna="Teno", provincia=p)
             self.stdout.write("-> Datos geográficos básicos creados.")
 
-        comunas = list(Comuna.objects.all())
-        regiones = list(Region.objects.all())
+        # Comuna con su región real, para que socio_region sea coherente
+        comunas = list(Comuna.objects.values_list('id', 'provincia__region_id'))
 
         # --- 2. Rubros y Tipos de Comercialización ---
         rubros_names = ['Gastronomía', 'Turismo Aventura', 'Hotelería', 'Comercio Local', 'Vinos y Licores', 'Artesanía']
         for name in rubros_names:
             Rubro.objects.get_or_create(nombre_rubro=name)
-        rubros = list(Rubro.objects.all())
+        rubros = list(Rubro.objects.values_list('id_rubro', flat=True))
 
         tipos_names = ['Venta en local', 'E-commerce', 'Distribución', 'Servicios']
         for name in tipos_names:
             TipoComercializacion.objects.get_or_create(nombre_tipo=name)
-        tipos = list(TipoComercializacion.objects.all())
-
-        # --- 3. Crear 10 Socios ---
-        self.stdout.write("-> Creando/Verificando 10 Socios...")
-        socios_creados = []
-        for i in range(1, 11):
-            username = f"socio_test_{i}"
-            email = f"socio{i}@descubrecurico.cl"
-            
-            # Crear Usuario Django
-            user, created = User.objects.get_or_create(username=username, defaults={'email': email})
-            if created:
-                user.set_password("pass1234")
-                user.save()
-
-            # Generar RUT válido (Algoritmo Módulo 11)
-            rut_base = random.randint(10000000, 25000000)
-            rut_str = str(rut_base)
-            suma = sum(int(d) * f for d, f in zip(reversed(rut_str), [2,3,4,5,6,7]*2))
-            resto = suma % 11
-            dv = 11 - resto
-            if dv == 11: dv_char = '0'
-            elif dv == 10: dv_char = 'K'
-            else: dv_char = str(dv)
-            rut_final = f"{rut_base}-{dv_char}"
-
-            # Crear Socio
-            if not hasattr(user, 'socio'):
-                socio = Socio.objects.create(
-                    usuario=user,
-                    socio_rut=rut_final,
-                    socio_nombre=f"Socio {i}",
-                    socio_apellido_paterno=f"ApellidoP{i}",
-                    socio_apellido_materno=f"ApellidoM{i}",
-                    socio_celular=f"9{random.randint(10000000, 99999999)}",
-                    socio_fijo=f"2{random.randint(2000000, 2999999)}",
-                    socio_correo=email,
-                    socio_direccion=f"Calle de Prueba {i*10}",
-                    socio_numero=str(i*5),
-                    socio_comuna=random.choice(comunas),
-                    socio_region=random.choice(regiones),
-                    socio_estado="Activo"
-                )
-                socios_creados.append(socio)
-            else:
-                socios_creados.append(user.socio)
-
-        # --- 4. Crear 10 Empresas ---
-        self.stdout.write("-> Creando 10 Empresas...")
-        for i in range(1, 11):
-            nombre_empresa = f"Empresa Ejemplo {i}"
-            if not Empresa.objects.filter(nombre=nombre_empresa).exists():
-                Empresa.objects.create(
-                    nombre=nombre_empresa,
-                    rut=f"{random.randint(50000000, 90000000)}-{random.randint(0,9)}",
-                    direccion_completa=f"Avenida Siempre Viva {i*123}",
-                    calle=f"Avenida Siempre Viva {i*123}",
-                    comuna=random.choice(comunas),
-                    telefono=f"+569{random.randint(10000000, 99999999)}",
-                    correo=f"contacto@empresa{i}.cl",
-                    socio=random.choice(socios_creados),
-                    rubro=random.choice(rubros),
-                    tipo_comercializacion=random.choice(tipos),
-                    estado_solicitud='aprobada',
-                    estado_pago='pagado',
-                    activo=True,
-                    encuesta_respondida=True,
-                    fecha_creacion=timezone.now() - timedelta(days=random.randint(1, 100))
-                )
+        tipos = list(TipoComercializacion.objects.values_list('id_tipo', flat=True))
+
+        # --- 3. Socios ---
+        self.stdout.write(f"-> Creando/Verificando {options['socios']} Socios...")
+        socios = self.crear_socios(options['socios'], comunas)
+
+        # --- 4. Empresas ---
+        self.stdout.write(f"-> Creando/Verificando {options['empresas']} Empresas...")
+        self.crear_empresas(options['empresas'], socios, comunas, rubros, tipos)
 
         # --- 5. Categorías de Contenido ---
         cats_names = ['Cultura', 'Vinos', 'Deportes', 'Naturaleza', 'Historia']
         categorias = []
         for c in cats_names:
             obj, _ = Categoria.objects.get_or_create(nombre=c)
-            categorias.append(obj)
-
-        # --- 6. Crear Artículos, Noticias, Reportajes (10 de cada uno) ---
-        self.stdout.write("-> Creando Artículos, Noticias y Reportajes...")
-        
-        def crear_posts(Modelo, prefijo):
-            for i in range(1, 11):
-                titulo = f"{prefijo} #{i}: Descubriendo el Maule"
-                if not Modelo.objects.filter(titulo=titulo).exists():
-                    post = Modelo.objects.create(
-                        titulo=titulo,
-                        resumen=f"Este es un resumen generado automáticamente para el {prefijo.lower()} número {i}. Contenido de prueba.",
-                        autor="Equipo Descubre Curicó",
-                        estado="PUBLISHED",
-                        publicado_en=timezone.now() - timedelta(days=random.randint(0, 60))
-                    )
-                    post.categorias.add(random.choice(categorias))
-
-        crear_posts(Articulo, "Artículo")
-        crear_posts(Noticia, "Noticia")
-        crear_posts(Reportaje, "Reportaje")
+            categorias.append(obj.pk)
+
+        # --- 6. Artículos, Noticias, Reportajes ---
+        self.stdout.write(f"-> Creando {options['posts']} Artículos, Noticias y Reportajes...")
+        for Modelo, prefijo, Bloque, relacion in (
+            (Articulo, "Artículo", BloqueArticulo, 'articulo'),
+            (Noticia, "Noticia", BloqueNoticia, 'noticia'),
+            (Reportaje, "Reportaje", BloqueReportaje, 'reportaje'),
+        ):
+            self.crear_posts(Modelo, prefijo, options['posts'], categorias, Bloque, relacion, options['bloques_per_post'])
 
         # --- 7. Eventos y Actividades ---
         self.stdout.write("-> Creando Eventos y Actividades...")
-        
-        # Eventos (Futuros y Pasados)
-        for i in range(1, 6):
-            titulo = f"Fiesta del Vino {2025+i}"
-            if not Evento.objects.filter(titulo=titulo).exists():
-                inicio = timezone.now() + timedelta(days=random.randint(-10, 30))
-                Evento.objects.create(
-                    titulo=titulo,
-                    descripcion="Un gran evento para disfrutar en familia con lo mejor de nuestra tierra.",
-                    fecha_inicio=inicio,
-                    fecha_termino=inicio + timedelta(days=2),
-                    lugar="Plaza de Armas de Curicó"
-                )
-
-        # Actividades
-        for i in range(1, 6):
-            titulo = f"Taller de Cata #{i}"
-            if not Actividad.objects.filter(titulo=titulo).exists():
-                inicio = timezone.now() + timedelta(days=random.randint(1, 20))
-                Actividad.objects.create(
-                    titulo=titulo,
-                    descripcion="Aprende a catar vinos como un experto en este taller práctico.",
-                    fecha_inicio=inicio,
-                    fecha_termino=inicio + timedelta(hours=3),
-                    lugar="Viña Local"
-                )
+        self.crear_eventos(options['eventos'])
+
+        # Las inserciones masivas no disparan señales: se reconstruyen índice y cachés
+        if not options['sin_indice']:
+            self.stdout.write("-> Reconstruyendo índice de búsqueda...")
+            busqueda.reindexar()
+        invalidar_contenido_reciente()
+        contadores.reconstruir()
+        estadisticas.invalidar_estadisticas()
+        invalidar_paginas(CONTENIDO, EVENTOS, EMPRESAS)
 
         self.stdout.write(self.style.SUCCESS("¡Base de datos poblada exitosamente!"))
+
+    def insertar(self, modelo, objetos):
+        modelo.objects.bulk_create(objetos, batch_size=self.lote)
+
+    def sortear_ruts(self, cantidad, cuerpos, usados):
+        """`cantidad` RUT distintos sorteados con la semilla, sin repetir ninguno de `usados`."""
+        usados = set(usados)
+        ruts = []
+        while len(ruts) < cantidad:
+            valor = rut(self.rng.randrange(*cuerpos))
+            if valor not in usados:
+                usados.add(valor)
+                ruts.append(valor)
+        return ruts
+
+    def ids_por_slug(self, modelo, slugs):
+        # bulk_create no retorna pk en todos los motores: se leen de vuelta por lotes
+        ids = []
+        for inicio in range(0, len(slugs), self.lote):
+            ids.extend(modelo.objects.filter(slug__in=slugs[inicio:inicio + self.lote]).values_list('id', flat=True))
+        return ids
+
+    @transaction.atomic
+    def crear_socios(self, cantidad, comunas):
+        """Crea los socios faltantes y retorna los ids de todos los socios de prueba."""
+        usernames = [f"socio_test_{i}" for i in range(1, cantidad + 1)]
+        existentes = set(
+            User.objects.filter(username__startswith="socio_test_").values_list('username', flat=True)
+        )
+        # Un solo hash para todos: hashear por usuario domina el tiempo de carga
+        contrasena = make_password("pass1234")
+
+        nuevos = [
+            User(username=u, email=f"{u.replace('_test_', '')}@descubrecurico.cl", password=contrasena)
+            for u in usernames if u not in existentes
+        ]
+        self.insertar(User, nuevos)
+
+        # bulk_create no retorna pk en todos los motores: se leen de vuelta
+        usuarios = dict(User.objects.filter(username__startswith="socio_test_").values_list('username', 'id'))
+        con_socio = set(Socio.objects.filter(usuario__username__startswith="socio_test_").values_list('usuario_id', flat=True))
+        # Sorteados y no correlativos: otra semilla da otros RUT y no chocan con los ya cargados
+        ruts = self.sortear_ruts(cantidad, CUERPOS_RUT_SOCIO, Socio.objects.values_list('socio_rut', flat=True))
+
+        socios = []
+        for i, (username, rut_socio) in enumerate(zip(usernames, ruts), start=1):
+            usuario_id = usuarios[username]
+            comuna_id, region_id = self.rng.choice(comunas)
+            if usuario_id in con_socio:
+                continue
+            socios.append(Socio(
+                usuario_id=usuario_id,
+                socio_rut=rut_socio,
+                socio_nombre=f"Socio {i}",
+                socio_apellido_paterno=f"ApellidoP{i}",
+                socio_apellido_materno=f"ApellidoM{i}",
+                socio_celular=f"9{self.rng.randint(10000000, 99999999)}",
+                socio_fijo=f"2{self.rng.randint(2000000, 2999999)}",
+                socio_correo=f"socio{i}@descubrecurico.cl",
+                socio_direccion=f"Calle de Prueba {i*10}",
+                socio_numero=str(i*5),
+                socio_comuna_id=comuna_id,
+                socio_region_id=region_id,
+                socio_estado="Activo",
+                socio_contraseña=contrasena,
+            ))
+        self.insertar(Socio, socios)
+        return list(Socio.objects.filter(usuario__username__startswith="socio_test_").values_list('socio_id', flat=True))
+
+    @transaction.atomic
+    def crear_empresas(self, cantidad, socios, comunas, rubros, tipos):
+        if not socios:
+            return
+        existentes = set(Empresa.objects.filter(nombre__startswith="Empresa Ejemplo ").values_list('nombre', flat=True))
+        ruts = self.sortear_ruts(
+            cantidad, CUERPOS_RUT_EMPRESA, Empresa.objects.exclude(rut=None).values_list('rut', flat=True)
+        )
+        ahora = timezone.now()
+        empresas = []
+        for i, rut_empresa in enumerate(ruts, start=1):
+            nombre = f"Empresa Ejemplo {i}"
+            # Se consume el generador igual aunque la empresa exista, para que los datos no dependan de lo ya cargado
+            latitud = Decimal(LATITUD_CENTRO + self.rng.uniform(-0.5, 0.5)).quantize(Decimal('0.000001'))
+            longitud = Decimal(LONGITUD_CENTRO + self.rng.uniform(-0.5, 0.5)).quantize(Decimal('0.000001'))
+            comuna_id, _ = self.rng.choice(comunas)
+            socio_id = self.rng.choice(socios)
+            rubro_id = self.rng.choice(rubros)
+            tipo_id = self.rng.choice(tipos)
+            dias = self.rng.randint(1, 100)
+            # Aprox. 1 de cada 5 queda como solicitud pendiente, para poblar el dashboard
+            aprobada = self.rng.random() >= 0.2
+            if nombre in existentes:
+                continue
+            empresa = Empresa(
+                nombre=nombre,
+                rut=rut_empresa,
+                direccion_completa=f"Avenida Siempre Viva {i*123}",
+                calle=f"Avenida Siempre Viva {i*123}",
+                comuna_id=comuna_id,
+                telefono=f"+569{self.rng.randint(10000000, 99999999)}",
+                correo=f"contacto@empresa{i}.cl",
+                latitud=latitud,
+                longitud=longitud,
+                socio_id=socio_id,
+                rubro_id=rubro_id,
+                tipo_comercializacion_id=tipo_id,
+                estado_solicitud='aprobada' if aprobada else 'pendiente',
+                estado_pago='pagado' if aprobada else 'pendiente',
+                activo=aprobada,
+                encuesta_respondida=aprobada,
+                fecha_creacion=ahora - timedelta(days=dias),
+            )
+            # Campos que save() deriva y bulk_create no calcula
+            empresa.celda_lat, empresa.celda_lng = celda(latitud, longitud)
+            empresa.visible_publico = empresa.calcular_visible_publico()
+            empresas.append(empresa)
+        self.insertar(Empresa, empresas)
+
+    @transaction.atomic
+    def crear_posts(self, Modelo, prefijo, cantidad, categorias, Bloque, relacion, bloques_por_post):
+        existentes = set(Modelo.objects.values_list('slug', flat=True))
+        ahora = timezone.now()
+        nuevos = []
+        for i in range(1, cantidad + 1):
+            titulo = f"{prefijo} #{i}: Descubriendo el Maule"
+            dias = self.rng.randint(0, 60)
+            minutos = self.rng.randint(0, 24 * 60)
+            # save() no se ejecuta en bulk_create: el slug se calcula aquí, igual que en save()
+            slug = slugify(titulo)[:200]
+            if slug in existentes:
+                continue
+            nuevos.append(Modelo(
+                titulo=titulo,
+                slug=slug,
+                resumen=f"Este es un resumen generado automáticamente para el {prefijo.lower()} número {i}. Contenido de prueba.",
+                autor="Equipo Descubre Curicó",
+                estado="PUBLISHED",
+                publicado_en=ahora - timedelta(days=dias, minutes=minutos),
+            ))
+        self.insertar(Modelo, nuevos)
+
+        ids = self.ids_por_slug(Modelo, [post.slug for post in nuevos])
+        Intermedia = Modelo.categorias.through
+        campo_post = f"{Modelo._meta.model_name}_id"
+        self.insertar(Intermedia, [
+            Intermedia(**{campo_post: post_id, 'categoria_id': self.rng.choice(categorias)})
+            for post_id in ids
+        ])
+
+        bloques = []
+        for post_id in ids:
+            for orden in range(bloques_por_post):
+                bloques.append(Bloque(**{
+                    f"{relacion}_id": post_id,
+                    'tipo': 'TEXT',
+                    'orden': orden,
+                    'texto': f"Párrafo {orden + 1} de contenido de prueba sobre viñas, cultura y naturaleza del Maule.",
+                }))
+                if len(bloques) >= self.lote:
+                    self.insertar(Bloque, bloques)
+                    bloques = []
+        self.insertar(Bloque, bloques)
+
+    @transaction.atomic
+    def crear_eventos(self, cantidad):
+        ahora = timezone.now()
+        for Modelo, titulo_base, descripcion, lugar, duracion, rango_dias in (
+            (Evento, "Fiesta del Vino {}", "Un gran evento para disfrutar en familia con lo mejor de nuestra tierra.",
+             "Plaza de Armas de Curicó", timedelta(days=2), (-10, 30)),
+            (Actividad, "Taller de Cata #{}", "Aprende a catar vinos como un experto en este taller práctico.",
+             "Viña Local", timedelta(hours=3), (1, 20)),
+        ):
+            existentes = set(Modelo.objects.values_list('slug', flat=True))
+            nuevos = []
+            for i in range(1, cantidad + 1):
+                titulo = titulo_base.format(2025 + i if Modelo is Evento else i)
+                inicio = ahora + timedelta(days=self.rng.randint(*rango_dias))
+                slug = slugify(titulo)
+                if slug in existentes:
+                    continue
+                nuevos.append(Modelo(
+                    titulo=titulo,
+                    slug=slug,
+                    descripcion=descripcion,
+                    fecha_inicio=inicio,
+                    fecha_termino=inicio + duracion,
+                    lugar=lugar,
+                ))
+            self.insertar(Modelo, nuevos)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from appdashboard import contadores, estadisticas
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los contadores materializados del dashboard"
+
+    def handle(self, *args, **options):
+        valores = contadores.reconstruir()
+        estadisticas.invalidar_estadisticas()
+        for clave, valor in sorted(valores.items()):
+            self.stdout.write(f"  {clave}: {valor}")
+        self.stdout.write(self.style.SUCCESS(f"Contadores reconstruidos: {len(valores)}."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from appdashboard import busqueda
+
+TIPOS = [busqueda.EMPRESA, busqueda.SOCIO, busqueda.ARTICULO, busqueda.NOTICIA, busqueda.REPORTAJE]
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de empresas, socios y publicaciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo', action='append', choices=TIPOS,
+            help="Reindexar solo este tipo de documento (se puede repetir)",
+        )
+
+    def handle(self, *args, **options):
+        total = busqueda.reindexar(tipos=options['tipo'])
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido: {total} documentos."))
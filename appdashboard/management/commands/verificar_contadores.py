@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from appdashboard import contadores, estadisticas
+
+
+class Command(BaseCommand):
+    help = "Compara los contadores materializados del dashboard con un conteo real"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reparar', action='store_true',
+            help="Reconstruir los contadores si hay diferencias",
+        )
+
+    def handle(self, *args, **options):
+        diferencias = contadores.verificar()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("Los contadores coinciden con las tablas."))
+            return
+
+        for clave, (guardado, real) in sorted(diferencias.items()):
+            self.stdout.write(f"  {clave}: guardado {guardado}, real {real}")
+        if options['reparar']:
+            contadores.reconstruir()
+            estadisticas.invalidar_estadisticas()
+            self.stdout.write(self.style.SUCCESS(f"{len(diferencias)} contadores reparados."))
+        else:
+            raise CommandError(f"{len(diferencias)} contadores no coinciden (use --reparar para corregirlos).")
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appdashboard', '0002_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorDashboard',
+            fields=[
+                ('clave', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador del dashboard',
+                'verbose_name_plural': 'Contadores del dashboard',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:10
+
+from django.db import migrations
+
+
+def poblar_indice(apps, schema_editor):
+    # Las bases existentes tenían datos antes del índice: sin esto las búsquedas
+    # no encontrarían nada hasta correr reindexar_busqueda
+    from appdashboard.busqueda import reindexar
+    reindexar(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appdashboard', '0003_contadores_dashboard'),
+        ('appadmincontenido', '0001_initial'),
+        ('appsocios', '0011_empresa_visible_publico'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
 
-class MensajeContacto(models.Model):
+from descubrecurico.escritura import EscrituraAtomica
+
+class MensajeContacto(EscrituraAtomica):
+    # Valores que las señales de contadores leen bloqueados antes de cada escritura
+    CAMPOS_PREVIOS = ('leido',)
+
     nombre = models.CharField(max_length=100)
     telefono = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField()
@@ -12,4 +17,50 @@ class MensajeContacto(models.Model):
         ordering = ['-fecha_envio']
 
     def __str__(self):
-        return f"Mensaje de {self.nombre} ({self.fecha_envio})"
\ No newline at end of file
+        return f"Mensaje de {self.nombre} ({self.fecha_envio})"
+
+# --- Contadores del dashboard ---
+class ContadorDashboard(models.Model):
+    """Valor materializado de un indicador del dashboard (ver appdashboard/contadores.py)."""
+    clave = models.CharField(max_length=64, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador del dashboard'
+        verbose_name_plural = 'Contadores del dashboard'
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+# --- Índice de búsqueda ---
+class DocumentoBusqueda(models.Model):
+    """Entrada del índice de búsqueda: una empresa, socio o publicación."""
+    tipo = models.CharField(max_length=20)
+    objeto_id = models.PositiveIntegerField()
+    titulo = models.CharField(max_length=255)
+    detalle = models.CharField(max_length=255, blank=True)
+    url = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = 'Documento de búsqueda'
+        verbose_name_plural = 'Documentos de búsqueda'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='documento_busqueda_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id}: {self.titulo}"
+
+
+class TerminoBusqueda(models.Model):
+    """Término normalizado de un documento, con su peso para ordenar resultados."""
+    termino = models.CharField(max_length=64)
+    documento = models.ForeignKey(DocumentoBusqueda, on_delete=models.CASCADE, related_name='terminos')
+    peso = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = 'Término de búsqueda'
+        verbose_name_plural = 'Términos de búsqueda'
+        indexes = [
+            models.Index(fields=['termino', 'documento'], name='termino_busqueda_idx'),
+        ]
@@ -0,0 +1,134 @@
+"""
+Presupuestos de rendimiento por vista.
+
+Cada nombre de URL de appsocios, appadmincontenido, appdashboard y applogin declara
+cuántas consultas y cuántos milisegundos (p95) puede costar un GET sobre el dataset
+DATASET. Los tests de appdashboard fallan si una vista se pasa de su presupuesto de
+consultas o si aparece una URL nueva sin presupuesto ni exención; los milisegundos
+dependen de la máquina y solo se verifican con la variable de entorno
+VERIFICAR_MS_PRESUPUESTOS=1.
+"""
+import math
+
+from appadmincontenido.models import Actividad, Articulo, Evento, Noticia, Reportaje
+from appsocios.models import Empresa, Region, Rubro, Socio, TipoComercializacion
+from .models import MensajeContacto
+
+# Tamaño de los datos con que se miden los presupuestos (argumentos de populate_db)
+DATASET = {'socios': 60, 'empresas': 300, 'posts': 40, 'eventos': 20, 'bloques_per_post': 2}
+MENSAJES = 30
+
+# Centro del mapa y zoom con que se pide la tesela de empresas
+LATITUD_MAPA, LONGITUD_MAPA, ZOOM_MAPA = -34.98, -71.24, 12
+
+ANONIMO, ADMIN, SOCIO = 'anonimo', 'admin', 'socio'
+
+
+class Presupuesto:
+    """Límite de consultas y de p95 en ms de un GET a una URL con nombre."""
+
+    def __init__(self, consultas, ms, cliente=ANONIMO, args=None, parametros=None, sesion=None):
+        self.consultas = consultas
+        self.ms = ms
+        self.cliente = cliente
+        # args y sesion son funciones: las claves y slugs solo se conocen después de poblar
+        self.args = args
+        self.parametros = parametros or {}
+        # Datos que la vista espera en la sesión de un visitante (solo cliente ANONIMO)
+        self.sesion = sesion
+
+    def argumentos(self):
+        return self.args() if self.args else []
+
+    def datos_sesion(self):
+        return self.sesion() if self.sesion else {}
+
+
+def _primero(modelo, campo='pk', **filtros):
+    return modelo.objects.filter(**filtros).order_by('pk').values_list(campo, flat=True).first()
+
+
+def _tesela():
+    n = 2 ** ZOOM_MAPA
+    latitud = math.radians(LATITUD_MAPA)
+    x = int((LONGITUD_MAPA + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(latitud)) / math.pi) / 2 * n)
+    return [ZOOM_MAPA, x, y]
+
+
+PRESUPUESTOS = {
+    'home': Presupuesto(3, 150),
+
+    # appadmincontenido
+    'appadmincontenido:articulos': Presupuesto(8, 250),
+    'appadmincontenido:articulo_detalle': Presupuesto(4, 150, args=lambda: [_primero(Articulo, 'slug')]),
+    'appadmincontenido:noticia_detalle': Presupuesto(4, 150, args=lambda: [_primero(Noticia, 'slug')]),
+    'appadmincontenido:reportaje_detalle': Presupuesto(4, 150, args=lambda: [_primero(Reportaje, 'slug')]),
+    'appadmincontenido:eventos': Presupuesto(4, 250),
+    'appadmincontenido:articulo_crear': Presupuesto(4, 200, ADMIN, args=lambda: ['articulo']),
+    'appadmincontenido:articulo_editar': Presupuesto(7, 200, ADMIN, args=lambda: [_primero(Articulo, 'slug'), 'articulo']),
+    'appadmincontenido:articulo_eliminar': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Articulo, 'slug'), 'articulo']),
+    'appadmincontenido:evento_crear': Presupuesto(3, 150, ADMIN),
+    'appadmincontenido:evento_editar': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Evento, 'slug')]),
+    'appadmincontenido:evento_eliminar': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Evento, 'slug')]),
+    'appadmincontenido:actividad_crear': Presupuesto(3, 150, ADMIN),
+    'appadmincontenido:actividad_editar': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Actividad, 'slug')]),
+    'appadmincontenido:actividad_eliminar': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Actividad, 'slug')]),
+
+    # appsocios
+    'appsocios:crear_socio': Presupuesto(8, 150),
+    'appsocios:crear_empresa': Presupuesto(7, 250, ADMIN),
+    'appsocios:buscar_socios': Presupuesto(3, 150, ADMIN, parametros={'q': '1'}),
+    'appsocios:editar_empresa': Presupuesto(8, 250, ADMIN, args=lambda: [_primero(Empresa)]),
+    'appsocios:datos_geograficos': Presupuesto(2, 100),
+    'appsocios:comunas_region': Presupuesto(2, 100, args=lambda: [_primero(Region)]),
+    'appsocios:lista_rubros': Presupuesto(1, 100),
+    'appsocios:crear_rubro': Presupuesto(0, 100),
+    'appsocios:editar_rubro': Presupuesto(1, 100, args=lambda: [_primero(Rubro)]),
+    'appsocios:eliminar_rubro': Presupuesto(1, 100, args=lambda: [_primero(Rubro)]),
+    'appsocios:lista_tipos_comercializacion': Presupuesto(1, 100),
+    'appsocios:crear_tipo_comercializacion': Presupuesto(0, 100),
+    'appsocios:editar_tipo_comercializacion': Presupuesto(1, 100, args=lambda: [_primero(TipoComercializacion)]),
+    'appsocios:eliminar_tipo_comercializacion': Presupuesto(1, 100, args=lambda: [_primero(TipoComercializacion)]),
+    # El camino real: la empresa recién creada queda en la sesión del visitante
+    'appsocios:encuesta': Presupuesto(3, 150, sesion=lambda: {'empresa_id': _primero(Empresa)}),
+    'appsocios:continuar_encuesta': Presupuesto(7, 100, ADMIN, args=lambda: [_primero(Empresa)]),
+    'appsocios:lista_empresas': Presupuesto(2, 400),
+    'appsocios:empresas_cercanas': Presupuesto(
+        5, 150, parametros={'lat': LATITUD_MAPA, 'lng': LONGITUD_MAPA, 'n': 20},
+    ),
+    'appsocios:empresas_tesela': Presupuesto(2, 150, args=_tesela),
+    'appsocios:editar_socio': Presupuesto(14, 150, SOCIO),
+    'appsocios:cambiar_contrasena': Presupuesto(4, 150, SOCIO),
+
+    # appdashboard
+    'appdashboard:home': Presupuesto(7, 200, ADMIN),
+    'appdashboard:buscar': Presupuesto(5, 200, ADMIN, parametros={'q': 'empresa'}),
+    'appdashboard:lista_socios': Presupuesto(5, 400, ADMIN),
+    'appdashboard:exportar_socios': Presupuesto(4, 150, ADMIN),
+    'appdashboard:detalle_socio': Presupuesto(8, 150, ADMIN, args=lambda: [_primero(Socio)]),
+    'appdashboard:lista_solicitudes': Presupuesto(5, 200, ADMIN),
+    'appdashboard:gestionar_solicitud': Presupuesto(5, 150, ADMIN, args=lambda: [_primero(Empresa)]),
+    'appdashboard:lista_empresas_admin': Presupuesto(5, 250, ADMIN),
+    'appdashboard:exportar_empresas': Presupuesto(4, 200, ADMIN),
+    'appdashboard:eliminar_empresa_admin': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(Empresa)]),
+    'appdashboard:lista_mensajes': Presupuesto(5, 200, ADMIN),
+    'appdashboard:exportar_mensajes': Presupuesto(4, 150, ADMIN),
+    'appdashboard:detalle_mensaje': Presupuesto(4, 150, ADMIN, args=lambda: [_primero(MensajeContacto)]),
+    'appdashboard:perfilado': Presupuesto(3, 150, ADMIN),
+    'appdashboard:enviar_contacto': Presupuesto(0, 100),
+
+    # applogin
+    'applogin:iniciar': Presupuesto(0, 100),
+    'applogin:registro': Presupuesto(0, 100),
+    'applogin:home': Presupuesto(3, 150),
+}
+
+# URLs que no se pueden medir con un GET, con el motivo
+EXENTAS = {
+    'appdashboard:marcar_mensaje_leido': "solo acepta POST",
+    'applogin:salir': "cierra la sesión del cliente que se está midiendo",
+    'appsocios:empresas': "la plantilla appsocios/empresas.html no existe",
+    'appsocios:login_socio': "un GET solo redirige a applogin:iniciar; el POST lo cubre PrimerIngresoSocioTests",
+}
+
@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appadmincontenido.models import (
+    Articulo, Noticia, Reportaje, BloqueArticulo, BloqueNoticia, BloqueReportaje
+)
+from appsocios.models import Empresa, Socio
+from .models import MensajeContacto
+from . import busqueda, contadores, estadisticas
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_save, sender=Socio)
+@receiver(post_save, sender=Articulo)
+@receiver(post_save, sender=Noticia)
+@receiver(post_save, sender=Reportaje)
+def indexar_documento(sender, instance, update_fields=None, **kwargs):
+    """Señal que mantiene al día el índice de búsqueda al crear o editar"""
+    tipo = busqueda.tipo_de(instance)
+    if update_fields is not None and not busqueda.CAMPOS_INDEXADOS[tipo] & set(update_fields):
+        # p. ej. el rehash de la contraseña o el cambio de estado de una solicitud
+        return
+    busqueda.indexar_al_confirmar(tipo, instance.pk)
+
+
+@receiver(post_delete, sender=Empresa)
+@receiver(post_delete, sender=Socio)
+@receiver(post_delete, sender=Articulo)
+@receiver(post_delete, sender=Noticia)
+@receiver(post_delete, sender=Reportaje)
+def desindexar_documento(sender, instance, **kwargs):
+    busqueda.indexar_al_confirmar(busqueda.tipo_de(instance), instance.pk)
+
+
+# Tipo de la publicación de cada bloque y campo que la referencia
+_PUBLICACION_DE_BLOQUE = {
+    BloqueArticulo: (busqueda.ARTICULO, 'articulo_id'),
+    BloqueNoticia: (busqueda.NOTICIA, 'noticia_id'),
+    BloqueReportaje: (busqueda.REPORTAJE, 'reportaje_id'),
+}
+
+
+@receiver([post_save, post_delete], sender=BloqueArticulo)
+@receiver([post_save, post_delete], sender=BloqueNoticia)
+@receiver([post_save, post_delete], sender=BloqueReportaje)
+def reindexar_publicacion(sender, instance, **kwargs):
+    """El texto de los bloques se indexa junto a su publicación, una vez por transacción"""
+    tipo, campo = _PUBLICACION_DE_BLOQUE[sender]
+    busqueda.indexar_al_confirmar(tipo, getattr(instance, campo))
+
+
+@receiver([post_save, post_delete], sender=Empresa)
+@receiver([post_save, post_delete], sender=Socio)
+@receiver([post_save, post_delete], sender=MensajeContacto)
+def invalidar_estadisticas(sender, **kwargs):
+    """Los contadores del dashboard se recalculan en la próxima visita"""
+    estadisticas.invalidar_estadisticas()
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_save, sender=Socio)
+@receiver(post_save, sender=MensajeContacto)
+def actualizar_contadores(sender, instance, created, update_fields=None, **kwargs):
+    """Ajusta los contadores materializados del dashboard en la misma transacción"""
+    contadores.registrar_guardado(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Empresa)
+@receiver(post_delete, sender=Socio)
+@receiver(post_delete, sender=MensajeContacto)
+def descontar_contadores(sender, instance, **kwargs):
+    contadores.registrar_eliminacion(instance)
@@ -1,3 +1,481 @@
-from django.test import TestCase
+import csv
+import io
+import os
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, reset_queries, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.http import HttpResponseNotFound
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from applogin.backends import usuario_de_socio
+from appsocios.models import Empresa, Socio
+from descubrecurico import perfilado
+from . import benchmark, busqueda, contadores, estadisticas, presupuestos
+from .models import DocumentoBusqueda, MensajeContacto
+
+
+def crear_datos(socios=4, empresas=16, posts=0, eventos=0, mensajes=6, **opciones):
+    """Puebla la base con populate_db y los mensajes de contacto que populate_db no crea."""
+    call_command(
+        'populate_db', socios=socios, empresas=empresas, posts=posts, eventos=eventos,
+        stdout=io.StringIO(), **opciones,
+    )
+    MensajeContacto.objects.bulk_create(
+        MensajeContacto(
+            nombre=f"Contacto {i}", email=f"contacto{i}@example.com",
+            mensaje="Consulta de prueba", leido=i % 3 == 0,
+        )
+        for i in range(mensajes)
+    )
+    contadores.reconstruir()
+
+
+def cliente_socio():
+    cliente = Client()
+    cliente.force_login(usuario_de_socio(Socio.objects.order_by('pk').first()))
+    return cliente
+
+
+class DatosDashboardTestCase(TestCase):
+    """Tests sobre datos de populate_db; cada clase pide en DATOS solo lo que usa."""
+
+    # Argumentos de crear_datos()
+    DATOS = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos(**cls.DATOS)
+
+    def setUp(self):
+        cache.clear()
+
+
+class PresupuestosVistasTests(DatosDashboardTestCase):
+    """Cada vista debe mantenerse dentro de su presupuesto de consultas (y de tiempo, si se pide)."""
+
+    APPS = ('appsocios', 'appadmincontenido', 'appdashboard', 'applogin')
+    DATOS = {**presupuestos.DATASET, 'mensajes': presupuestos.MENSAJES}
+    REPETICIONES = 3
+    # Los tiempos dependen de la máquina: solo se comparan si se pide explícitamente
+    VERIFICAR_MS = os.environ.get('VERIFICAR_MS_PRESUPUESTOS') == '1'
+
+    def setUp(self):
+        super().setUp()
+        self.clientes = {
+            presupuestos.ANONIMO: Client(),
+            presupuestos.ADMIN: benchmark.cliente_admin(),
+            presupuestos.SOCIO: cliente_socio(),
+        }
+
+    def cliente_de(self, presupuesto):
+        datos = presupuesto.datos_sesion()
+        if not datos:
+            return self.clientes[presupuesto.cliente]
+        # Un cliente propio para no dejar la sesión en el visitante compartido
+        cliente = Client()
+        sesion = cliente.session
+        sesion.update(datos)
+        sesion.save()
+        return cliente
+
+    def test_todas_las_urls_tienen_presupuesto(self):
+        for app in self.APPS:
+            urls = import_module(f'{app}.urls')
+            for patron in urls.urlpatterns:
+                nombre = f'{urls.app_name}:{patron.name}'
+                with self.subTest(url=nombre):
+                    self.assertTrue(
+                        nombre in presupuestos.PRESUPUESTOS or nombre in presupuestos.EXENTAS,
+                        f"{nombre} no tiene presupuesto en appdashboard/presupuestos.py",
+                    )
+
+    def test_vistas_dentro_del_presupuesto(self):
+        for nombre, presupuesto in presupuestos.PRESUPUESTOS.items():
+            with self.subTest(url=nombre):
+                url = reverse(nombre, args=presupuesto.argumentos())
+                resultado = benchmark.medir(
+                    self.cliente_de(presupuesto), url, presupuesto.parametros,
+                    repeticiones=self.REPETICIONES,
+                )
+                self.assertLess(resultado['status'], 400)
+                self.assertLessEqual(
+                    resultado['consultas'], presupuesto.consultas,
+                    f"{nombre} hizo {resultado['consultas']} consultas (presupuesto: {presupuesto.consultas})",
+                )
+                if self.VERIFICAR_MS:
+                    self.assertLessEqual(
+                        resultado['p95_ms'], presupuesto.ms,
+                        f"{nombre} tardó {resultado['p95_ms']} ms en p95 (presupuesto: {presupuesto.ms} ms)",
+                    )
+
+    def test_encuesta_se_mide_con_la_empresa_en_sesion(self):
+        presupuesto = presupuestos.PRESUPUESTOS['appsocios:encuesta']
+        respuesta = self.cliente_de(presupuesto).get(reverse('appsocios:encuesta'))
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class EstadisticasTests(DatosDashboardTestCase):
+
+    def test_contadores_coinciden_con_los_conteos(self):
+        # Una consulta para los contadores y una por cada lista de "últimos"
+        with self.assertNumQueries(4):
+            datos = estadisticas.estadisticas()
+        self.assertEqual(datos['total_socios'], Socio.objects.count())
+        self.assertEqual(datos['total_empresas'], Empresa.objects.count())
+        self.assertEqual(
+            datos['solicitudes_pendientes'], Empresa.objects.filter(estado_solicitud='pendiente').count()
+        )
+        self.assertEqual(datos['mensajes_no_leidos'], MensajeContacto.objects.filter(leido=False).count())
+
+    def test_instantanea_en_cache_hasta_una_escritura(self):
+        antes = estadisticas.estadisticas()
+        with self.assertNumQueries(0):
+            estadisticas.estadisticas()
+            estadisticas.contadores()
+
+        MensajeContacto.objects.create(nombre='Ana', email='ana@example.com', mensaje='Hola')
+        self.assertEqual(estadisticas.contadores()['mensajes_no_leidos'], antes['mensajes_no_leidos'] + 1)
+        self.assertEqual(estadisticas.estadisticas()['mensajes_no_leidos'], antes['mensajes_no_leidos'] + 1)
+
+
+class ContadoresTests(DatosDashboardTestCase):
+
+    def assertContadoresExactos(self):
+        self.assertEqual(contadores.verificar(), {})
+
+    def test_alta_cambio_y_baja_de_empresa(self):
+        self.assertContadoresExactos()
+        empresa = Empresa.objects.create(nombre='Viña Nueva')
+        self.assertContadoresExactos()
+
+        empresa = Empresa.objects.get(pk=empresa.pk)
+        empresa.estado_solicitud, empresa.estado_pago, empresa.activo = 'aprobada', 'pagado', True
+        empresa.save()
+        self.assertContadoresExactos()
+
+        empresa.delete()
+        self.assertContadoresExactos()
+
+    def test_cambio_desde_instancia_con_campos_diferidos(self):
+        empresa = Empresa.objects.only('nombre').filter(estado_solicitud='pendiente').first()
+        empresa.estado_solicitud = 'rechazada'
+        empresa.save()
+        self.assertContadoresExactos()
+
+    def test_mensaje_leido_y_rollback(self):
+        mensaje = MensajeContacto.objects.filter(leido=False).first()
+        mensaje.leido = True
+        mensaje.save(update_fields=['leido'])
+        self.assertContadoresExactos()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            MensajeContacto.objects.create(nombre='Ana', email='ana@example.com', mensaje='Hola')
+            raise RuntimeError
+        self.assertContadoresExactos()
+
+    def test_escrituras_intercaladas_con_instancias_desactualizadas(self):
+        # Dos peticiones cargan la misma fila antes de que cualquiera la guarde
+        pk = MensajeContacto.objects.filter(leido=False).values_list('pk', flat=True).first()
+        primera, segunda = MensajeContacto.objects.get(pk=pk), MensajeContacto.objects.get(pk=pk)
+        primera.leido = segunda.leido = True
+        primera.save()
+        segunda.save()
+        self.assertContadoresExactos()
+
+        pk = Empresa.objects.filter(estado_solicitud='pendiente').values_list('pk', flat=True).first()
+        primera, segunda = Empresa.objects.get(pk=pk), Empresa.objects.get(pk=pk)
+        for empresa in (primera, segunda):
+            empresa.estado_solicitud, empresa.estado_pago = 'aprobada', 'pagado'
+            empresa.save(update_fields=['estado_solicitud', 'estado_pago'])
+        self.assertContadoresExactos()
+
+        primera.delete()
+        segunda.delete()
+        self.assertContadoresExactos()
+
+    def test_escritura_revertida_no_mueve_los_contadores(self):
+        mensaje = MensajeContacto.objects.filter(leido=False).first()
+        antes = contadores.leer()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            mensaje.leido = True
+            mensaje.save()
+            raise RuntimeError
+        self.assertEqual(contadores.leer(), antes)
+
+    def test_guardado_sin_campos_con_contador_no_bloquea(self):
+        socio = Socio.objects.first()
+        empresa = Empresa.objects.first()
+        # Solo el UPDATE: sin SELECT ... FOR UPDATE ni ajuste de contadores
+        with self.assertNumQueries(1):
+            socio.save(update_fields=['socio_contraseña'])
+        with self.assertNumQueries(1):
+            empresa.save(update_fields=['telefono'])
+        with self.assertNumQueries(1):
+            socio.save()
+        self.assertContadoresExactos()
+
+    def test_filtros_usan_los_contadores(self):
+        valores = contadores.leer()
+        self.assertEqual(
+            contadores.conteo_empresas(valores, activo='si'), Empresa.objects.filter(activo=True).count()
+        )
+        self.assertIsNone(contadores.conteo_empresas(valores, activo='si', estado_pago='pagado'))
+
+
+class ExportarTests(DatosDashboardTestCase):
+    DATOS = {'sin_indice': True}
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = benchmark.cliente_admin()
+
+    def descargar(self, nombre, parametros=None):
+        respuesta = self.cliente.get(reverse(nombre), parametros or {})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(contenido)))
+
+    def test_exportaciones_tienen_una_fila_por_registro(self):
+        casos = [
+            ('appdashboard:exportar_socios', Socio.objects.count()),
+            ('appdashboard:exportar_empresas', Empresa.objects.count()),
+            ('appdashboard:exportar_mensajes', MensajeContacto.objects.count()),
+        ]
+        for nombre, cantidad in casos:
+            with self.subTest(url=nombre):
+                self.assertEqual(len(self.descargar(nombre)), cantidad + 1)
+
+    def test_empresas_respetan_los_filtros_del_listado(self):
+        filas = self.descargar('appdashboard:exportar_empresas', {'estado_solicitud': 'pendiente', 'activo': 'no'})
+        esperadas = Empresa.objects.filter(estado_solicitud='pendiente', activo=False).count()
+        self.assertEqual(len(filas), esperadas + 1)
+        columna = filas[0].index('Estado solicitud')
+        self.assertEqual({fila[columna] for fila in filas[1:]}, {'pendiente'})
+
+    def test_texto_no_se_interpreta_como_formula(self):
+        MensajeContacto.objects.create(nombre='=HYPERLINK("x")', email='a@example.com', mensaje='Hola')
+        MensajeContacto.objects.create(nombre='+cmd|calc', email='b@example.com', mensaje='-1+1', telefono='+56 9 1234 5678')
+        filas = self.descargar('appdashboard:exportar_mensajes')
+        self.assertIn("'=HYPERLINK(\"x\")", [fila[1] for fila in filas])
+        fila = next(fila for fila in filas if fila[2] == 'b@example.com')
+        self.assertEqual(fila[1:5], ["'+cmd|calc", 'b@example.com', '+56 9 1234 5678', "'-1+1"])
+
+    def test_solo_administradores(self):
+        respuesta = cliente_socio().get(reverse('appdashboard:exportar_mensajes'))
+        self.assertFalse(respuesta.streaming)
+
+
+class BusquedaComoFiltroTests(TestCase):
+    """Usada como filtro de un listado, la búsqueda no debe cortar coincidencias."""
+
+    CANTIDAD = 60  # más que el tope de ids_coincidentes
+
+    @classmethod
+    def setUpTestData(cls):
+        # El índice se escribe al confirmar la transacción
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(cls.CANTIDAD):
+                publica = i % 2 == 0
+                # Las no públicas repiten el término en el detalle y puntúan más alto
+                Empresa.objects.create(
+                    nombre=f"Viña {i}", calle="" if publica else "Camino Viña",
+                    estado_solicitud='aprobada', estado_pago='pagado', activo=True, encuesta_respondida=publica,
+                )
+
+    def test_filtrar_no_tiene_tope(self):
+        self.assertEqual(len(busqueda.ids_coincidentes('viña', busqueda.EMPRESA)), 50)
+        self.assertEqual(busqueda.filtrar(Empresa.objects.all(), 'viña', busqueda.EMPRESA).count(), self.CANTIDAD)
+
+    def test_consulta_sin_terminos_no_filtra(self):
+        for consulta in ('de', 'de la', '¿?'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(
+                    busqueda.filtrar(Empresa.objects.all(), consulta, busqueda.EMPRESA).count(), self.CANTIDAD
+                )
+        cache.clear()
+        respuesta = self.client.get(reverse('appsocios:lista_empresas'), {'q': 'de'})
+        self.assertEqual(len(respuesta.context['empresas']), Empresa.publicas.count())
+
+    def test_directorio_no_pierde_empresas_publicas(self):
+        cache.clear()
+        respuesta = self.client.get(reverse('appsocios:lista_empresas'), {'q': 'viña'})
+        self.assertEqual(len(respuesta.context['empresas']), Empresa.publicas.count())
+
+    def test_listado_admin_cuenta_todas_las_coincidencias(self):
+        respuesta = benchmark.cliente_admin().get(reverse('appdashboard:lista_empresas_admin'), {'q': 'viña'})
+        self.assertEqual(respuesta.context['total_empresas'], self.CANTIDAD)
+
+    def test_listado_admin_cuenta_solo_en_la_primera_pagina(self):
+        cliente, url = benchmark.cliente_admin(), reverse('appdashboard:lista_empresas_admin')
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        primera = cliente.get(url, {'q': 'viña'}, **ajax).json()
+        self.assertEqual(primera['count'], self.CANTIDAD)
+        siguiente = cliente.get(url, {'q': 'viña', 'cursor': primera['next']}, **ajax).json()
+        self.assertNotIn('count', siguiente)
+        self.assertTrue(siguiente['html'])
+
+
+class IndiceDesdeSenalesTests(TestCase):
+    def test_se_indexa_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa = Empresa.objects.create(nombre="Viña Nueva")
+            self.assertEqual(busqueda.ids_coincidentes('nueva', busqueda.EMPRESA), [])
+        self.assertEqual(busqueda.ids_coincidentes('nueva', busqueda.EMPRESA), [empresa.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa.delete()
+        self.assertFalse(DocumentoBusqueda.objects.exists())
+
+    def test_guardado_sin_campos_indexados_no_reindexa(self):
+        empresa = Empresa.objects.create(nombre="Viña Nueva")
+        with self.captureOnCommitCallbacks() as callbacks:
+            empresa.estado_solicitud = 'aprobada'
+            empresa.save(update_fields=['estado_solicitud'])
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            empresa.nombre = "Viña Vieja"
+            empresa.save(update_fields=['nombre'])
+        self.assertTrue(callbacks)
+
+    def test_guardado_revertido_no_escribe_en_el_indice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Empresa.objects.create(nombre="Viña Fugaz")
+                raise RuntimeError
+        self.assertFalse(DocumentoBusqueda.objects.exists())
+
+    def test_bloques_reindexan_la_publicacion_una_vez(self):
+        from appadmincontenido.models import Articulo, BloqueArticulo
+        articulo = Articulo.objects.create(titulo="Vendimia")
+        with mock.patch.object(busqueda, 'indexar', wraps=busqueda.indexar) as indexar:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(5):
+                    BloqueArticulo.objects.create(articulo=articulo, texto=f"Cepa {i} carmenere")
+        indexar.assert_called_once()
+        self.assertEqual(busqueda.ids_coincidentes('carmenere', busqueda.ARTICULO), [articulo.pk])
+
+
+class PopulateDbTests(TestCase):
+    def poblar(self, seed):
+        call_command(
+            'populate_db', socios=5, empresas=8, posts=0, eventos=0, seed=seed, sin_indice=True,
+            stdout=io.StringIO(),
+        )
+
+    def test_ruts_dependen_de_la_semilla(self):
+        ruts = {}
+        for seed in (1, 2):
+            self.poblar(seed)
+            ruts[seed] = set(Socio.objects.values_list('socio_rut', flat=True))
+            ruts[seed] |= set(Empresa.objects.values_list('rut', flat=True))
+            Empresa.objects.all().delete()
+            Socio.objects.all().delete()
+        self.assertEqual(len(ruts[1]), 13)
+        self.assertFalse(ruts[1] & ruts[2])
+
+    def test_no_choca_con_ruts_existentes(self):
+        self.poblar(42)
+        # Otras empresas ya tienen los RUT que sortea esta semilla
+        for empresa in Empresa.objects.all():
+            empresa.nombre = f"Otra {empresa.pk}"
+            empresa.save(update_fields=['nombre'])
+        self.poblar(42)
+        self.assertEqual(Empresa.objects.count(), 16)
+        self.assertEqual(Empresa.objects.values('rut').distinct().count(), 16)
+
+
+class PoblarIndiceMigracionTests(TestCase):
+    def test_la_migracion_indexa_los_datos_existentes(self):
+        from appadmincontenido.models import Articulo, BloqueArticulo
+        Empresa.objects.create(nombre="Viña Antigua")
+        articulo = Articulo.objects.create(titulo="Vendimia")
+        BloqueArticulo.objects.create(articulo=articulo, texto="Carmenere del valle")
+        # Como en una base anterior al índice
+        DocumentoBusqueda.objects.all().delete()
+
+        migracion = import_module('appdashboard.migrations.0004_poblar_indice_busqueda')
+        estado = MigrationLoader(connection).project_state(('appdashboard', '0004_poblar_indice_busqueda'))
+        migracion.poblar_indice(estado.apps, None)
+
+        self.assertEqual(busqueda.ids_coincidentes('antigua', busqueda.EMPRESA), [Empresa.objects.get().pk])
+        documento, = busqueda.buscar('carmenere', tipos=[busqueda.ARTICULO])
+        self.assertEqual(documento.url, articulo.get_absolute_url())
+
+
+@override_settings(PERFILADO_TOKEN='token')
+class PerfiladoResumenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def perfilar(self, ruta, respuesta):
+        middleware = perfilado.PerfiladoMiddleware(lambda request: respuesta)
+        middleware(RequestFactory().get(ruta, HTTP_X_PERFILADO='token'))
+
+    def test_rutas_sin_vista_se_agrupan(self):
+        for i in range(5):
+            self.perfilar(f'/no-existe-{i}/', HttpResponseNotFound())
+        filas = perfilado.resumen()
+        self.assertEqual([fila['vista'] for fila in filas], [perfilado.SIN_RUTA])
+        self.assertEqual(filas[0]['peticiones'], 5)
+
+    def test_cada_vista_en_su_clave_y_con_tope(self):
+        with mock.patch.object(perfilado, 'MAX_VISTAS', 2):
+            for vista in ('a', 'b', 'c', 'a'):
+                perfilado._acumular(vista, 1.0, perfilado.Perfil())
+        self.assertEqual(
+            {fila['vista']: fila['peticiones'] for fila in perfilado.resumen()}, {'a': 2, 'b': 1}
+        )
+        self.assertIsNone(cache.get(perfilado._clave_vista('c')))
+
+        perfilado.reiniciar_resumen()
+        self.assertEqual(perfilado.resumen(), [])
+        self.assertIsNone(cache.get(perfilado._clave_vista('a')))
+
+
+class BenchmarkTests(DatosDashboardTestCase):
+    DATOS = {'socios': 2, 'empresas': 4, 'posts': 2, 'mensajes': 0, 'sin_indice': True}
+
+    def test_percentil(self):
+        self.assertEqual(benchmark.percentil([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(benchmark.percentil([5], 95), 5)
+        self.assertAlmostEqual(benchmark.percentil(range(1, 101), 95), 95.05)
+        self.assertIsNone(benchmark.percentil([], 50))
+
+    def test_medir_cuenta_las_consultas_de_una_peticion(self):
+        url = reverse('appadmincontenido:articulos')
+        cache.clear()
+        # Como en medir(), se parte con el registro de consultas vacío
+        reset_queries()
+        with CaptureQueriesContext(connection) as consultas:
+            Client().get(url)
+        esperadas = len(consultas)
+        resultado = benchmark.medir(Client(), url, repeticiones=3)
+        self.assertEqual(resultado['status'], 200)
+        self.assertEqual(resultado['consultas'], esperadas)
+        self.assertEqual(resultado['repeticiones'], 3)
+        self.assertLessEqual(resultado['p50_ms'], resultado['p95_ms'])
+        self.assertGreater(resultado['memoria_pico_kib'], 0)
+
+    def test_escenarios(self):
+        resultados = benchmark.ejecutar(repeticiones=1)
+        self.assertTrue({'home', 'articulos', 'lista_empresas', 'articulo_detalle', 'lista_empresas_admin'} <= set(resultados))
+        for nombre, resultado in resultados.items():
+            with self.subTest(escenario=nombre):
+                self.assertEqual(resultado['status'], 200)
+
+    def test_solo_mide_los_escenarios_filtrados(self):
+        self.assertEqual(list(benchmark.ejecutar(repeticiones=1, filtro='detalle')), [
+            'articulo_detalle', 'noticia_detalle', 'reportaje_detalle',
+        ])
+
+    def test_comando_rechaza_repeticiones_invalidas(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', repeticiones=0, stdout=io.StringIO())
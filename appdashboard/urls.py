@@ -5,14 +5,19 @@ app_name = 'appdashboard'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('buscar/', views.buscar, name='buscar'),
     path('socios/', views.lista_socios, name='lista_socios'),
+    path('socios/exportar/', views.exportar_socios, name='exportar_socios'),
     path('socios/<int:socio_id>/', views.detalle_socio, name='detalle_socio'),
     path('solicitudes/', views.lista_solicitudes, name='lista_solicitudes'),
     path('solicitudes/<int:empresa_id>/', views.gestionar_solicitud, name='gestionar_solicitud'),
     path('empresas/', views.lista_empresas_admin, name='lista_empresas_admin'),
+    path('empresas/exportar/', views.exportar_empresas, name='exportar_empresas'),
     path('empresas/eliminar/<int:empresa_id>/', views.eliminar_empresa_admin, name='eliminar_empresa_admin'),
     path('mensajes/', views.lista_mensajes, name='lista_mensajes'),
+    path('mensajes/exportar/', views.exportar_mensajes, name='exportar_mensajes'),
     path('mensajes/<int:mensaje_id>/', views.detalle_mensaje, name='detalle_mensaje'),
     path('mensajes/marcar/<int:mensaje_id>/', views.marcar_mensaje_leido, name='marcar_mensaje_leido'),
+    path('perfilado/', views.perfilado_vistas, name='perfilado'),
     path('contacto/enviar/', views.contacto, name='enviar_contacto'),
 ]
@@ -2,35 +2,24 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.template.loader import render_to_string
 from django.contrib import messages
-from applogin.utils import es_admin, es_socio
+from applogin.utils import principal_de
 from applogin.decorators import solo_admin, solo_socio
 from appsocios.models import Socio, Empresa
+from descubrecurico.paginacion import CursorPaginator
+from descubrecurico import perfilado
 from .models import MensajeContacto
+from . import busqueda, contadores, estadisticas, exportar
 
 @solo_socio
 def home(request):
-    if es_admin(request.user):
-        # Datos para el Dashboard Admin
-        ultimos_socios = Socio.objects.order_by('-socio_id')[:5]
-        ultimas_empresas = Empresa.objects.select_related('rubro').order_by('-fecha_creacion')[:5]
-        solicitudes_recientes = Empresa.objects.filter(estado_solicitud='pendiente').order_by('fecha_creacion')[:5]
-        mensajes_no_leidos = MensajeContacto.objects.filter(leido=False).count()
-
-        context = {
-            'total_socios': Socio.objects.count(),
-            'total_empresas': Empresa.objects.count(),
-            'solicitudes_pendientes': Empresa.objects.filter(estado_solicitud='pendiente').count(),
-            'mensajes_no_leidos': mensajes_no_leidos,
-            'ultimos_socios': ultimos_socios,
-            'ultimas_empresas': ultimas_empresas,
-            'solicitudes_recientes': solicitudes_recientes,
-            'es_admin': True,
-        }
+    principal = principal_de(request)
+    if principal.es_admin:
+        # Contadores y últimos registros en una instantánea compartida (ver estadisticas.py)
+        context = {**estadisticas.estadisticas(), 'es_admin': True}
         return render(request, 'appdashboard/home.html', context)
     
-    elif es_socio(request.user) or request.session.get('es_socio_login'):
-        socio_id = request.session.get('socio_id')
-        socio = get_object_or_404(Socio, socio_id=socio_id)
+    elif principal.es_socio:
+        socio = get_object_or_404(Socio, socio_id=principal.socio_id)
         empresas = Empresa.objects.filter(socio=socio)
         context = {'socio': socio, 'empresas': empresas}
         return render(request, 'appdashboard/home_socio.html', context)
@@ -39,9 +28,13 @@ def home(request):
 
 @solo_admin
 def lista_socios(request):
-    socios = Socio.objects.all().prefetch_related('empresas')
+    socios = Socio.objects.all().select_related('socio_comuna').prefetch_related('empresas')
+    q = request.GET.get('q', '').strip()
+    if q:
+        socios = busqueda.filtrar(socios, q, busqueda.SOCIO)
     context = {
         'socios': socios,
+        'filtro_q': q,
         'es_admin': True,
     }
     return render(request, 'appdashboard/lista_socios_admin.html', context)
@@ -49,8 +42,8 @@ def lista_socios(request):
 @solo_admin
 def detalle_socio(request, socio_id):
     try:
-        socio = Socio.objects.get(socio_id=socio_id)
-        empresas = socio.empresas.all()
+        socio = Socio.objects.select_related('socio_comuna', 'socio_region').get(socio_id=socio_id)
+        empresas = socio.empresas.select_related('rubro')
         context = {
             'socio': socio,
             'empresas': empresas,
@@ -63,12 +56,12 @@ def detalle_socio(request, socio_id):
 @solo_admin
 def lista_solicitudes(request):
     # Ordenar por fecha de creación ascendente (las más antiguas primero para atenderlas antes)
-    solicitudes = Empresa.objects.filter(estado_solicitud='pendiente').order_by('fecha_creacion')
+    solicitudes = Empresa.objects.filter(estado_solicitud='pendiente').select_related('socio', 'rubro').order_by('fecha_creacion')
     return render(request, 'appdashboard/lista_solicitudes.html', {'solicitudes': solicitudes})
 
 @solo_admin
 def gestionar_solicitud(request, empresa_id):
-    empresa = get_object_or_404(Empresa, id_empresa=empresa_id)
+    empresa = get_object_or_404(Empresa.objects.select_related('socio', 'rubro'), id_empresa=empresa_id)
     
     if request.method == 'POST':
         nuevo_estado = request.POST.get('estado_solicitud')
@@ -79,7 +72,8 @@ def gestionar_solicitud(request, empresa_id):
         if nuevo_pago: empresa.estado_pago = nuevo_pago
         if nuevo_activo: empresa.activo = (nuevo_activo == 'True')
         
-        empresa.save()
+        # save() recalcula visible_publico junto con los estados
+        empresa.save(update_fields=['estado_solicitud', 'estado_pago', 'activo'])
         
         if empresa.estado_solicitud == 'pendiente':
             return redirect('appdashboard:lista_solicitudes')
@@ -88,16 +82,16 @@ def gestionar_solicitud(request, empresa_id):
         
     return render(request, 'appdashboard/detalle_solicitud.html', {'empresa': empresa})
 
-@solo_admin
-def lista_empresas_admin(request):
-    # Ordenar por fecha de creación descendente (las más nuevas primero)
-    empresas = Empresa.objects.all().select_related('socio', 'rubro').order_by('-fecha_creacion')
-    
-    # Filtros
+def _filtrar_empresas(empresas, request):
+    """Filtros de lista_empresas_admin, compartidos con la exportación a CSV."""
     estado_solicitud = request.GET.get('estado_solicitud')
     estado_pago = request.GET.get('estado_pago')
     encuesta_respondida = request.GET.get('encuesta_respondida')
     activo = request.GET.get('activo')
+    q = request.GET.get('q', '').strip()
+
+    if q:
+        empresas = busqueda.filtrar(empresas, q, busqueda.EMPRESA)
 
     if estado_solicitud:
         empresas = empresas.filter(estado_solicitud=estado_solicitud)
@@ -116,21 +110,93 @@ def lista_empresas_admin(request):
             empresas = empresas.filter(activo=True)
         elif activo == 'no':
             empresas = empresas.filter(activo=False)
+    return empresas
+
+@solo_admin
+def lista_empresas_admin(request):
+    # Ordenar por fecha de creación descendente (las más nuevas primero)
+    empresas = _filtrar_empresas(
+        Empresa.objects.all().select_related('socio', 'rubro').order_by('-fecha_creacion'), request
+    )
+    estado_solicitud = request.GET.get('estado_solicitud')
+    estado_pago = request.GET.get('estado_pago')
+    encuesta_respondida = request.GET.get('encuesta_respondida')
+    activo = request.GET.get('activo')
+    q = request.GET.get('q', '').strip()
 
-    # Si es una petición AJAX, devolver solo las filas y el conteo
+    cursor = request.GET.get('cursor')
+
+    # Sin búsqueda y con a lo más un filtro, el total sale de los contadores materializados;
+    # si no, se cuenta en la base solo en la primera página: al avanzar con el cursor la
+    # lista conserva el total que ya muestra
+    valores = contadores.leer()
+    total_empresas = None if q else contadores.conteo_empresas(
+        valores, estado_solicitud=estado_solicitud, estado_pago=estado_pago,
+        encuesta_respondida=encuesta_respondida, activo=activo,
+    )
+    if total_empresas is None and not cursor:
+        total_empresas = empresas.count()
+
+    # Paginación por cursor (fecha_creacion, id_empresa): páginas profundas sin OFFSET
+    paginator = CursorPaginator(('-fecha_creacion', '-id_empresa'), por_pagina=50)
+    page_obj = paginator.get_page(empresas, cursor)
+
+    # Si es una petición AJAX, devolver solo las filas, el conteo (si se calculó) y los cursores
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        html = render_to_string('appdashboard/partials/lista_empresas_rows.html', {'empresas': empresas}, request=request)
-        return JsonResponse({'html': html, 'count': empresas.count()})
+        html = render_to_string('appdashboard/partials/lista_empresas_rows.html', {'empresas': page_obj}, request=request)
+        datos = {'html': html, 'next': page_obj.next_token, 'prev': page_obj.prev_token}
+        if total_empresas is not None:
+            datos['count'] = total_empresas
+        return JsonResponse(datos)
 
     context = {
-        'empresas': empresas,
+        'empresas': page_obj,
+        'page_obj': page_obj,
+        'total_empresas': total_empresas,
+        'conteos_filtros': contadores.por_dimension(valores),
         'filtro_solicitud': estado_solicitud,
         'filtro_pago': estado_pago,
         'filtro_encuesta': encuesta_respondida,
         'filtro_activo': activo,
+        'filtro_q': q,
     }
     return render(request, 'appdashboard/lista_empresas_admin.html', context)
 
+@solo_admin
+def exportar_empresas(request):
+    return exportar.empresas(_filtrar_empresas(Empresa.objects.all(), request))
+
+@solo_admin
+def exportar_socios(request):
+    socios = Socio.objects.all()
+    q = request.GET.get('q', '').strip()
+    if q:
+        socios = busqueda.filtrar(socios, q, busqueda.SOCIO)
+    return exportar.socios(socios)
+
+@solo_admin
+def exportar_mensajes(request):
+    return exportar.mensajes()
+
+@solo_admin
+def buscar(request):
+    """Búsqueda global sobre empresas, socios y publicaciones, en JSON."""
+    tipos = request.GET.getlist('tipo') or None
+    resultados = busqueda.buscar(request.GET.get('q', ''), tipos=tipos, limite=20)
+    return JsonResponse({
+        'resultados': [
+            {
+                'tipo': doc.tipo,
+                'id': doc.objeto_id,
+                'titulo': doc.titulo,
+                'detalle': doc.detalle,
+                'url': doc.url,
+                'puntaje': doc.puntaje,
+            }
+            for doc in resultados
+        ]
+    })
+
 @solo_admin
 def eliminar_empresa_admin(request, empresa_id):
     empresa = get_object_or_404(Empresa, id_empresa=empresa_id)
@@ -141,6 +207,25 @@ def eliminar_empresa_admin(request, empresa_id):
         
     return render(request, 'appdashboard/confirmar_eliminar_empresa.html', {'empresa': empresa})
 
+@solo_admin
+def perfilado_vistas(request):
+    """Resumen del perfilado por vista y activación del perfilado en la propia sesión."""
+    if request.method == 'POST':
+        accion = request.POST.get('accion')
+        if accion == 'activar':
+            request.session[perfilado.SESION_PERFILADO] = True
+        elif accion == 'desactivar':
+            request.session.pop(perfilado.SESION_PERFILADO, None)
+        elif accion == 'reiniciar':
+            perfilado.reiniciar_resumen()
+        return redirect('appdashboard:perfilado')
+
+    return render(request, 'appdashboard/perfilado.html', {
+        'vistas': perfilado.resumen(),
+        'perfilado_activo': request.session.get(perfilado.SESION_PERFILADO, False),
+        'es_admin': True,
+    })
+
 # --- Vistas de Contacto y Mensajería ---
 
 def contacto(request):
@@ -164,10 +249,9 @@ def contacto(request):
 @solo_admin
 def lista_mensajes(request):
     mensajes = MensajeContacto.objects.all()
-    mensajes_no_leidos = MensajeContacto.objects.filter(leido=False).count()
     return render(request, 'appdashboard/lista_mensajes.html', {
         'mensajes': mensajes, 
-        'mensajes_no_leidos': mensajes_no_leidos
+        'mensajes_no_leidos': estadisticas.contadores()['mensajes_no_leidos']
     })
 
 @solo_admin
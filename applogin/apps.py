@@ -6,4 +6,5 @@ class ApploginConfig(AppConfig):
     name = 'applogin'
     
     def ready(self):
+        import applogin.checks
         import applogin.signals
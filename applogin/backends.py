@@ -0,0 +1,84 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from appsocios.models import Socio, es_run, normalizar_run
+from .models import Rol, UsuarioRol
+from .utils import invalidar_roles, rol_de
+
+
+def _rol_socio():
+    rol, _ = Rol.objects.get_or_create(nombre='socio', defaults={'descripcion': 'Socio del gremio'})
+    return rol
+
+
+def _asignar_rol_socio(usuario):
+    UsuarioRol.objects.create(usuario=usuario, rol=_rol_socio())
+    # rol_de() ya pudo dejar None en el objeto y en la caché
+    invalidar_roles(usuario.pk)
+    usuario._rol_resuelto = 'socio'
+
+
+def usuario_de_socio(socio):
+    """Usuario de Django del socio, creándolo (o completándolo) con rol 'socio'."""
+    if socio.usuario_id:
+        usuario = socio.usuario
+        if rol_de(usuario) is None:
+            _asignar_rol_socio(usuario)
+        return usuario
+
+    with transaction.atomic():
+        usuario, creado = User.objects.get_or_create(
+            username=socio.socio_rut,
+            defaults={
+                'first_name': socio.socio_nombre,
+                'last_name': socio.socio_apellido_paterno,
+                'email': socio.socio_correo,
+            },
+        )
+        if not creado:
+            # El nombre de usuario lo tiene otra cuenta: no se vincula a ciegas
+            return None
+        usuario.set_unusable_password()
+        usuario.save(update_fields=['password'])
+        _asignar_rol_socio(usuario)
+        socio.usuario = usuario
+        socio.save(update_fields=['usuario'])
+    return usuario
+
+
+class RutOUsuarioBackend(ModelBackend):
+    """
+    Autenticación única para administradores y socios. Si lo ingresado es un RUN válido
+    se busca al socio y se verifica su contraseña; si no, se autentica como usuario de
+    Django. En ambos casos se calcula un solo hash por intento, exista o no la cuenta.
+
+    El socio queda autenticado como el usuario de Django vinculado a su ficha (se crea
+    con rol 'socio' la primera vez que entra), así que request.user funciona igual para
+    socios y administradores.
+
+    Reemplaza a ModelBackend en AUTHENTICATION_BACKENDS: si ambos estuvieran, un RUN
+    pasaría también por ModelBackend y se volvería a calcular el hash.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None or not es_run(username):
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        return self._autenticar_socio(normalizar_run(username), password)
+
+    def _autenticar_socio(self, rut, password):
+        socio = Socio.objects.select_related('usuario').filter(socio_rut=rut).first()
+        if socio is None or not socio.socio_contraseña:
+            # Mismo costo que un intento válido, para no revelar qué RUN existen
+            make_password(password)
+            return None
+
+        def actualizar_hash(password):
+            socio.socio_contraseña = make_password(password)
+            socio.save(update_fields=['socio_contraseña'])
+
+        if not check_password(password, socio.socio_contraseña, actualizar_hash):
+            return None
+        usuario = usuario_de_socio(socio)
+        return usuario if usuario is not None and self.user_can_authenticate(usuario) else None
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Error, Tags, Warning, register
+
+BACKEND_RUT = 'applogin.backends.RutOUsuarioBackend'
+
+# Backends que guardan los datos en la memoria de cada proceso
+CACHES_POR_PROCESO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartida(app_configs, **kwargs):
+    """
+    La caché de roles (applogin.utils.rol_de) y la versión de los datos geográficos
+    (appsocios.geografia) se invalidan escribiendo en la caché; con una caché por
+    proceso eso solo llega al worker que escribió y los demás siguen con el dato
+    anterior hasta TIMEOUT_ROL o TIMEOUT_VERSION.
+    """
+    backend = settings.CACHES.get(DEFAULT_CACHE_ALIAS, {}).get('BACKEND', '')
+    if backend not in CACHES_POR_PROCESO:
+        return []
+    return [
+        Warning(
+            f"La caché por defecto ({backend}) no se comparte entre procesos.",
+            hint="Con varios workers configure una caché compartida (Redis o Memcached) "
+                 "para que los cambios de rol y las invalidaciones lleguen a todos.",
+            id='applogin.W001',
+        )
+    ]
+
+
+@register(Tags.security)
+def backend_de_autenticacion(app_configs, **kwargs):
+    """Los socios ingresan con su RUN solo a través de RutOUsuarioBackend."""
+    if BACKEND_RUT in settings.AUTHENTICATION_BACKENDS:
+        return []
+    return [
+        Error(
+            f"AUTHENTICATION_BACKENDS no incluye {BACKEND_RUT}: los socios no podrán iniciar sesión.",
+            hint=f"Use AUTHENTICATION_BACKENDS = ['{BACKEND_RUT}'] (reemplaza a ModelBackend).",
+            id='applogin.E001',
+        )
+    ]
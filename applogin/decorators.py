@@ -1,6 +1,6 @@
 from functools import wraps
 from django.shortcuts import redirect, render
-from .utils import es_admin, es_socio
+from .utils import principal_de
 
 def solo_admin(view_func):
     """
@@ -10,14 +10,13 @@ def solo_admin(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
+        principal = principal_de(request)
         # Verificar si está autenticado (Django o Sesión Socio)
-        esta_autenticado = request.user.is_authenticated or request.session.get('es_socio_login')
-        
-        if not esta_autenticado:
+        if not principal.autenticado:
             return redirect('applogin:iniciar')
         
         # Solo los usuarios Django pueden ser admin
-        if request.user.is_authenticated and es_admin(request.user):
+        if principal.es_admin:
             return view_func(request, *args, **kwargs)
             
         return render(request, 'acceso_denegado.html', status=403)
@@ -29,12 +28,13 @@ def solo_socio(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        # Verificamos si es admin o socio (pasando request para validar sesión por RUT)
-        if es_admin(request.user) or es_socio(request.user, request):
+        principal = principal_de(request)
+        # Verificamos si es admin o socio (incluida la sesión por RUT)
+        if principal.es_admin or principal.es_socio:
             return view_func(request, *args, **kwargs)
             
         # Si no está autenticado de ninguna forma (ni Django ni sesión socio)
-        if not request.user.is_authenticated and not request.session.get('es_socio_login'):
+        if not principal.autenticado:
             return redirect('applogin:iniciar')
             
         # Si está autenticado pero no tiene permisos
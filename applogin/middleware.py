@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from .utils import Principal
+
+
+class PrincipalMiddleware:
+    """
+    Deja en request.principal al usuario (Django o socio por sesión) con su rol. Se
+    resuelve la primera vez que alguien lo consulta y a lo más una vez por petición.
+
+    Debe ir después de SessionMiddleware y AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: Principal(request))
+        return self.get_response(request)
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from applogin.models import Rol, UsuarioRol
+from applogin.utils import invalidar_roles
 
 
 @receiver(post_save, sender=User)
@@ -24,3 +25,19 @@ def asignar_rol_admin_a_superuser(sender, instance, created, **kwargs):
         except Exception:
             # Si ocurre un error, lo ignoramos para no romper el flujo de creación del usuario
             pass
+
+
+@receiver([post_save, post_delete], sender=UsuarioRol)
+def invalidar_rol_usuario(sender, instance, **kwargs):
+    """Señal que descarta el rol en caché del usuario al asignarlo, cambiarlo o quitarlo"""
+    invalidar_roles(instance.usuario_id)
+
+
+@receiver(post_save, sender=Rol)
+def invalidar_roles_del_rol(sender, instance, created, **kwargs):
+    """
+    Señal que descarta el rol en caché de todos los usuarios de un Rol modificado.
+    Al eliminar un Rol, sus UsuarioRol se borran en cascada y cada uno invalida el suyo.
+    """
+    if not created:
+        invalidar_roles(*UsuarioRol.objects.filter(rol=instance).values_list('usuario_id', flat=True))
@@ -1,3 +1,227 @@
-from django.test import TestCase
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from appsocios.models import Socio
+from . import utils
+from .models import Rol, UsuarioRol
+from .utils import es_admin, es_socio, principal_de
+
+
+@override_settings(AUTHENTICATION_BACKENDS=['applogin.backends.RutOUsuarioBackend'])
+class PrimerIngresoSocioTests(TestCase):
+    """Los socios de populate_db tienen usuario pero no rol: el primer ingreso debe bastar."""
+
+    CONTRASENA = "pass1234"
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', socios=2, empresas=0, posts=0, eventos=0, sin_indice=True, stdout=io.StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.socio = Socio.objects.select_related('usuario').order_by('pk').first()
+        self.assertFalse(UsuarioRol.objects.filter(usuario=self.socio.usuario).exists())
+
+    def test_primer_ingreso_por_iniciar(self):
+        respuesta = self.client.post(
+            reverse('applogin:iniciar'), {'username': self.socio.socio_rut, 'password': self.CONTRASENA}
+        )
+        self.assertRedirects(respuesta, reverse('appdashboard:home'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('appdashboard:home')).status_code, 200)
+
+    def test_primer_ingreso_por_login_socio(self):
+        respuesta = self.client.post(
+            reverse('appsocios:login_socio'), {'rut': self.socio.socio_rut, 'contraseña': self.CONTRASENA}
+        )
+        self.assertRedirects(respuesta, reverse('appsocios:lista_empresas'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.socio.usuario_id)
+
+
+class CacheCompartidaCheckTests(TestCase):
+    def _ids(self):
+        return {mensaje.id for mensaje in run_checks(include_deployment_checks=True)}
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_advierte_cache_por_proceso(self):
+        self.assertIn('applogin.W001', self._ids())
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379',
+    }})
+    def test_cache_compartida_no_advierte(self):
+        self.assertNotIn('applogin.W001', self._ids())
+
+
+class BackendAutenticacionCheckTests(TestCase):
+    @override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'])
+    def test_sin_backend_de_rut_es_error(self):
+        errores = [mensaje for mensaje in run_checks() if mensaje.id == 'applogin.E001']
+        self.assertEqual(len(errores), 1)
+        self.assertTrue(errores[0].is_serious())
+
+    @override_settings(AUTHENTICATION_BACKENDS=['applogin.backends.RutOUsuarioBackend'])
+    def test_con_backend_de_rut(self):
+        self.assertNotIn('applogin.E001', {mensaje.id for mensaje in run_checks()})
+
+
+class NavbarCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def navbar(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = {}
+        return render_to_string('components/navbar.html', request=request)
+
+    def test_cambio_de_nombre_no_sirve_el_fragmento_anterior(self):
+        usuario = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        self.assertIn('Ana Pérez', self.navbar(usuario))
+
+        usuario.first_name = 'Anita'
+        usuario.save()
+        html = self.navbar(User.objects.get(pk=usuario.pk))
+        self.assertIn('Anita Pérez', html)
+        self.assertNotIn('Ana Pérez', html)
+
+    def test_anonimo(self):
+        self.assertNotIn('Pérez', self.navbar(AnonymousUser()))
+
+
+def crear_usuario(username, rol=None):
+    usuario = User.objects.create_user(username)
+    if rol:
+        UsuarioRol.objects.create(usuario=usuario, rol=Rol.objects.get_or_create(nombre=rol)[0])
+    return usuario
+
+
+def consultas_de_roles(consultas):
+    return [q['sql'] for q in consultas if UsuarioRol._meta.db_table in q['sql']]
+
+
+class PrincipalTests(TestCase):
+    """El rol de quien hace la petición se resuelve una sola vez por petición."""
+
+    def setUp(self):
+        cache.clear()
+
+    def peticion(self, user, **sesion):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = sesion
+        return request
+
+    def test_principal_compartido_en_la_peticion(self):
+        request = self.peticion(crear_usuario('admin', 'admin'))
+        with self.assertNumQueries(1):
+            principal = principal_de(request)
+            self.assertTrue(principal.es_admin)
+            self.assertFalse(principal.es_socio)
+            self.assertIs(principal_de(request), principal)
+            self.assertTrue(es_admin(request.user))
+            self.assertFalse(es_socio(request.user, request))
+
+    def test_socio_id_solo_se_consulta_si_se_pide(self):
+        call_command('populate_db', socios=1, empresas=0, posts=0, eventos=0, sin_indice=True, stdout=io.StringIO())
+        socio = Socio.objects.get()
+        UsuarioRol.objects.create(usuario=socio.usuario, rol=Rol.objects.get_or_create(nombre='socio')[0])
+        request = self.peticion(User.objects.get(pk=socio.usuario_id))
+        with self.assertNumQueries(1):
+            principal = principal_de(request)
+            self.assertTrue(principal.es_socio)
+        with self.assertNumQueries(1):
+            self.assertEqual(principal.socio_id, socio.socio_id)
+            self.assertEqual(principal.socio_id, socio.socio_id)
+
+    def test_socio_por_sesion_sin_consultas(self):
+        request = self.peticion(AnonymousUser(), es_socio_login=True, socio_id=7)
+        with self.assertNumQueries(0):
+            principal = principal_de(request)
+            self.assertTrue(principal.autenticado)
+            self.assertTrue(principal.es_socio)
+            self.assertEqual(principal.socio_id, 7)
+
+    def test_una_consulta_de_rol_por_peticion(self):
+        cliente = Client()
+        cliente.force_login(crear_usuario('admin', 'admin'))
+        # Decorador, vista y context processors consultan el rol: una sola lectura de
+        # la caché y una sola consulta
+        with mock.patch.object(utils.cache, 'get', wraps=utils.cache.get) as get, \
+                CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(cliente.get(reverse('appdashboard:lista_empresas_admin')).status_code, 200)
+        self.assertEqual(len(consultas_de_roles(consultas)), 1)
+        lecturas_de_rol = [c for c in get.call_args_list if str(c.args[0]).startswith('applogin:rol:')]
+        self.assertEqual(len(lecturas_de_rol), 1)
+
+    def test_anonimo_no_consulta_roles(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('home'))
+        self.assertEqual(consultas_de_roles(consultas), [])
+
+
+class RolCacheTests(TestCase):
+    """El rol queda en caché entre peticiones y las señales lo invalidan."""
+
+    def setUp(self):
+        cache.clear()
+
+    def rol(self, usuario):
+        # Un objeto nuevo por llamada, como en cada petición
+        return utils.rol_de(User.objects.get(pk=usuario.pk))
+
+    def test_se_lee_de_la_cache_entre_peticiones(self):
+        usuario = crear_usuario('admin', 'admin')
+        self.assertEqual(self.rol(usuario), 'admin')
+        usuario = User.objects.get(pk=usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(utils.rol_de(usuario), 'admin')
+
+    def test_sin_rol_tambien_se_guarda(self):
+        usuario = crear_usuario('visitante')
+        self.assertIsNone(self.rol(usuario))
+        usuario = User.objects.get(pk=usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertIsNone(utils.rol_de(usuario))
+
+    def test_anonimo_sin_consultas(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(utils.rol_de(AnonymousUser()))
+
+    def test_asignar_cambiar_y_quitar_rol_invalida(self):
+        usuario = crear_usuario('ana')
+        self.assertIsNone(self.rol(usuario))
+
+        asignado = UsuarioRol.objects.create(usuario=usuario, rol=Rol.objects.get_or_create(nombre='socio')[0])
+        self.assertEqual(self.rol(usuario), 'socio')
+
+        asignado.rol = Rol.objects.get_or_create(nombre='admin')[0]
+        asignado.save()
+        self.assertEqual(self.rol(usuario), 'admin')
+
+        asignado.delete()
+        self.assertIsNone(self.rol(usuario))
+
+    def test_cambiar_un_rol_invalida_a_sus_usuarios(self):
+        usuarios = [crear_usuario(f'socio{i}', 'socio') for i in range(2)]
+        self.assertEqual([self.rol(u) for u in usuarios], ['socio', 'socio'])
+        Rol.objects.filter(nombre='socio').update(nombre='admin')
+        # Un update masivo no emite señales: se sigue sirviendo la caché
+        self.assertEqual(self.rol(usuarios[0]), 'socio')
+        Rol.objects.get(nombre='admin').save()
+        self.assertEqual([self.rol(u) for u in usuarios], ['admin', 'admin'])
+
+    def test_vence(self):
+        usuario = crear_usuario('admin', 'admin')
+        with mock.patch.object(utils.cache, 'set', wraps=utils.cache.set) as set_:
+            self.rol(usuario)
+        self.assertEqual(set_.call_args.args[2], utils.TIMEOUT_ROL)
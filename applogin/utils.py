@@ -1,6 +1,9 @@
 from functools import wraps
+from django.core.cache import cache
 from django.http import HttpResponseForbidden
 from django.shortcuts import redirect
+from django.utils.functional import cached_property
+from appsocios.models import Socio
 from .models import UsuarioRol
 
 
@@ -19,52 +22,127 @@ def tiene_rol(rol_nombre):
             if not request.user.is_authenticated:
                 return redirect('applogin:iniciar')
             
-            try:
-                usuario_rol = UsuarioRol.objects.get(usuario=request.user)
-                if usuario_rol.rol.nombre != rol_nombre:
-                    return HttpResponseForbidden("No tienes permiso para acceder a esta página.")
-            except UsuarioRol.DoesNotExist:
+            rol = principal_de(request).rol
+            if rol is None:
                 return HttpResponseForbidden("No tienes un rol asignado.")
+            if rol != rol_nombre:
+                return HttpResponseForbidden("No tienes permiso para acceder a esta página.")
             
             return view_func(request, *args, **kwargs)
         return wrapper
     return decorador
 
 
+_SIN_RESOLVER = object()
+
+# El rol de cada usuario se guarda en caché entre peticiones y lo invalidan las señales
+# de UsuarioRol y Rol (applogin.signals). La invalidación solo alcanza a los demás
+# workers si la caché es compartida (check applogin.W001 en --deploy); el timeout es
+# corto para acotar cuánto dura un rol revocado en una caché por proceso o cambiado
+# por fuera del ORM
+TIMEOUT_ROL = 60
+_SIN_ROL = ""
+
+
+def _clave_rol(user_id):
+    return f"applogin:rol:{user_id}"
+
+
+def invalidar_roles(*user_ids):
+    """Descarta el rol guardado en caché de los usuarios indicados."""
+    if user_ids:
+        cache.delete_many([_clave_rol(user_id) for user_id in user_ids])
+
+
+def rol_de(user):
+    """
+    Nombre del rol del usuario ('admin', 'socio') o None. Se lee de la caché y, si no
+    está, con una consulta con join a roles; además queda guardado en el objeto
+    usuario, así que el decorador, la vista y los context processors de una misma
+    petición lo comparten.
+    """
+    if not user.is_authenticated:
+        return None
+    rol = getattr(user, '_rol_resuelto', _SIN_RESOLVER)
+    if rol is _SIN_RESOLVER:
+        clave = _clave_rol(user.pk)
+        rol = cache.get(clave)
+        if rol is None:
+            rol = (
+                UsuarioRol.objects.filter(usuario_id=user.pk)
+                .values_list('rol__nombre', flat=True)
+                .first()
+            ) or _SIN_ROL
+            cache.set(clave, rol, TIMEOUT_ROL)
+        rol = rol or None
+        user._rol_resuelto = rol
+    return rol
+
+
+class Principal:
+    """
+    Quién hace la petición: el usuario Django con su rol y, si es socio, su ficha de
+    Socio. PrincipalMiddleware lo deja en request.principal.
+    """
+
+    def __init__(self, request):
+        self.user = request.user
+        self.rol = rol_de(request.user)
+        self.sesion = getattr(request, 'session', {})
+        # Sesiones de socio anteriores al backend de RUN (applogin.backends)
+        self.socio_login = bool(self.sesion.get('es_socio_login'))
+
+    @property
+    def autenticado(self):
+        return self.user.is_authenticated or self.socio_login
+
+    @property
+    def es_admin(self):
+        return self.rol == 'admin'
+
+    @property
+    def es_socio(self):
+        return self.rol == 'socio' or self.socio_login
+
+    @cached_property
+    def socio_id(self):
+        """Id del Socio de la petición, o None; se consulta solo si alguien lo pide."""
+        if self.sesion.get('socio_id'):
+            return self.sesion['socio_id']
+        if self.rol == 'socio':
+            return Socio.objects.filter(usuario_id=self.user.pk).values_list('socio_id', flat=True).first()
+        return None
+
+
+def principal_de(request):
+    """El Principal de la petición, creado una sola vez aunque no esté el middleware."""
+    principal = getattr(request, 'principal', None)
+    if principal is None:
+        principal = request.principal = Principal(request)
+    return principal
+
+
 def es_admin(user):
     """Verifica si un usuario es administrador"""
-    if not user.is_authenticated:
-        return False
-    try:
-        return user.rol_asignado.rol.nombre == 'admin'
-    except:
-        return False
+    return rol_de(user) == 'admin'
 
 
 def es_socio(user, request=None):
     """Verifica si un usuario es socio o si hay una sesión de socio activa"""
     # Primero verificar si es un usuario Django con rol de socio
-    if user.is_authenticated:
-        try:
-            return user.rol_asignado.rol.nombre == 'socio'
-        except:
-            pass
+    if rol_de(user) == 'socio':
+        return True
     
     # Si no es usuario Django, verificar si hay sesión de socio
     if request and hasattr(request, 'session'):
-        return request.session.get('es_socio_login', False)
+        return principal_de(request).socio_login
     
     return False
 
 
 def obtener_rol_usuario(user):
     """Obtiene el rol de un usuario"""
-    if not user.is_authenticated:
-        return None
-    try:
-        return user.rol_asignado.rol.nombre
-    except:
-        return None
+    return rol_de(user)
 
 
 def rol_context_processor(request):
@@ -76,13 +154,11 @@ def rol_context_processor(request):
     rol_usuario = None
     
     if request.user.is_authenticated:
-        rol_usuario = obtener_rol_usuario(request.user)
-        es_admin = rol_usuario == 'admin'
-        # Para socio, también verificar si hay socio_id en session
-        if hasattr(request, 'session') and 'socio_id' in request.session:
-            es_socio = True
-        elif rol_usuario == 'socio':
-            es_socio = True
+        principal = principal_de(request)
+        rol_usuario = principal.rol
+        es_admin = principal.es_admin
+        # Para socio, también verificar si hay una ficha de socio vinculada
+        es_socio = rol_usuario == 'socio' or principal.socio_id is not None
     
     return {
         'es_admin': es_admin,
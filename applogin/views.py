@@ -4,10 +4,9 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from .models import Rol, UsuarioRol
-from .utils import es_admin, es_socio, obtener_rol_usuario
-from django.contrib.auth.hashers import check_password
-from appsocios.models import Socio
-from appadmincontenido.models import Articulo, Noticia, Reportaje
+from .utils import principal_de, rol_de
+from appadmincontenido.feed import contenido_reciente
+from descubrecurico.cache_publico import cache_publico, CONTENIDO
 
 # usuario admin:claus clave:cfm-1..5
 
@@ -29,39 +28,19 @@ def iniciar(request):
                 'mensaje':'Por favor completa todos los campos'
             })
         
-        # Intenta primero como Admin (Usuario Django)
-        user = authenticate(username=username, password=password)
-        if user is not None:
-            login(request, user)
-            return redirect("home")
-        
-        # Si falla, intenta como Socio (RUT + contraseña)
-        try:
-            # Limpiar RUT: remover puntos, guiones y convertir a mayúsculas
-            rut_limpio = username.upper().replace('.', '').replace('-', '')
-            socio = Socio.objects.get(socio_rut=rut_limpio)
-            
-            # Verificar contraseña
-            if socio.socio_contraseña and check_password(password, socio.socio_contraseña):
-                # Crear sesión para el socio
-                request.session['socio_id'] = socio.socio_id
-                request.session['socio_nombre'] = f"{socio.socio_nombre} {socio.socio_apellido_paterno}"
-                request.session['socio_rut'] = socio.socio_rut
-                request.session['es_socio_login'] = True
-                
-                return redirect("appdashboard:home")
-            else:
-                return render(request, "applogin/iniciar.html",{ 
-                    'form':AuthenticationForm(), 
-                    'mensaje':'Usuario/RUT o contraseña incorrectos'
-                })
-        except Socio.DoesNotExist:
-            # Si tampoco es socio, mostrar error genérico
+        # El backend decide según lo ingresado: RUN de socio o usuario de Django
+        user = authenticate(request, username=username, password=password)
+        if user is None:
             return render(request, "applogin/iniciar.html",{ 
                 'form':AuthenticationForm(), 
                 'mensaje':'Usuario/RUT o contraseña incorrectos'
             })
 
+        login(request, user)
+        if rol_de(user) == 'socio':
+            return redirect("appdashboard:home")
+        return redirect("home")
+
 
 def registro(request):  
     if request.method=='GET':        
@@ -84,26 +63,19 @@ def registro(request):
             
             return render(request, "applogin/registro.html",{ 'form' : UserCreationForm(), 'mensaje': "Usuario registrado exitosamente. Ya puedes iniciar sesión."})
         
+@cache_publico(CONTENIDO)
 def home(request):
     context = {}
     if request.user.is_authenticated:
+        principal = principal_de(request)
         context = {
-            'es_admin': es_admin(request.user),
-            'es_socio': es_socio(request.user),
-            'rol_usuario': obtener_rol_usuario(request.user),
+            'es_admin': principal.es_admin,
+            'es_socio': principal.rol == 'socio',
+            'rol_usuario': principal.rol,
         }
     
-    # Obtener contenido reciente (Artículos, Noticias, Reportajes)
-    articulos = list(Articulo.objects.all())
-    noticias = list(Noticia.objects.all())
-    reportajes = list(Reportaje.objects.all())
-    
-    # Combinar y ordenar por fecha de publicación (más reciente primero)
-    contenido_total = articulos + noticias + reportajes
-    contenido_total.sort(key=lambda x: x.publicado_en, reverse=True)
-    
-    # Pasar solo los 3 primeros al template
-    context['contenido_destacado'] = contenido_total[:3]
+    # Los 3 contenidos más recientes (Artículos, Noticias, Reportajes), desde caché
+    context['contenido_destacado'] = contenido_reciente(3)
     
     return render(request, "inicio.html", context)        
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppsociosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appsocios'
+
+    def ready(self):
+        import appsocios.signals
@@ -2,7 +2,7 @@ from django.contrib.auth.hashers import make_password, check_password
 
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Socio, Empresa, Rubro, TipoComercializacion, Encuesta
+from .models import Socio, Empresa, Rubro, TipoComercializacion, Encuesta, normalizar_run
 
 class SocioForm(forms.ModelForm):
     socio_contraseña = forms.CharField(
@@ -142,6 +142,7 @@ class EmpresaForm(forms.ModelForm):
         
         # Agregar campos de región y comuna
         from .models import Region, Comuna
+        from . import geografia
         self.fields['region'] = forms.ModelChoiceField(
             queryset=Region.objects.all(),
             required=False,
@@ -154,12 +155,37 @@ class EmpresaForm(forms.ModelForm):
             label="Comuna",
             empty_label="-- Selecciona una comuna --"
         )
+        # Las opciones salen de la caché geográfica; el queryset solo valida lo enviado
+        self.fields['region'].choices = [('', self.fields['region'].empty_label)] + geografia.opciones_regiones()
         
         # Setear valores iniciales si hay instance
-        if self.instance and self.instance.pk and self.instance.comuna:
-            self.fields['region'].initial = self.instance.comuna.provincia.region
-            self.fields['comuna'].initial = self.instance.comuna
+        if self.instance and self.instance.pk and self.instance.comuna_id:
+            self.fields['region'].initial = geografia.region_de_comuna(self.instance.comuna_id)
+            self.fields['comuna'].initial = self.instance.comuna_id
+
+        # Las comunas ofrecidas dependen de la región elegida (o de la actual)
+        region_id = self.data.get('region') if self.is_bound else self.fields['region'].initial
+        try:
+            region_id = int(region_id)
+        except (TypeError, ValueError):
+            region_id = None
+        self.fields['comuna'].choices = [('', self.fields['comuna'].empty_label)] + (
+            geografia.opciones_comunas(region_id) if region_id else []
+        )
     
+    def clean_run_socio(self):
+        return normalizar_run(self.cleaned_data.get('run_socio'))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        region = cleaned_data.get('region')
+        comuna = cleaned_data.get('comuna')
+        if region and comuna:
+            from . import geografia
+            if geografia.region_de_comuna(comuna.pk) != region.pk:
+                self.add_error('comuna', "La comuna seleccionada no pertenece a la región.")
+        return cleaned_data
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         instance.comuna = self.cleaned_data.get('comuna')
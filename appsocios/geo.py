@@ -0,0 +1,140 @@
+import math
+from decimal import Decimal
+
+from django.db.models import Avg, Count, F, Min, Q, Value
+from django.db.models.functions import Floor
+
+# Tamaño de la celda de la grilla espacial, en grados (~1,1 km de latitud)
+TAMANO_CELDA = 0.01
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+# Límite de búsqueda de las consultas de cercanía
+RADIO_MAXIMO_KM = 200
+MAX_RESULTADOS = 200
+
+
+def celda(latitud, longitud):
+    """Celda (fila, columna) de la grilla que contiene el punto."""
+    return (
+        math.floor(float(latitud) / TAMANO_CELDA),
+        math.floor(float(longitud) / TAMANO_CELDA),
+    )
+
+
+def distancia_km(lat1, lng1, lat2, lng2):
+    """Distancia de gran círculo (haversine) entre dos puntos, en kilómetros."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def caja_alrededor(latitud, longitud, radio_km):
+    """Caja (sur, oeste, norte, este) que contiene el círculo de radio `radio_km`."""
+    latitud, longitud = float(latitud), float(longitud)
+    delta_lat = radio_km / KM_POR_GRADO
+    # Cerca de los polos el círculo abarca todas las longitudes
+    cos_lat = math.cos(math.radians(min(abs(latitud) + delta_lat, 90)))
+    delta_lng = 180 if cos_lat < 1e-9 else min(radio_km / (KM_POR_GRADO * cos_lat), 180)
+    return (
+        max(latitud - delta_lat, -90),
+        max(longitud - delta_lng, -180),
+        min(latitud + delta_lat, 90),
+        min(longitud + delta_lng, 180),
+    )
+
+
+def filtro_caja(sur, oeste, norte, este):
+    """
+    Q que limita a las empresas dentro de la caja. El rango de celdas recorre el
+    índice (celda_lat, celda_lng); la comparación exacta de coordenadas solo se
+    evalúa sobre las filas de esas celdas. No contempla cajas que crucen el
+    antimeridiano.
+    """
+    fila_min, columna_min = celda(sur, oeste)
+    fila_max, columna_max = celda(norte, este)
+    return Q(
+        celda_lat__range=(fila_min, fila_max),
+        celda_lng__range=(columna_min, columna_max),
+        latitud__range=(sur, norte),
+        longitud__range=(oeste, este),
+    )
+
+
+def empresas_en_caja(empresas, sur, oeste, norte, este):
+    return empresas.filter(filtro_caja(sur, oeste, norte, este))
+
+
+def _con_distancia(filas, latitud, longitud):
+    for fila in filas:
+        fila["distancia_km"] = round(distancia_km(latitud, longitud, fila["latitud"], fila["longitud"]), 3)
+    return sorted(filas, key=lambda fila: fila["distancia_km"])
+
+
+def empresas_en_radio(empresas, latitud, longitud, radio_km, campos):
+    """Empresas a menos de `radio_km` del punto, de la más cercana a la más lejana."""
+    radio_km = min(radio_km, RADIO_MAXIMO_KM)
+    filas = empresas_en_caja(empresas, *caja_alrededor(latitud, longitud, radio_km)).values(*campos)
+    return [f for f in _con_distancia(list(filas), latitud, longitud) if f["distancia_km"] <= radio_km]
+
+
+def empresas_cercanas(empresas, latitud, longitud, cantidad, campos, radio_maximo_km=RADIO_MAXIMO_KM):
+    """
+    Las `cantidad` empresas más cercanas al punto. La búsqueda parte con una caja de
+    una celda alrededor del punto y duplica el radio hasta reunir suficientes
+    candidatos a una distancia ya cubierta por completo por la caja, de modo que
+    solo se leen las filas de las celdas vecinas.
+    """
+    radio_km = TAMANO_CELDA * KM_POR_GRADO
+    while True:
+        candidatos = empresas_en_radio(empresas, latitud, longitud, radio_km, campos)
+        if len(candidatos) >= cantidad or radio_km >= radio_maximo_km:
+            return candidatos[:cantidad]
+        radio_km = min(radio_km * 2, radio_maximo_km)
+
+
+# Agrupación de marcadores por tesela del mapa (esquema XYZ de OpenStreetMap/Leaflet)
+GRUPOS_POR_TESELA = 8
+ZOOM_SIN_AGRUPAR = 15
+
+
+def caja_tesela(z, x, y):
+    """Caja (sur, oeste, norte, este) de la tesela z/x/y en Web Mercator."""
+    n = 2 ** z
+
+    def latitud(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return (latitud(y + 1), x / n * 360 - 180, latitud(y), (x + 1) / n * 360 - 180)
+
+
+def grupos_en_tesela(empresas, z, x, y, campos):
+    """
+    Marcadores de la tesela z/x/y. Bajo ZOOM_SIN_AGRUPAR las empresas se agrupan en
+    la base de datos en una grilla de GRUPOS_POR_TESELA x GRUPOS_POR_TESELA por
+    tesela, con el conteo y el centroide de cada grupo; los grupos de una sola
+    empresa se devuelven como empresa. Retorna (grupos, empresas).
+    """
+    empresas = empresas_en_caja(empresas, *caja_tesela(z, x, y))
+    if z >= ZOOM_SIN_AGRUPAR:
+        return [], list(empresas.values(*campos)[:MAX_RESULTADOS])
+
+    tamano = Value(Decimal(360) / 2 ** z / GRUPOS_POR_TESELA)
+    filas = (
+        empresas
+        .values(grupo_lat=Floor(F('latitud') / tamano), grupo_lng=Floor(F('longitud') / tamano))
+        .annotate(total=Count('pk'), lat_media=Avg('latitud'), lng_media=Avg('longitud'), pk_min=Min('pk'))
+        .order_by()
+    )
+    grupos, sueltas = [], []
+    for fila in filas:
+        if fila['total'] == 1:
+            sueltas.append(fila['pk_min'])
+        else:
+            grupos.append({
+                'total': fila['total'],
+                'latitud': float(fila['lat_media']),
+                'longitud': float(fila['lng_media']),
+            })
+    individuales = list(empresas.model.objects.filter(pk__in=sueltas).values(*campos)) if sueltas else []
+    return grupos, individuales
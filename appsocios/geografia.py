@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import Comuna, Region
+
+# Versión compartida entre workers: cambiarla obliga a cada proceso a recargar
+CLAVE_VERSION = "appsocios:geografia:version"
+# La versión vence sola para que, si la caché no se comparte entre procesos (check
+# applogin.W001) y la invalidación no llega a otro worker, este recargue a lo más
+# tras este plazo
+TIMEOUT_VERSION = 600
+
+_lock = threading.Lock()
+_datos = None
+
+
+def _version_vigente():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, TIMEOUT_VERSION)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar_geografia():
+    """Descarta los datos geográficos cargados en todos los workers."""
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, TIMEOUT_VERSION)
+
+
+def _cargar(version):
+    regiones = [
+        {'id': r['id'], 'nombre': r['region'], 'abreviatura': r['abreviatura']}
+        for r in Region.objects.order_by('id').values('id', 'region', 'abreviatura')
+    ]
+    comunas = [
+        {'id': c['id'], 'nombre': c['comuna'], 'provincia_id': c['provincia_id'], 'region_id': c['provincia__region_id']}
+        for c in Comuna.objects.order_by('id').values('id', 'comuna', 'provincia_id', 'provincia__region_id')
+    ]
+    comunas_por_region = {region['id']: [] for region in regiones}
+    for comuna in comunas:
+        comunas_por_region.setdefault(comuna['region_id'], []).append(comuna)
+
+    contenido = _serializar({'regiones': regiones, 'comunas': comunas})
+    # Un documento pequeño por región para el selector dependiente de comunas
+    json_por_region = {
+        region_id: _serializar({'comunas': [{'id': c['id'], 'nombre': c['nombre']} for c in lista]})
+        for region_id, lista in comunas_por_region.items()
+    }
+    return {
+        'version': version,
+        'regiones': regiones,
+        'comunas': {comuna['id']: comuna for comuna in comunas},
+        'comunas_por_region': comunas_por_region,
+        'json': contenido,
+        'etag': hashlib.sha256(contenido).hexdigest(),
+        'json_por_region': {
+            region_id: (documento, hashlib.sha256(documento).hexdigest())
+            for region_id, documento in json_por_region.items()
+        },
+    }
+
+
+def _serializar(datos):
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def datos():
+    """
+    Regiones y comunas cargadas una vez por proceso. Cada llamada solo compara la
+    versión compartida en caché; las tablas se vuelven a leer cuando alguien la
+    cambia con invalidar_geografia() o cuando vence (TIMEOUT_VERSION).
+    """
+    global _datos
+    version = _version_vigente()
+    if _datos is None or _datos['version'] != version:
+        with _lock:
+            if _datos is None or _datos['version'] != version:
+                _datos = _cargar(version)
+    return _datos
+
+
+def opciones_regiones():
+    return [(region['id'], region['nombre']) for region in datos()['regiones']]
+
+
+def opciones_comunas(region_id=None):
+    geo = datos()
+    if region_id is None:
+        comunas = geo['comunas'].values()
+    else:
+        comunas = geo['comunas_por_region'].get(region_id, [])
+    return [(comuna['id'], comuna['nombre']) for comuna in comunas]
+
+
+def region_de_comuna(comuna_id):
+    comuna = datos()['comunas'].get(comuna_id)
+    return comuna['region_id'] if comuna else None
+
+
+def comunas_de_region_json(region_id):
+    """(documento JSON, etag) con las comunas de la región, o None si no existe."""
+    return datos()['json_por_region'].get(region_id)
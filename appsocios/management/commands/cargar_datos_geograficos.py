@@ -1,66 +1,101 @@
 import json
 import os
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import transaction
+from appsocios.geografia import invalidar_geografia
 from appsocios.models import Region, Provincia, Comuna
 
+
+class SimulacionTerminada(Exception):
+    """Se lanza al final de un --dry-run para revertir la transacción."""
+
+
 class Command(BaseCommand):
     help = 'Carga datos de regiones, provincias y comunas desde paisdata.json'
 
-    def handle(self, *args, **kwargs):
-        # Construir la ruta al archivo JSON
-        # Asumimos que BASE_DIR es la carpeta donde está manage.py
-        json_path = os.path.join(settings.BASE_DIR, 'appsocios', 'static', 'css', 'datos', 'paisdata.json')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--archivo',
+            default=os.path.join(settings.BASE_DIR, 'appsocios', 'static', 'css', 'datos', 'paisdata.json'),
+            help='Ruta del JSON a cargar (por defecto, paisdata.json de appsocios)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Calcula y muestra los cambios sin guardarlos',
+        )
 
-        if not os.path.exists(json_path):
-            self.stdout.write(self.style.ERROR(f'No se encontró el archivo en: {json_path}'))
-            return
+    def handle(self, *args, **options):
+        json_path = options['archivo']
 
-        self.stdout.write(self.style.WARNING('Iniciando carga de datos...'))
+        if not os.path.exists(json_path):
+            raise CommandError(f'No se encontró el archivo en: {json_path}')
 
         try:
             with open(json_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer {json_path}: {e}')
+
+        self.stdout.write(self.style.WARNING('Iniciando carga de datos...'))
+
+        # Cada nivel se compara contra las filas existentes, leídas en una sola consulta,
+        # y solo se insertan o actualizan las que cambian
+        niveles = [
+            (Region, data['regiones'], {
+                'region': 'region', 'abreviatura': 'abreviatura', 'capital': 'capital',
+            }),
+            (Provincia, data['provincias'], {
+                'provincia': 'provincia', 'region_id': 'region_id',
+            }),
+            (Comuna, data['comunas'], {
+                'comuna': 'comuna', 'provincia_id': 'provincia_id',
+            }),
+        ]
+
+        resumen = []
+        try:
+            with transaction.atomic():
+                for modelo, filas, campos in niveles:
+                    resumen.append((modelo, self._sincronizar(modelo, filas, campos)))
+                if options['dry_run']:
+                    raise SimulacionTerminada
+        except SimulacionTerminada:
+            pass
+        except KeyError as e:
+            raise CommandError(f'Falta el campo {e} en {json_path}')
+
+        for modelo, (nuevas, actualizadas, sin_cambios) in resumen:
+            self.stdout.write(
+                f'{modelo._meta.verbose_name_plural}: {nuevas} nuevas, '
+                f'{actualizadas} actualizadas, {sin_cambios} sin cambios'
+            )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Simulación: no se guardó ningún cambio.'))
+            return
+
+        if any(nuevas or actualizadas for _, (nuevas, actualizadas, _) in resumen):
+            invalidar_geografia()
+        self.stdout.write(self.style.SUCCESS('¡Datos geográficos cargados exitosamente!'))
+
+    def _sincronizar(self, modelo, filas, campos):
+        atributos = list(campos)
+        existentes = modelo.objects.in_bulk()
+        nuevas, actualizadas, sin_cambios = [], [], 0
+
+        for item in filas:
+            valores = {atributo: item[clave] for atributo, clave in campos.items()}
+            actual = existentes.get(item['id'])
+            if actual is None:
+                nuevas.append(modelo(id=item['id'], **valores))
+            elif any(getattr(actual, atributo) != valor for atributo, valor in valores.items()):
+                for atributo, valor in valores.items():
+                    setattr(actual, atributo, valor)
+                actualizadas.append(actual)
+            else:
+                sin_cambios += 1
 
-            # 1. Cargar Regiones
-            self.stdout.write('Procesando Regiones...')
-            for item in data['regiones']:
-                Region.objects.update_or_create(
-                    id=item['id'],
-                    defaults={
-                        'region': item['region'],
-                        'abreviatura': item['abreviatura'],
-                        'capital': item['capital']
-                    }
-                )
-
-            # 2. Cargar Provincias
-            self.stdout.write('Procesando Provincias...')
-            for item in data['provincias']:
-                # Obtenemos la instancia de la región relacionada
-                region = Region.objects.get(id=item['region_id'])
-                Provincia.objects.update_or_create(
-                    id=item['id'],
-                    defaults={
-                        'provincia': item['provincia'],
-                        'region': region
-                    }
-                )
-
-            # 3. Cargar Comunas
-            self.stdout.write('Procesando Comunas...')
-            for item in data['comunas']:
-                # Obtenemos la instancia de la provincia relacionada
-                provincia = Provincia.objects.get(id=item['provincia_id'])
-                Comuna.objects.update_or_create(
-                    id=item['id'],
-                    defaults={
-                        'comuna': item['comuna'],
-                        'provincia': provincia
-                    }
-                )
-
-            self.stdout.write(self.style.SUCCESS('¡Datos geográficos cargados exitosamente!'))
-
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Ocurrió un error: {str(e)}'))
+        modelo.objects.bulk_create(nuevas, batch_size=500)
+        modelo.objects.bulk_update(actualizadas, atributos, batch_size=500)
+        return len(nuevas), len(actualizadas), sin_cambios
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+from appsocios.geo import celda
+
+
+def calcular_celdas(apps, schema_editor):
+    Empresa = apps.get_model('appsocios', 'Empresa')
+    empresas = Empresa.objects.filter(latitud__isnull=False, longitud__isnull=False).only('latitud', 'longitud')
+    pendientes = []
+    for empresa in empresas.iterator(chunk_size=1000):
+        empresa.celda_lat, empresa.celda_lng = celda(empresa.latitud, empresa.longitud)
+        pendientes.append(empresa)
+    Empresa.objects.bulk_update(pendientes, ['celda_lat', 'celda_lng'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appsocios', '0008_empresa_fecha_creacion_alter_empresa_activo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='celda_lat',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='celda_lng',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['celda_lat', 'celda_lng'], name='empresa_celda_idx'),
+        ),
+        migrations.RunPython(calcular_celdas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appsocios', '0009_empresa_celda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(condition=models.Q(('activo', True), ('encuesta_respondida', True), ('estado_pago', 'pagado'), ('estado_solicitud', 'aprobada')), fields=['rubro', 'nombre'], name='empresa_publica_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['estado_solicitud', 'fecha_creacion', 'id_empresa'], name='empresa_solicitud_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['estado_pago', 'fecha_creacion', 'id_empresa'], name='empresa_pago_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['fecha_creacion', 'id_empresa'], name='empresa_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:37
+
+from django.db import migrations, models
+
+
+def calcular_visible_publico(apps, schema_editor):
+    Empresa = apps.get_model('appsocios', 'Empresa')
+    Empresa.objects.filter(
+        estado_pago='pagado',
+        encuesta_respondida=True,
+        estado_solicitud='aprobada',
+        activo=True,
+    ).update(visible_publico=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appsocios', '0010_indices_flujo_empresa'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='empresa',
+            name='empresa_publica_idx',
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='visible_publico',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Visible en el directorio'),
+        ),
+        migrations.RunPython(calcular_visible_publico, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['visible_publico'], name='empresa_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(condition=models.Q(('visible_publico', True)), fields=['rubro', 'nombre'], name='empresa_publica_idx'),
+        ),
+    ]
@@ -5,33 +5,41 @@ from decimal import Decimal
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from descubrecurico.escritura import EscrituraAtomica
+from .geo import celda
+
 # Create your models here.
 #-- Validador de RUN ---
-def validar_run(run):
-    run = run.upper().replace(".", "").replace("-", "")
-    if not run[:-1].isdigit():
-        raise ValidationError("El RUN debe tener una parte numérica válida.")
-    
-    cuerpo = run[:-1]
-    dv = run[-1]
+def normalizar_run(run):
+    """RUN en el formato almacenado: sin puntos ni guion y con K mayúscula."""
+    return (run or "").strip().upper().replace(".", "").replace("-", "")
 
+def digito_verificador(cuerpo):
+    """Dígito verificador (módulo 11) de la parte numérica de un RUN."""
     suma = 0
     multiplicador = 2
-    for digito in reversed(cuerpo):
+    for digito in reversed(str(cuerpo)):
         suma += int(digito) * multiplicador
         multiplicador = 2 if multiplicador == 7 else multiplicador + 1
 
-    resto = suma % 11
-    verificador = 11 - resto
-
+    verificador = 11 - suma % 11
     if verificador == 11:
-        dv_esperado = '0'
-    elif verificador == 10:
-        dv_esperado = 'K'
-    else:
-        dv_esperado = str(verificador)
+        return '0'
+    if verificador == 10:
+        return 'K'
+    return str(verificador)
+
+def es_run(valor):
+    """Indica si el valor, normalizado, es un RUN con dígito verificador correcto."""
+    run = normalizar_run(valor)
+    return len(run) > 1 and run[:-1].isdigit() and digito_verificador(run[:-1]) == run[-1]
 
-    if dv != dv_esperado:
+def validar_run(run):
+    run = normalizar_run(run)
+    if not run[:-1].isdigit():
+        raise ValidationError("El RUN debe tener una parte numérica válida.")
+
+    if run[-1] != digito_verificador(run[:-1]):
         raise ValidationError("El RUN ingresado no es válido.")
 
 # --- Modelo de Regiones ---
@@ -104,7 +112,7 @@ class TipoComercializacion(models.Model):
         return self.nombre_tipo
 
 # --- Modelo de Socios ---
-class Socio(models.Model):
+class Socio(EscrituraAtomica):
     socio_id = models.AutoField(primary_key=True)
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='socio')
     socio_rut = models.CharField(max_length=10, verbose_name='Rut', unique=True,validators=[validar_run])
@@ -131,7 +139,36 @@ class Socio(models.Model):
     def __str__(self):
         return f"{self.socio_nombre} {self.socio_apellido_paterno}"
 
-class Empresa(models.Model):
+# Empresas que aparecen en el directorio público; Empresa.visible_publico la materializa
+CONDICION_PUBLICA = models.Q(
+    estado_pago='pagado',
+    encuesta_respondida=True,
+    estado_solicitud='aprobada',
+    activo=True,
+)
+# Campos de los que depende visible_publico
+CAMPOS_VISIBILIDAD = ('estado_pago', 'encuesta_respondida', 'estado_solicitud', 'activo')
+
+class EmpresaQuerySet(models.QuerySet):
+    def publicas(self):
+        return self.filter(visible_publico=True)
+
+    def recalcular_visibilidad(self):
+        """Recalcula visible_publico tras un update() masivo, que no pasa por save()."""
+        return self.update(visible_publico=models.Case(
+            models.When(CONDICION_PUBLICA, then=models.Value(True)),
+            default=models.Value(False),
+        ))
+
+class EmpresasPublicasManager(models.Manager.from_queryset(EmpresaQuerySet)):
+    """Empresa.publicas: solo las empresas visibles en el directorio público."""
+    def get_queryset(self):
+        return super().get_queryset().publicas()
+
+class Empresa(EscrituraAtomica):
+    # Valores que las señales de contadores leen bloqueados antes de cada escritura
+    CAMPOS_PREVIOS = CAMPOS_VISIBILIDAD
+
     id_empresa = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=255)
     rut = models.CharField(max_length=20, unique=True, null=True, blank=True)
@@ -156,6 +193,9 @@ class Empresa(models.Model):
         max_digits=17, decimal_places=14, null=True, blank=True,
         validators=[MinValueValidator(Decimal('-180')), MaxValueValidator(Decimal('180'))]
     )
+    # Celda de la grilla espacial (appsocios.geo), derivada de latitud/longitud en save()
+    celda_lat = models.IntegerField(null=True, blank=True, editable=False)
+    celda_lng = models.IntegerField(null=True, blank=True, editable=False)
 
     socio = models.ForeignKey(
         Socio, null=True, blank=True, on_delete=models.SET_NULL,
@@ -186,16 +226,59 @@ class Empresa(models.Model):
     estado_pago = models.CharField(max_length=20, choices=ESTADOS_PAGO, default='pendiente', verbose_name='Estado Pago')
     activo = models.BooleanField(default=False, verbose_name='Activa')
     fecha_creacion = models.DateTimeField(default=timezone.now)
+    # Derivado de CONDICION_PUBLICA en save()
+    visible_publico = models.BooleanField(default=False, editable=False, verbose_name='Visible en el directorio')
+
+    objects = EmpresaQuerySet.as_manager()
+    publicas = EmpresasPublicasManager()
 
     class Meta:
         db_table = 'Empresa'
         verbose_name = 'Empresa'
         verbose_name_plural = 'Empresas'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['celda_lat', 'celda_lng'], name='empresa_celda_idx'),
+            # Directorio público: una igualdad sobre visible_publico; el índice parcial sirve el
+            # filtro por rubro en el orden del listado. MySQL no soporta la condición y lo crea
+            # como índice completo sobre (rubro, nombre)
+            models.Index(fields=['visible_publico'], name='empresa_visible_idx'),
+            models.Index(fields=['rubro', 'nombre'], name='empresa_publica_idx', condition=models.Q(visible_publico=True)),
+            # Solicitudes y filtros del dashboard ordenados por fecha; el paginador ordena por
+            # (-fecha_creacion, -id_empresa) y los índices se recorren en ambos sentidos
+            models.Index(fields=['estado_solicitud', 'fecha_creacion', 'id_empresa'], name='empresa_solicitud_fecha_idx'),
+            models.Index(fields=['estado_pago', 'fecha_creacion', 'id_empresa'], name='empresa_pago_fecha_idx'),
+            models.Index(fields=['fecha_creacion', 'id_empresa'], name='empresa_fecha_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
+    def calcular_visible_publico(self):
+        return (
+            self.estado_pago == 'pagado'
+            and self.encuesta_respondida
+            and self.estado_solicitud == 'aprobada'
+            and self.activo
+        )
+
+    def save(self, *args, **kwargs):
+        if self.latitud is not None and self.longitud is not None:
+            self.celda_lat, self.celda_lng = celda(self.latitud, self.longitud)
+        else:
+            self.celda_lat = self.celda_lng = None
+        self.visible_publico = self.calcular_visible_publico()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derivados = set()
+            if {'latitud', 'longitud'} & set(update_fields):
+                derivados |= {'celda_lat', 'celda_lng'}
+            if set(CAMPOS_VISIBILIDAD) & set(update_fields):
+                derivados.add('visible_publico')
+            if derivados:
+                kwargs['update_fields'] = {*update_fields, *derivados}
+        super().save(*args, **kwargs)
+
 class Encuesta(models.Model):
     OPCIONES_SI_NO = [
         ('si', 'Sí'),
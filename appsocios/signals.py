@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from descubrecurico.cache_publico import invalidar_paginas, EMPRESAS
+from .geografia import invalidar_geografia
+from .models import Comuna, Empresa, Provincia, Region, Rubro
+
+
+@receiver([post_save, post_delete], sender=Empresa)
+@receiver([post_save, post_delete], sender=Rubro)
+def invalidar_cache_empresas(sender, instance, **kwargs):
+    """
+    Señal que descarta las páginas públicas del directorio al crear, editar o
+    eliminar una Empresa o un Rubro
+    """
+    invalidar_paginas(EMPRESAS)
+
+
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=Provincia)
+@receiver([post_save, post_delete], sender=Comuna)
+def invalidar_cache_geografia(sender, instance, **kwargs):
+    """Señal que obliga a cada worker a recargar regiones y comunas"""
+    invalidar_geografia()
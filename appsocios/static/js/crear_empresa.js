@@ -1,73 +1,123 @@
-/* Filtrado de comunas por región en crear_empresa */
+/* Selector de comunas dependiente de la región en crear_empresa */
 document.addEventListener('DOMContentLoaded', function() {
     const regionSelect = document.getElementById('id_socio_region');
     const comunaSelect = document.getElementById('id_socio_comuna');
     
     if (!regionSelect || !comunaSelect) return;
 
-    // Almacenar las comunas originales con sus regiones asociadas
-    const comunasData = {};
-    const allOptions = [];
-    const options = comunaSelect.querySelectorAll('option');
-    
-    options.forEach(option => {
-        if (option.value) {
-            const regionId = option.getAttribute('data-region-id');
-            allOptions.push({
-                value: option.value,
-                text: option.text,
-                regionId: regionId
-            });
-            
-            if (regionId) {
-                if (!comunasData[regionId]) {
-                    comunasData[regionId] = [];
-                }
-                comunasData[regionId].push({
-                    value: option.value,
-                    text: option.text
-                });
-            }
-        }
-    });
+    // El servidor solo envía las comunas de la región inicial; el resto se piden por región
+    const urlBase = comunaSelect.dataset.url.replace(/0\/comunas\.json$/, '');
+    const comunasPorRegion = {};
 
-    // Función para filtrar comunas
-    function filtrarComunas() {
-        const selectedRegionId = regionSelect.value;
-        
-        // Limpiar todas las opciones excepto la vacía
+    function pintarComunas(comunas) {
         while (comunaSelect.options.length > 1) {
             comunaSelect.remove(1);
         }
+        comunas.forEach(comuna => {
+            comunaSelect.add(new Option(comuna.nombre, comuna.id));
+        });
+        comunaSelect.value = '';
+    }
 
-        // Si no hay región seleccionada, mostrar todas las comunas
-        if (!selectedRegionId) {
-            allOptions.forEach(option => {
-                const newOption = document.createElement('option');
-                newOption.value = option.value;
-                newOption.text = option.text;
-                newOption.setAttribute('data-region-id', option.regionId);
-                comunaSelect.appendChild(newOption);
-            });
-        } else {
-            // Mostrar solo las comunas de la región seleccionada
-            if (comunasData[selectedRegionId]) {
-                comunasData[selectedRegionId].forEach(comuna => {
-                    const newOption = document.createElement('option');
-                    newOption.value = comuna.value;
-                    newOption.text = comuna.text;
-                    comunaSelect.appendChild(newOption);
+    function cargarComunas() {
+        const regionId = regionSelect.value;
+        if (!regionId) {
+            pintarComunas([]);
+            return;
+        }
+        if (!comunasPorRegion[regionId]) {
+            comunasPorRegion[regionId] = fetch(`${urlBase}${regionId}/comunas.json`)
+                .then(response => response.json())
+                .then(data => data.comunas)
+                .catch(error => {
+                    delete comunasPorRegion[regionId];
+                    console.error('Error:', error);
+                    return [];
                 });
-            }
         }
-
-        // Resetear la selección de comuna
-        comunaSelect.value = '';
+        comunasPorRegion[regionId].then(comunas => {
+            // Ignorar respuestas de una región que ya no está seleccionada
+            if (regionSelect.value === regionId) pintarComunas(comunas);
+        });
     }
 
     // Escuchar cambios en región
-    regionSelect.addEventListener('change', filtrarComunas);
+    regionSelect.addEventListener('change', cargarComunas);
+});
+
+/* Autocompletado del RUN del socio (solo administradores) */
+document.addEventListener('DOMContentLoaded', function() {
+    const contenedor = document.getElementById('autocompletarSocio');
+    const runInput = document.getElementById('id_run_socio');
+    const lista = document.getElementById('sugerenciasSocio');
+    const estado = document.getElementById('estadoSocio');
+
+    if (!contenedor || !runInput || !lista) return;
 
-    // Ejecutar filtrado inicial
-    filtrarComunas();
+    runInput.setAttribute('autocomplete', 'off');
+    let temporizador = null;
+    let ultimaConsulta = '';
+
+    function mostrarEstado(texto, valido) {
+        estado.textContent = texto;
+        estado.style.color = valido ? '#009030' : '#b91c1c';
+    }
+
+    function cerrarLista() {
+        lista.classList.add('hidden');
+        lista.innerHTML = '';
+    }
+
+    function elegir(socio) {
+        runInput.value = socio.run_formateado;
+        mostrarEstado(`Socio: ${socio.nombre}`, true);
+        cerrarLista();
+    }
+
+    function buscar() {
+        const q = runInput.value.trim();
+        if (q.length < 2) {
+            cerrarLista();
+            estado.textContent = '';
+            return;
+        }
+        ultimaConsulta = q;
+        fetch(`${contenedor.dataset.url}?q=${encodeURIComponent(q)}`, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(response => response.json())
+        .then(data => {
+            // Ignorar respuestas de consultas ya reemplazadas por otra más nueva
+            if (q !== ultimaConsulta) return;
+
+            lista.innerHTML = '';
+            data.socios.forEach(socio => {
+                const item = document.createElement('li');
+                item.textContent = `${socio.run_formateado} · ${socio.nombre}`;
+                item.style.padding = '0.5rem 0.75rem';
+                item.style.cursor = 'pointer';
+                item.addEventListener('mousedown', function(e) {
+                    e.preventDefault();
+                    elegir(socio);
+                });
+                lista.appendChild(item);
+            });
+            lista.classList.toggle('hidden', data.socios.length === 0);
+
+            if (data.exacto) {
+                mostrarEstado(`Socio: ${data.exacto.nombre}`, true);
+            } else if (data.socios.length === 0) {
+                mostrarEstado('No hay socios registrados con ese RUN o nombre.', false);
+            } else {
+                estado.textContent = '';
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
+
+    runInput.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(buscar, 200);
+    });
+    runInput.addEventListener('blur', cerrarLista);
 });
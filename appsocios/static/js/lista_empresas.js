@@ -12,6 +12,7 @@ const modalDireccion = document.getElementById("modalDireccion")
 const modalCoordenadas = document.getElementById("modalCoordenadas")
 
 let mapaInstancia = null
+let marcadorModal = null
 let activeRubro = ''
 
 // Cargar eventos al DOM listo
@@ -19,6 +20,7 @@ document.addEventListener("DOMContentLoaded", () => {
   setupEventListeners()
   setupFiltros()
   setupGridControls()
+  setupMapaEmpresas()
   if (lucide) lucide.createIcons()
 })
 
@@ -67,29 +69,26 @@ function abrirModalMapa(nombre, direccion, lat, lng) {
 
   modalMapa.classList.remove("hidden")
 
-  // Limpiar mapa anterior si existe
-  if (mapaInstancia) {
-    mapaInstancia.remove()
-    mapaInstancia = null
-  }
-
-  // Crear nuevo mapa
+  // El mapa del modal se crea una sola vez y se reutiliza entre aperturas
   setTimeout(() => {
     if (typeof L === "undefined") {
       mapa.innerHTML = '<p class="text-red-600 text-center p-4">Error: Leaflet no cargó correctamente</p>'
       return
     }
 
-    mapaInstancia = L.map("mapa", { scrollWheelZoom: false }).setView([lat, lng], 15)
-
-    L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
-      maxZoom: 19,
-      attribution: "&copy; OpenStreetMap contributors",
-    }).addTo(mapaInstancia)
+    if (!mapaInstancia) {
+      mapaInstancia = L.map("mapa", { scrollWheelZoom: false })
+      L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
+        maxZoom: 19,
+        attribution: "&copy; OpenStreetMap contributors",
+      }).addTo(mapaInstancia)
+      marcadorModal = L.marker([lat, lng]).addTo(mapaInstancia)
+    }
 
-    // Agregar marcador
-    L.marker([lat, lng])
-      .addTo(mapaInstancia)
+    mapaInstancia.invalidateSize()
+    mapaInstancia.setView([lat, lng], 15)
+    marcadorModal
+      .setLatLng([lat, lng])
       .bindPopup(`<strong>${nombre}</strong><br>${direccion}`)
       .openPopup()
   }, 300)
@@ -97,10 +96,85 @@ function abrirModalMapa(nombre, direccion, lat, lng) {
 
 function cerrarModalMapa() {
   modalMapa.classList.add("hidden")
-  if (mapaInstancia) {
-    mapaInstancia.remove()
-    mapaInstancia = null
+}
+
+/* ------------------ MAPA DEL DIRECTORIO (TESELAS) ------------------ */
+const teselasCargadas = new Map()
+
+function setupMapaEmpresas() {
+  const contenedor = document.getElementById("mapaEmpresas")
+  if (!contenedor || typeof L === "undefined") return
+
+  const urlBase = contenedor.dataset.teselas.replace(/0\/0\/0\/$/, "")
+  const rubro = contenedor.dataset.rubro
+  const mapaGeneral = L.map(contenedor, { scrollWheelZoom: false }).setView([-34.98, -71.24], 11)
+  L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
+    maxZoom: 19,
+    attribution: "&copy; OpenStreetMap contributors",
+  }).addTo(mapaGeneral)
+
+  const capa = L.layerGroup().addTo(mapaGeneral)
+
+  const cargarVisibles = () => {
+    const z = mapaGeneral.getZoom()
+    const limites = mapaGeneral.getPixelBounds()
+    const min = limites.min.divideBy(256).floor()
+    const max = limites.max.divideBy(256).floor()
+    const ultima = 2 ** z - 1
+    const visibles = []
+    for (let x = Math.max(min.x, 0); x <= Math.min(max.x, ultima); x++) {
+      for (let y = Math.max(min.y, 0); y <= Math.min(max.y, ultima); y++) {
+        visibles.push(`${z}/${x}/${y}/`)
+      }
+    }
+
+    capa.clearLayers()
+    visibles.forEach((tesela) => {
+      obtenerTesela(urlBase + tesela, rubro).then((datos) => {
+        // Descarta respuestas que llegan después de otro cambio de zoom
+        if (mapaGeneral.getZoom() !== z) return
+        dibujarTesela(capa, mapaGeneral, datos)
+      })
+    })
   }
+
+  mapaGeneral.on("moveend", cargarVisibles)
+  cargarVisibles()
+}
+
+function obtenerTesela(url, rubro) {
+  const clave = `${url}?rubro=${rubro}`
+  if (!teselasCargadas.has(clave)) {
+    const params = rubro ? `?rubro=${encodeURIComponent(rubro)}` : ""
+    const peticion = fetch(url + params)
+      .then((r) => (r.ok ? r.json() : { grupos: [], empresas: [] }))
+      .catch(() => {
+        teselasCargadas.delete(clave)
+        return { grupos: [], empresas: [] }
+      })
+    teselasCargadas.set(clave, peticion)
+  }
+  return teselasCargadas.get(clave)
+}
+
+function dibujarTesela(capa, mapaGeneral, datos) {
+  datos.grupos.forEach((grupo) => {
+    const icono = L.divIcon({
+      html: `<span>${grupo.total}</span>`,
+      className: "grupo-empresas",
+      iconSize: [36, 36],
+    })
+    L.marker([grupo.latitud, grupo.longitud], { icon: icono })
+      .on("click", () => mapaGeneral.setView([grupo.latitud, grupo.longitud], mapaGeneral.getZoom() + 2))
+      .addTo(capa)
+  })
+  datos.empresas.forEach((empresa) => {
+    const popup = document.createElement("div")
+    const nombre = document.createElement("strong")
+    nombre.textContent = empresa.nombre
+    popup.append(nombre, document.createElement("br"), empresa.rubro)
+    L.marker([empresa.latitud, empresa.longitud]).bindPopup(popup).addTo(capa)
+  })
 }
 
 /* ------------------ GRID CONTROLS (2/3/4) ------------------ */
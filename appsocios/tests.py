@@ -1,3 +1,559 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from appdashboard import benchmark
+from applogin.backends import usuario_de_socio
+
+from . import geo, geografia
+from .forms import EmpresaForm
+from .models import Comuna, Empresa, Provincia, Region, Rubro, Socio
+from .views import _empresas_publicas
+
+
+class ListaEmpresasConsultasTests(TestCase):
+    """El directorio público debe costar un número fijo de consultas."""
+
+    # empresas proyectadas con su rubro + rubros del filtro
+    CONSULTAS_DIRECTORIO = 2
+
+    def setUp(self):
+        cache.clear()
+        self.rubros = [Rubro.objects.create(nombre_rubro=f"Rubro {i}") for i in range(3)]
+
+    def crear_empresas(self, cantidad):
+        inicio = Empresa.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            Empresa.objects.create(
+                nombre=f"Empresa {i}",
+                rut=f"7600000{i}",
+                rubro=self.rubros[i % len(self.rubros)] if i % 4 else None,
+                latitud=Decimal("-34.98") + Decimal(i) / 1000,
+                longitud=Decimal("-71.24"),
+                estado_solicitud='aprobada',
+                estado_pago='pagado',
+                encuesta_respondida=True,
+                activo=True,
+            )
+
+    def test_consultas_no_dependen_de_la_cantidad_de_empresas(self):
+        url = reverse('appsocios:lista_empresas')
+        for cantidad in (2, 30):
+            with self.subTest(cantidad=cantidad):
+                self.crear_empresas(cantidad)
+                with self.assertNumQueries(self.CONSULTAS_DIRECTORIO):
+                    respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(len(respuesta.context['empresas']), Empresa.objects.count())
+
+    def test_tarjeta_y_mapa_comparten_la_proyeccion(self):
+        self.crear_empresas(4)
+
+        respuesta = self.client.get(reverse('appsocios:lista_empresas'), {'rubro': self.rubros[1].pk})
+        tarjetas = respuesta.context['empresas']
+        marcadores = self.client.get(
+            reverse('appsocios:empresas_cercanas'), {'lat': -34.98, 'lng': -71.24, 'n': 10, 'rubro': self.rubros[1].pk}
+        ).json()['empresas']
+
+        self.assertTrue(tarjetas)
+        self.assertEqual(
+            {empresa['id'] for empresa in tarjetas},
+            {marcador['id'] for marcador in marcadores},
+        )
+        self.assertEqual(marcadores[0]['rubro'], self.rubros[1].nombre_rubro)
+        self.assertNotIn(b'Sin rubro', respuesta.content)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "el índice parcial del directorio no existe en este motor")
+class IndicesEmpresaTests(TestCase):
+    """Las consultas del directorio, de solicitudes y del dashboard deben usar un índice."""
+
+    FECHA = ('-fecha_creacion', '-id_empresa')  # orden del paginador de lista_empresas_admin
+    POR_FLAG = ('empresa_solicitud_fecha_idx', 'empresa_pago_fecha_idx', 'empresa_fecha_idx')
+    PUBLICOS = ('empresa_visible_idx', 'empresa_publica_idx')
+
+    @classmethod
+    def setUpTestData(cls):
+        rubro = Rubro.objects.create(nombre_rubro="Vinos")
+        cls.rubro_id = rubro.pk
+        for i in range(20):
+            publica = i % 2 == 0
+            Empresa.objects.create(
+                nombre=f"Empresa {i}",
+                rubro=rubro,
+                estado_solicitud='aprobada' if publica else 'pendiente',
+                estado_pago='pagado' if publica else 'pendiente',
+                encuesta_respondida=publica,
+                activo=publica,
+            )
+
+    def plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Con tablas tan pequeñas PostgreSQL preferiría recorrerlas completas
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsaIndice(self, queryset, *indices):
+        plan = self.plan(queryset)
+        self.assertNotRegex(plan, r'(?m)SCAN "?Empresa"?\s*$|Seq Scan on "?Empresa"?', plan)
+        self.assertTrue(any(indice in plan for indice in indices), plan)
+
+    def test_directorio_publico(self):
+        self.assertUsaIndice(_empresas_publicas().filter(rubro__id_rubro=self.rubro_id), *self.PUBLICOS)
+        self.assertUsaIndice(_empresas_publicas(), *self.PUBLICOS)
+
+    def test_lista_solicitudes(self):
+        self.assertUsaIndice(
+            Empresa.objects.filter(estado_solicitud='pendiente').order_by('fecha_creacion'),
+            'empresa_solicitud_fecha_idx',
+        )
+
+    def test_filtros_del_dashboard(self):
+        filtros = [
+            ({}, ('empresa_fecha_idx',)),
+            ({'estado_solicitud': 'aprobada'}, ('empresa_solicitud_fecha_idx',)),
+            ({'estado_pago': 'pagado'}, ('empresa_pago_fecha_idx',)),
+            ({'activo': True}, ('empresa_fecha_idx',)),
+            ({'encuesta_respondida': False}, ('empresa_fecha_idx',)),
+            ({'activo': True, 'estado_pago': 'pagado', 'encuesta_respondida': True}, self.POR_FLAG),
+            ({'estado_solicitud': 'pendiente', 'estado_pago': 'pendiente', 'activo': False}, self.POR_FLAG),
+        ]
+        for filtro, indices in filtros:
+            with self.subTest(filtro=filtro):
+                self.assertUsaIndice(Empresa.objects.filter(**filtro).order_by(*self.FECHA)[:51], *indices)
+
+
+class VisiblePublicoTests(TestCase):
+    def test_save_mantiene_visible_publico(self):
+        empresa = Empresa.objects.create(
+            nombre="Viña Nueva", estado_solicitud='aprobada', estado_pago='pagado', activo=True,
+        )
+        self.assertFalse(empresa.visible_publico)
+
+        empresa.encuesta_respondida = True
+        empresa.save(update_fields=['encuesta_respondida'])
+        self.assertTrue(Empresa.objects.get(pk=empresa.pk).visible_publico)
+        self.assertQuerySetEqual(Empresa.publicas.all(), [empresa])
+
+        empresa.activo = False
+        empresa.save(update_fields=['activo'])
+        self.assertFalse(Empresa.publicas.exists())
+
+    def test_recalcular_tras_update_masivo(self):
+        empresa = Empresa.objects.create(nombre="Viña Nueva")
+        Empresa.objects.update(
+            estado_solicitud='aprobada', estado_pago='pagado', activo=True, encuesta_respondida=True,
+        )
+        self.assertFalse(Empresa.publicas.exists())
+        Empresa.objects.recalcular_visibilidad()
+        self.assertQuerySetEqual(Empresa.publicas.all(), [empresa])
+
+
+class GeografiaVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_la_version_vence(self):
+        with mock.patch.object(geografia.cache, 'add', wraps=geografia.cache.add) as add:
+            geografia.datos()
+        self.assertEqual(add.call_args.args[2], geografia.TIMEOUT_VERSION)
+        with mock.patch.object(geografia.cache, 'set', wraps=geografia.cache.set) as set_:
+            geografia.invalidar_geografia()
+        self.assertEqual(set_.call_args.args[2], geografia.TIMEOUT_VERSION)
+
+    def test_recarga_cuando_la_version_vence(self):
+        antes = geografia.datos()
+        # Lo que ve un worker cuya caché local perdió la versión al vencer
+        cache.delete(geografia.CLAVE_VERSION)
+        self.assertIsNot(geografia.datos(), antes)
+
+
+class EmpresasCercanasParametrosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parametros_invalidos_responden_400(self):
+        url = reverse('appsocios:empresas_cercanas')
+        for parametros in (
+            {'bbox': 'nan,nan,nan,nan'},
+            {'bbox': '-33,-71,inf,-70'},
+            {'bbox': '-95,-71,-33,-70'},
+            {'bbox': '-33,-200,-32,-70'},
+            {'bbox': '-32,-71,-33,-70'},
+            {'lat': '-35', 'lng': '-71', 'radio': 'nan'},
+            {'lat': '-35', 'lng': '-71', 'radio': 'inf'},
+            {'lat': 'nan', 'lng': '-71'},
+            {'lat': '-35', 'lng': '-71', 'rubro': 'abc'},
+        ):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+    def test_parametros_validos(self):
+        url = reverse('appsocios:empresas_cercanas')
+        for parametros in (
+            {'bbox': '-36,-72,-34,-70', 'rubro': '1'},
+            {'lat': '-35', 'lng': '-71', 'radio': '5'},
+        ):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 200)
+
+
+class EmpresasTeselaParametrosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rubro(self):
+        url = reverse('appsocios:empresas_tesela', args=[10, 300, 600])
+        self.assertEqual(self.client.get(url, {'rubro': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'rubro': '1'}).status_code, 200)
+
+
+def crear_empresa_publica(nombre, latitud, longitud, **campos):
+    campos = {
+        'estado_solicitud': 'aprobada',
+        'estado_pago': 'pagado',
+        'encuesta_respondida': True,
+        'activo': True,
+        **campos,
+    }
+    return Empresa.objects.create(
+        nombre=nombre,
+        rut=f"76{Empresa.objects.count():07d}",
+        latitud=Decimal(str(latitud)),
+        longitud=Decimal(str(longitud)),
+        **campos,
+    )
+
+
+class EmpresasCercanasTests(TestCase):
+    """Consultas de cercanía sobre la grilla espacial."""
+
+    CENTRO = (-35.0, -71.0)
+
+    @classmethod
+    def setUpTestData(cls):
+        # Una empresa cada ~1,1 km hacia el norte del centro, una a ~111 km y
+        # otra más allá de RADIO_MAXIMO_KM
+        for i in range(6):
+            crear_empresa_publica(f"Cerca {i}", cls.CENTRO[0] + i * 0.01, cls.CENTRO[1])
+        crear_empresa_publica("Lejos", -34.0, -71.0)
+        crear_empresa_publica("Fuera de alcance", -30.0, -71.0)
+        crear_empresa_publica("Sin publicar", cls.CENTRO[0], cls.CENTRO[1], activo=False)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('appsocios:empresas_cercanas')
+
+    def nombres(self, parametros):
+        respuesta = self.client.get(self.url, parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return [empresa['nombre'] for empresa in respuesta.json()['empresas']]
+
+    def test_celda_se_calcula_al_guardar(self):
+        empresa = Empresa.objects.get(nombre="Cerca 0")
+        self.assertEqual((empresa.celda_lat, empresa.celda_lng), geo.celda(*self.CENTRO))
+
+    def test_las_n_mas_cercanas_ordenadas_por_distancia(self):
+        nombres = self.nombres({'lat': self.CENTRO[0], 'lng': self.CENTRO[1], 'n': 3})
+        self.assertEqual(nombres, ["Cerca 0", "Cerca 1", "Cerca 2"])
+
+    def test_las_n_mas_cercanas_amplian_el_radio_hasta_el_maximo(self):
+        nombres = self.nombres({'lat': self.CENTRO[0], 'lng': self.CENTRO[1], 'n': 10})
+        self.assertEqual(nombres, [f"Cerca {i}" for i in range(6)] + ["Lejos"])
+
+    def test_radio(self):
+        nombres = self.nombres({'lat': self.CENTRO[0], 'lng': self.CENTRO[1], 'radio': 2.5})
+        self.assertEqual(nombres, ["Cerca 0", "Cerca 1", "Cerca 2"])
+
+    def test_bbox(self):
+        nombres = self.nombres({'bbox': '-35.005,-71.01,-34.975,-70.99'})
+        self.assertCountEqual(nombres, ["Cerca 0", "Cerca 1", "Cerca 2"])
+
+    def test_distancia_km(self):
+        # Un grado de latitud mide ~111,2 km
+        self.assertAlmostEqual(geo.distancia_km(-35, -71, -34, -71), 111.2, places=1)
+
+
+def tesela_de(z, latitud, longitud):
+    """Índices x, y de la tesela XYZ que contiene el punto."""
+    n = 2 ** z
+    fila = (1 - math.asinh(math.tan(math.radians(latitud))) / math.pi) / 2 * n
+    return int((longitud + 180) / 360 * n), int(fila)
+
+
+class EmpresasTeselaTests(TestCase):
+    """Agrupación de marcadores por tesela según el zoom."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Tres empresas a pocos metros entre sí y una aislada a ~5 km
+        for i in range(3):
+            crear_empresa_publica(f"Centro {i}", -35.0 + i * 0.0005, -71.2)
+        crear_empresa_publica("Aislada", -35.0, -71.26)
+
+    def setUp(self):
+        cache.clear()
+
+    def tesela(self, z):
+        respuesta = self.client.get(reverse('appsocios:empresas_tesela', args=[z, *tesela_de(z, -35.0, -71.2)]))
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_zoom_bajo_agrupa_las_empresas_cercanas(self):
+        datos = self.tesela(10)
+        self.assertEqual([grupo['total'] for grupo in datos['grupos']], [3])
+        self.assertAlmostEqual(datos['grupos'][0]['latitud'], -34.9995, places=4)
+        self.assertEqual([empresa['nombre'] for empresa in datos['empresas']], ["Aislada"])
+
+    def test_zoom_alto_no_agrupa(self):
+        datos = self.tesela(geo.ZOOM_SIN_AGRUPAR)
+        self.assertEqual(datos['grupos'], [])
+        self.assertCountEqual([empresa['nombre'] for empresa in datos['empresas']], ["Centro 0", "Centro 1", "Centro 2"])
+
+    def test_la_tesela_solo_incluye_su_zona(self):
+        x, y = tesela_de(10, -35.0, -71.2)
+        datos = self.client.get(reverse('appsocios:empresas_tesela', args=[10, x + 2, y])).json()
+        self.assertEqual((datos['grupos'], datos['empresas']), ([], []))
+
+
+class BuscarSociosTests(TestCase):
+    """Autocompletado de socios del formulario de empresa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', socios=3, empresas=0, posts=0, eventos=0, stdout=io.StringIO())
+        cls.socio = Socio.objects.order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('appsocios:buscar_socios')
+        self.admin = benchmark.cliente_admin()
+
+    def sugerencias(self, q):
+        respuesta = self.admin.get(self.url, {'q': q})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_solo_admin(self):
+        self.assertRedirects(
+            self.client.get(self.url, {'q': '12'}), reverse('applogin:iniciar'), fetch_redirect_response=False,
+        )
+        socio = Client()
+        socio.force_login(usuario_de_socio(self.socio))
+        self.assertEqual(socio.get(self.url, {'q': '12'}).status_code, 403)
+
+    def test_run_completo_con_formato(self):
+        run = self.socio.socio_rut
+        formateado = f"{int(run[:-1]):,}".replace(",", ".") + f"-{run[-1]}"
+        datos = self.sugerencias(formateado)
+        self.assertEqual(datos['exacto']['id'], self.socio.socio_id)
+        self.assertEqual(datos['exacto']['run_formateado'], formateado)
+        self.assertEqual([s['id'] for s in datos['socios']], [self.socio.socio_id])
+
+    def test_prefijo_de_run(self):
+        prefijo = self.socio.socio_rut[:3]
+        datos = self.sugerencias(prefijo)
+        esperados = Socio.objects.filter(socio_rut__startswith=prefijo).order_by('socio_rut')
+        self.assertEqual([s['run'] for s in datos['socios']], [s.socio_rut for s in esperados])
+        self.assertIsNone(datos['exacto'])
+
+    def test_nombre(self):
+        datos = self.sugerencias(self.socio.socio_nombre)
+        self.assertIn(self.socio.socio_id, [s['id'] for s in datos['socios']])
+
+    def test_texto_corto_no_consulta(self):
+        self.sugerencias('')  # deja el rol del admin en caché
+        # Solo la sesión y el usuario: no se busca ningún socio
+        with self.assertNumQueries(2):
+            datos = self.admin.get(self.url, {'q': '1'}).json()
+        self.assertEqual(datos, {'socios': [], 'exacto': None})
+
+
+def crear_geografia():
+    """Dos regiones con una provincia y dos comunas cada una."""
+    comunas = {}
+    for nombre in ("Maule", "Ñuble"):
+        region = Region.objects.create(region=nombre, abreviatura=nombre[:2].upper(), capital=nombre)
+        provincia = Provincia.objects.create(provincia=nombre, region=region)
+        comunas[region] = [Comuna.objects.create(comuna=f"{nombre} {i}", provincia=provincia) for i in range(2)]
+    return comunas
+
+
+class GeografiaCacheTests(TestCase):
+    """Regiones y comunas se cargan una vez por proceso hasta que cambian."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.comunas = crear_geografia()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_segunda_lectura_sin_consultas(self):
+        primera = geografia.datos()
+        with self.assertNumQueries(0):
+            self.assertIs(geografia.datos(), primera)
+            geografia.opciones_regiones()
+            geografia.opciones_comunas()
+
+    def test_indices(self):
+        region, comunas = next(iter(self.comunas.items()))
+        datos = geografia.datos()
+        self.assertEqual([r['nombre'] for r in datos['regiones']], ["Maule", "Ñuble"])
+        self.assertEqual(
+            [c['nombre'] for c in datos['comunas_por_region'][region.pk]], [c.comuna for c in comunas],
+        )
+        self.assertEqual(geografia.region_de_comuna(comunas[0].pk), region.pk)
+        self.assertEqual(geografia.opciones_comunas(region.pk), [(c.pk, c.comuna) for c in comunas])
+
+    def test_cambio_en_las_tablas_recarga(self):
+        region = Region.objects.get(region="Maule")
+        antes = geografia.datos()
+        self.assertIs(geografia.datos(), antes)
+        region.region = "Del Maule"
+        region.save()
+        datos = geografia.datos()
+        self.assertIsNot(datos, antes)
+        self.assertEqual(datos['regiones'][0]['nombre'], "Del Maule")
+
+    def test_datos_geograficos_revalida_con_etag(self):
+        url = reverse('appsocios:datos_geograficos')
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['comunas']), 4)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+
+class ComunasRegionTests(TestCase):
+    """Selector dependiente de comunas del formulario de empresa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.comunas = crear_geografia()
+        cls.maule, cls.nuble = cls.comunas
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comunas_de_la_region(self):
+        respuesta = self.client.get(reverse('appsocios:comunas_region', args=[self.maule.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            respuesta.json(), {'comunas': [{'id': c.pk, 'nombre': c.comuna} for c in self.comunas[self.maule]]},
+        )
+
+    def test_revalida_con_etag(self):
+        url = reverse('appsocios:comunas_region', args=[self.maule.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(etag, self.client.get(reverse('appsocios:comunas_region', args=[self.nuble.pk]))['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_region_inexistente(self):
+        url = reverse('appsocios:comunas_region', args=[self.nuble.pk + 100])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_formulario_ofrece_solo_las_comunas_de_la_region(self):
+        form = EmpresaForm(data={'region': self.maule.pk})
+        self.assertEqual(
+            [valor for valor, _ in form.fields['comuna'].choices][1:], [c.pk for c in self.comunas[self.maule]],
+        )
+
+    def test_formulario_rechaza_comuna_de_otra_region(self):
+        form = EmpresaForm(data={'region': self.maule.pk, 'comuna': self.comunas[self.nuble][0].pk})
+        form.is_valid()
+        self.assertEqual(form.errors['comuna'], ["La comuna seleccionada no pertenece a la región."])
+
+
+class CargarDatosGeograficosTests(TestCase):
+    """El cargador compara contra lo existente y solo escribe las diferencias."""
+
+    DATOS = {
+        'regiones': [
+            {'id': 1, 'region': 'Maule', 'abreviatura': 'ML', 'capital': 'Talca'},
+            {'id': 2, 'region': 'Ñuble', 'abreviatura': 'NB', 'capital': 'Chillán'},
+        ],
+        'provincias': [
+            {'id': 1, 'provincia': 'Curicó', 'region_id': 1},
+            {'id': 2, 'provincia': 'Diguillín', 'region_id': 2},
+        ],
+        'comunas': [
+            {'id': 1, 'comuna': 'Curicó', 'provincia_id': 1},
+            {'id': 2, 'comuna': 'Molina', 'provincia_id': 1},
+            {'id': 3, 'comuna': 'Chillán', 'provincia_id': 2},
+        ],
+    }
+
+    def setUp(self):
+        cache.clear()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.archivo = os.path.join(directorio.name, 'paisdata.json')
+        self.escribir(self.DATOS)
+
+    def escribir(self, datos):
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+
+    def cargar(self, *argumentos):
+        salida = io.StringIO()
+        call_command('cargar_datos_geograficos', '--archivo', self.archivo, *argumentos, stdout=salida)
+        return salida.getvalue()
+
+    def test_dry_run_no_guarda(self):
+        version = geografia.datos()['version']
+        salida = self.cargar('--dry-run')
+        self.assertIn('Regiones: 2 nuevas, 0 actualizadas, 0 sin cambios', salida)
+        self.assertIn('Comunas: 3 nuevas, 0 actualizadas, 0 sin cambios', salida)
+        self.assertIn('Simulación', salida)
+        self.assertEqual((Region.objects.count(), Provincia.objects.count(), Comuna.objects.count()), (0, 0, 0))
+        self.assertEqual(geografia.datos()['version'], version)
+
+    def test_carga_y_recarga_idempotente(self):
+        self.cargar()
+        self.assertEqual(
+            list(Comuna.objects.values_list('id', 'comuna', 'provincia__region_id')),
+            [(1, 'Curicó', 1), (2, 'Molina', 1), (3, 'Chillán', 2)],
+        )
+        version = geografia.datos()['version']
+        with CaptureQueriesContext(connection) as consultas:
+            salida = self.cargar()
+        # Una lectura por nivel y ninguna escritura
+        sentencias = [q['sql'].split()[0] for q in consultas if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(sentencias, ['SELECT'] * 3)
+        self.assertIn('Regiones: 0 nuevas, 0 actualizadas, 2 sin cambios', salida)
+        self.assertIn('Comunas: 0 nuevas, 0 actualizadas, 3 sin cambios', salida)
+        # Sin cambios no se invalida la caché geográfica
+        self.assertEqual(geografia.datos()['version'], version)
+
+    def test_informa_y_aplica_las_diferencias(self):
+        self.cargar()
+        version = geografia.datos()['version']
+        datos = json.loads(json.dumps(self.DATOS))
+        datos['comunas'][1]['comuna'] = 'Molina Centro'
+        datos['comunas'].append({'id': 4, 'comuna': 'Bulnes', 'provincia_id': 2})
+        self.escribir(datos)
+
+        self.assertIn('Comunas: 1 nuevas, 1 actualizadas, 2 sin cambios', self.cargar('--dry-run'))
+        self.assertEqual(Comuna.objects.get(pk=2).comuna, 'Molina')
+
+        self.assertIn('Comunas: 1 nuevas, 1 actualizadas, 2 sin cambios', self.cargar())
+        self.assertEqual(Comuna.objects.get(pk=2).comuna, 'Molina Centro')
+        self.assertTrue(Comuna.objects.filter(pk=4).exists())
+        self.assertNotEqual(geografia.datos()['version'], version)
+
+    def test_archivo_inexistente(self):
+        os.remove(self.archivo)
+        with self.assertRaises(CommandError):
+            self.cargar()
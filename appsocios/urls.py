@@ -8,7 +8,10 @@ urlpatterns = [
     path('registrarsocio/', views.crear_socio, name='crear_socio'),
     path('loginsocio/', views.login_socio, name='login_socio'),
     path('empresa/registro/', views.crear_empresa, name='crear_empresa'),
+    path('empresa/registro/buscar-socio/', views.buscar_socios, name='buscar_socios'),
     path('empresa/editar/<int:id_empresa>/', views.editar_empresa, name='editar_empresa'),
+    path('geografia.json', views.datos_geograficos, name='datos_geograficos'),
+    path('geografia/regiones/<int:region_id>/comunas.json', views.comunas_region, name='comunas_region'),
     path('rubros/', views.lista_rubros, name='lista_rubros'),
     path('rubros/crear/', views.crear_rubro, name='crear_rubro'),
     path('rubros/editar/<int:id_rubro>/', views.editar_rubro, name='editar_rubro'),
@@ -20,6 +23,8 @@ urlpatterns = [
     path('encuesta/', views.encuesta, name='encuesta'),
     path('encuesta/continuar/<int:id_empresa>/', views.continuar_encuesta, name='continuar_encuesta'),
     path('lista-empresas/', views.lista_empresas, name='lista_empresas'),
+    path('lista-empresas/cercanas/', views.empresas_cercanas, name='empresas_cercanas'),
+    path('lista-empresas/teselas/<int:z>/<int:x>/<int:y>/', views.empresas_tesela, name='empresas_tesela'),
     path('editar-perfil/', views.editar_socio, name='editar_socio'),
     path('cambiar-contrasena/', views.cambiar_contrasena, name='cambiar_contrasena'),
 ]
\ No newline at end of file
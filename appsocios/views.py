@@ -1,10 +1,19 @@
+import math
+
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import SocioForm, RubroForm, TipoComercializacionForm, EmpresaForm, EncuestaForm, CambiarContrasenaForm
-from .models import Socio, Empresa, Rubro, TipoComercializacion, Region, Comuna, Encuesta
+from .models import Socio, Empresa, Rubro, TipoComercializacion, Encuesta, normalizar_run
 from django.contrib import messages
-from applogin.utils import es_admin, es_socio
+from applogin.utils import es_socio, principal_de
+from applogin.decorators import solo_admin
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.hashers import make_password
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import condition
+from descubrecurico.cache_publico import cache_publico, EMPRESAS
+from appdashboard import busqueda
+from . import geo, geografia
 
 def empresas(request):
     return render(request, 'appsocios/empresas.html')
@@ -165,14 +174,94 @@ def eliminar_tipo_comercializacion(request, id_tipo):
         return redirect('appsocios:lista_tipos_comercializacion')
     return render(request, 'appsocios/empresa/eliminar_tipo_comercializacion.html', {'tipo': tipo})
 
+def _etag_geografia(request, *args, **kwargs):
+    return geografia.datos()['etag']
+
+@condition(etag_func=_etag_geografia)
+def datos_geograficos(request):
+    """Regiones y comunas en JSON, con ETag fuerte: los clientes revalidan con un 304."""
+    respuesta = HttpResponse(geografia.datos()['json'], content_type='application/json')
+    respuesta['Cache-Control'] = 'public, max-age=86400'
+    return respuesta
+
+def _etag_comunas_region(request, region_id):
+    documento = geografia.comunas_de_region_json(region_id)
+    return documento[1] if documento else None
+
+@condition(etag_func=_etag_comunas_region)
+def comunas_region(request, region_id):
+    """Comunas de una región en JSON, para el selector dependiente del formulario de empresa."""
+    documento = geografia.comunas_de_region_json(region_id)
+    if documento is None:
+        return JsonResponse({'error': 'Región no encontrada'}, status=404)
+    respuesta = HttpResponse(documento[0], content_type='application/json')
+    respuesta['Cache-Control'] = 'public, max-age=86400'
+    return respuesta
+
+def _id_o_none(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def _geografia_formulario(form):
+    # Regiones desde la caché por proceso; de las comunas solo se envían las de la
+    # región elegida, el resto las pide el selector a comunas_region
+    region_actual = _id_o_none(form['region'].value())
+    return {
+        'regions': geografia.datos()['regiones'],
+        'comunas': geografia.datos()['comunas_por_region'].get(region_actual, []),
+        'region_actual': region_actual,
+        'comuna_actual': _id_o_none(form['comuna'].value()),
+    }
+
+# Máximo de sugerencias del autocompletado de socios
+MAX_SUGERENCIAS_SOCIO = 10
+
+def _formatear_run(run):
+    cuerpo, dv = run[:-1], run[-1:]
+    return f"{int(cuerpo):,}".replace(",", ".") + f"-{dv}" if cuerpo.isdigit() else run
+
+@solo_admin
+def buscar_socios(request):
+    """
+    Sugerencias de socios para el campo RUN de crear_empresa, en JSON. Un texto con
+    forma de RUN se busca como prefijo del RUN normalizado (índice único de
+    socio_rut); cualquier otro texto, por prefijo de nombre en el índice de búsqueda.
+    """
+    q = request.GET.get('q', '').strip()
+    run = normalizar_run(q)
+    if len(run) < 2:
+        return JsonResponse({'socios': [], 'exacto': None})
+
+    socios = Socio.objects.only('socio_id', 'socio_rut', 'socio_nombre', 'socio_apellido_paterno')
+    if run[:-1].isdigit() or run.isdigit():
+        socios = socios.filter(socio_rut__startswith=run).order_by('socio_rut')[:MAX_SUGERENCIAS_SOCIO]
+    else:
+        ids = busqueda.ids_coincidentes(q, busqueda.SOCIO, limite=MAX_SUGERENCIAS_SOCIO)
+        socios = sorted(socios.filter(pk__in=ids), key=lambda socio: ids.index(socio.pk))
+
+    sugerencias = [
+        {
+            'id': socio.socio_id,
+            'run': socio.socio_rut,
+            'run_formateado': _formatear_run(socio.socio_rut),
+            'nombre': str(socio),
+        }
+        for socio in socios
+    ]
+    exacto = next((s for s in sugerencias if s['run'] == run), None)
+    return JsonResponse({'socios': sugerencias, 'exacto': exacto})
+
 def crear_empresa(request):
+    principal = principal_de(request)
     # Verificar que el usuario sea admin o socio
-    if not es_admin(request.user) and not es_socio(request.user, request):
+    if not principal.es_admin and not principal.es_socio:
         messages.error(request, "No tienes permiso para crear empresas.")
         return redirect('appsocios:lista_empresas')
     
-    es_usuario_socio = es_socio(request.user, request)
-    es_usuario_admin = es_admin(request.user)
+    es_usuario_socio = principal.es_socio
+    es_usuario_admin = principal.es_admin
     
     if request.method == 'POST':
         form = EmpresaForm(request.POST, request.FILES, es_socio=es_usuario_socio)
@@ -190,8 +279,7 @@ def crear_empresa(request):
                     messages.error(request, " No tienes un perfil de socio vinculado.")
                     context = {
                         'form': form,
-                        'regions': Region.objects.all(),
-                        'comunas': Comuna.objects.all(),
+                        **_geografia_formulario(form),
                         'es_edicion': False,
                         'es_socio': True,
                         'es_admin': es_usuario_admin
@@ -206,8 +294,7 @@ def crear_empresa(request):
                     messages.error(request, " Debes ingresar el RUN del socio.")
                     context = {
                         'form': form,
-                        'regions': Region.objects.all(),
-                        'comunas': Comuna.objects.all(),
+                        **_geografia_formulario(form),
                         'es_edicion': False,
                         'es_socio': False,
                         'es_admin': True
@@ -221,8 +308,7 @@ def crear_empresa(request):
                     messages.error(request, " El RUN ingresado no corresponde a ningún socio registrado.")
                     context = {
                         'form': form,
-                        'regions': Region.objects.all(),
-                        'comunas': Comuna.objects.all(),
+                        **_geografia_formulario(form),
                         'es_edicion': False,
                         'es_socio': False,
                         'es_admin': True
@@ -240,8 +326,7 @@ def crear_empresa(request):
             # Pasar variable de éxito al template
             context = {
                 'form': form,
-                'regions': Region.objects.all(),
-                'comunas': Comuna.objects.all(),
+                **_geografia_formulario(form),
                 'es_edicion': False,
                 'empresa_creada': True,
                 'empresa': empresa,
@@ -254,53 +339,153 @@ def crear_empresa(request):
 
     context = {
         'form': form,
-        'regions': Region.objects.all(),
-        'comunas': Comuna.objects.all(),
+        **_geografia_formulario(form),
         'es_edicion': False,
         'es_socio': es_usuario_socio,
         'es_admin': es_usuario_admin
     }
     return render(request, 'appsocios/empresa/crear_empresa.html', context)
 
+def _empresas_publicas():
+    # Empresas visibles en el directorio público: igualdad indexada sobre visible_publico
+    return Empresa.publicas.all()
+
+# Únicos campos que leen la tarjeta del directorio y los marcadores del mapa
+CAMPOS_EMPRESA_PUBLICA = (
+    'id_empresa', 'nombre', 'telefono', 'correo', 'direccion_completa', 'calle', 'foto',
+    'latitud', 'longitud', 'socio_id', 'rubro_id', 'rubro__nombre_rubro',
+)
+
+def _empresa_publica(fila):
+    """Empresa del directorio a partir de una fila de CAMPOS_EMPRESA_PUBLICA."""
+    empresa = {
+        'id': fila['id_empresa'],
+        'nombre': fila['nombre'],
+        'rubro': fila['rubro__nombre_rubro'] or 'Sin rubro',
+        'rubro_id': fila['rubro_id'] or '',
+        'telefono': fila['telefono'] or 'N/A',
+        'correo': fila['correo'] or 'N/A',
+        'direccion': fila['direccion_completa'] or fila['calle'] or 'N/A',
+        'imagen': Empresa._meta.get_field('foto').storage.url(fila['foto']) if fila['foto'] else None,
+        'latitud': float(fila['latitud']) if fila['latitud'] is not None else None,
+        'longitud': float(fila['longitud']) if fila['longitud'] is not None else None,
+        'socio_id': fila['socio_id'],
+    }
+    if 'distancia_km' in fila:
+        empresa['distancia_km'] = fila['distancia_km']
+    return empresa
+
+@cache_publico(EMPRESAS)
 def lista_empresas(request):
-    import json
-    
     rubro_seleccionado = request.GET.get('rubro')
-    empresas = Empresa.objects.filter(
-        estado_pago='pagado',
-        encuesta_respondida=True,
-        estado_solicitud='aprobada',
-        activo=True
-    )
+    empresas = _empresas_publicas()
+
+    q = request.GET.get('q', '').strip()
 
     if rubro_seleccionado:
         empresas = empresas.filter(rubro__id_rubro=rubro_seleccionado)
 
-    rubros = Rubro.objects.all()
+    if q:
+        # Coincidencias ordenadas por relevancia; la búsqueda va como subconsulta
+        empresas = busqueda.filtrar(empresas, q, busqueda.EMPRESA, por_relevancia=True)
 
-    # Convertir empresas a JSON para pasar a JavaScript
-    empresas_data = []
-    for emp in empresas:
-        empresas_data.append({
-            'id': emp.id_empresa,
-            'nombre': emp.nombre,
-            'rubro': emp.rubro.nombre_rubro if emp.rubro else 'Sin rubro',
-            'rubro_id': emp.rubro.id_rubro if emp.rubro else '',
-            'telefono': emp.telefono or 'N/A',
-            'correo': emp.correo or 'N/A',
-            'direccion': emp.direccion_completa or emp.calle or 'N/A',
-            'imagen': emp.foto.url if emp.foto else '/static/imagenes/default-empresa.jpg',
-            'latitud': float(emp.latitud) if emp.latitud else -35.0,
-            'longitud': float(emp.longitud) if emp.longitud else -71.2,
-        })
+    # Una sola consulta proyectada; la tarjeta no toca relaciones por empresa
+    empresas = [_empresa_publica(fila) for fila in empresas.values(*CAMPOS_EMPRESA_PUBLICA)]
+    rubros = Rubro.objects.all()
+    principal = principal_de(request)
 
     return render(request, 'appsocios/empresa/lista_empresas.html', {
         'empresas': empresas,
         'rubros': rubros,
         'rubro_seleccionado': rubro_seleccionado,
-        'empresas_json': json.dumps(empresas_data),
-        'es_admin': es_admin(request.user),
-        'es_socio': es_socio(request.user, request),
+        'q': q,
+        'es_admin': principal.es_admin,
+        'es_socio': principal.es_socio,
+        'socio_actual_id': principal.socio_id if principal.es_socio else None,
+    })
+
+def _floats_finitos(valores):
+    # float() acepta 'nan' e 'inf', que no sirven como coordenadas ni distancias
+    numeros = [float(valor) for valor in valores]
+    if not all(math.isfinite(numero) for numero in numeros):
+        raise ValueError
+    return numeros
+
+def _parametros_float(request, *nombres):
+    try:
+        return _floats_finitos(request.GET[nombre] for nombre in nombres)
+    except (KeyError, ValueError):
+        return None
+
+def _empresas_del_rubro(request):
+    """Empresas públicas, filtradas por ?rubro=<id> si viene; None si el rubro no es un id."""
+    empresas = _empresas_publicas()
+    rubro = request.GET.get('rubro')
+    if rubro:
+        rubro_id = _id_o_none(rubro)
+        if rubro_id is None:
+            return None
+        empresas = empresas.filter(rubro__id_rubro=rubro_id)
+    return empresas
+
+@cache_publico(EMPRESAS)
+def empresas_cercanas(request):
+    """
+    Empresas públicas en una zona del mapa, en JSON. Acepta una de:
+      ?bbox=sur,oeste,norte,este   empresas dentro del rectángulo visible
+      ?lat=&lng=&radio=            empresas a menos de `radio` km del punto
+      ?lat=&lng=&n=                las n empresas más cercanas al punto
+    y opcionalmente ?rubro=<id>.
+    """
+    empresas = _empresas_del_rubro(request)
+    if empresas is None:
+        return JsonResponse({'error': 'rubro inválido'}, status=400)
+
+    if 'bbox' in request.GET:
+        try:
+            sur, oeste, norte, este = _floats_finitos(request.GET['bbox'].split(','))
+        except ValueError:
+            return JsonResponse({'error': 'bbox debe ser sur,oeste,norte,este'}, status=400)
+        if not (-90 <= sur <= norte <= 90 and -180 <= oeste <= este <= 180):
+            return JsonResponse({'error': 'bbox inválido'}, status=400)
+        filas = geo.empresas_en_caja(empresas, sur, oeste, norte, este).values(*CAMPOS_EMPRESA_PUBLICA)
+        filas = filas[:geo.MAX_RESULTADOS]
+    else:
+        centro = _parametros_float(request, 'lat', 'lng')
+        if centro is None or not (-90 <= centro[0] <= 90 and -180 <= centro[1] <= 180):
+            return JsonResponse({'error': 'Se requiere bbox o lat y lng válidos'}, status=400)
+        if 'radio' in request.GET:
+            radio = _parametros_float(request, 'radio')
+            if radio is None or radio[0] <= 0:
+                return JsonResponse({'error': 'radio inválido'}, status=400)
+            filas = geo.empresas_en_radio(empresas, *centro, radio[0], CAMPOS_EMPRESA_PUBLICA)[:geo.MAX_RESULTADOS]
+        else:
+            try:
+                cantidad = min(max(int(request.GET.get('n', 10)), 1), geo.MAX_RESULTADOS)
+            except ValueError:
+                return JsonResponse({'error': 'n inválido'}, status=400)
+            filas = geo.empresas_cercanas(empresas, *centro, cantidad, CAMPOS_EMPRESA_PUBLICA)
+
+    return JsonResponse({'empresas': [_empresa_publica(fila) for fila in filas]})
+
+@cache_publico(EMPRESAS)
+def empresas_tesela(request, z, x, y):
+    """
+    Marcadores de la tesela z/x/y del mapa del directorio, agrupados según el zoom.
+    El mapa pide solo las teselas visibles; cada tesela queda cacheada por rubro
+    hasta el siguiente cambio de empresas.
+    """
+    if z > 19 or x >= 2 ** z or y >= 2 ** z:
+        return JsonResponse({'error': 'Tesela inválida'}, status=400)
+
+    empresas = _empresas_del_rubro(request)
+    if empresas is None:
+        return JsonResponse({'error': 'rubro inválido'}, status=400)
+
+    grupos, individuales = geo.grupos_en_tesela(empresas, z, x, y, CAMPOS_EMPRESA_PUBLICA)
+    return JsonResponse({
+        'grupos': grupos,
+        'empresas': [_empresa_publica(fila) for fila in individuales],
     })
 
 def encuesta(request):
@@ -325,7 +510,7 @@ def encuesta(request):
             form.save()
             # Actualizar estado de encuesta en la empresa
             empresa.encuesta_respondida = True
-            empresa.save()
+            empresa.save(update_fields=['encuesta_respondida'])
             # Limpiar la sesión
             if 'empresa_id' in request.session:
                 del request.session['empresa_id']
@@ -355,7 +540,7 @@ def continuar_encuesta(request, id_empresa):
     if socio_id_session and empresa.socio and empresa.socio.socio_id == socio_id_session:
         permiso = True
     elif request.user.is_authenticated:
-        if es_admin(request.user):
+        if principal_de(request).es_admin:
             permiso = True
         elif es_socio(request.user):
             try:
@@ -386,8 +571,7 @@ def editar_empresa(request, id_empresa):
     
     context = {
         'form': form,
-        'regions': Region.objects.all(),
-        'comunas': Comuna.objects.all(),
+        **_geografia_formulario(form),
         'empresa': empresa,
         'es_edicion': True
     }
@@ -395,33 +579,21 @@ def editar_empresa(request, id_empresa):
 
 
 def login_socio(request):
-    """Vista de login para socios"""
+    """Login de socios por RUT; usa el mismo backend que applogin:iniciar"""
     from .forms_login import SocioLoginForm
     
-    if request.method == 'POST':
-        form = SocioLoginForm(request.POST)
-        if form.is_valid():
-            rut = form.cleaned_data.get('rut').upper().replace('.', '').replace('-', '')
-            contraseña = form.cleaned_data.get('contraseña')
-            
-            try:
-                # Buscar socio por RUT
-                socio = Socio.objects.get(socio_rut=rut)
-                
-                # Verificar contraseña
-                if socio.socio_contraseña and check_password(contraseña, socio.socio_contraseña):
-                    # Crear sesión para el socio
-                    request.session['socio_id'] = socio.socio_id
-                    request.session['socio_nombre'] = f"{socio.socio_nombre} {socio.socio_apellido_paterno}"
-                    request.session['socio_rut'] = socio.socio_rut
-                    
-                    
-                    return redirect('appsocios:lista_empresas')
-                else:
-                    messages.error(request, "RUT o contraseña incorrectos.")
-            except Socio.DoesNotExist:
-                messages.error(request, "RUT o contraseña incorrectos.")
-    else:
-        form = SocioLoginForm()
-    
-    return render(request, 'appsocios/socio/login_socio.html', {'form': form})
\ No newline at end of file
+    if request.method != 'POST':
+        return redirect('applogin:iniciar')
+
+    form = SocioLoginForm(request.POST)
+    if form.is_valid():
+        user = authenticate(
+            request,
+            username=form.cleaned_data.get('rut'),
+            password=form.cleaned_data.get('contraseña'),
+        )
+        if user is not None and es_socio(user):
+            login(request, user)
+            return redirect('appsocios:lista_empresas')
+    messages.error(request, "RUT o contraseña incorrectos.")
+    return redirect('applogin:iniciar')
@@ -0,0 +1,87 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Tiempo máximo que una página cacheada sobrevive sin invalidación explícita
+TIMEOUT_PAGINAS = 600
+
+# Grupos de invalidación: cada página declara de qué datos depende
+CONTENIDO = "contenido"
+EVENTOS = "eventos"
+EMPRESAS = "empresas"
+
+
+def _clave_version(grupo):
+    return f"cache_publico:version:{grupo}"
+
+
+def _versiones(grupos):
+    """Versión vigente de cada grupo; cambiarla deja huérfanas sus páginas cacheadas."""
+    claves = [_clave_version(grupo) for grupo in grupos]
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            cache.add(clave, uuid.uuid4().hex, None)
+            versiones[clave] = cache.get(clave)
+    return [versiones[clave] for clave in claves]
+
+
+def version(grupo):
+    """Versión vigente de un grupo, para incluirla en la clave de un fragmento cacheado."""
+    return _versiones([grupo])[0]
+
+
+def invalidar_paginas(*grupos):
+    """Descarta las páginas cacheadas que dependen de alguno de los grupos."""
+    for grupo in grupos:
+        cache.set(_clave_version(grupo), uuid.uuid4().hex, None)
+
+
+def _es_anonimo(request):
+    return not request.user.is_authenticated and not request.session.get('es_socio_login')
+
+
+def _tiene_mensajes(request):
+    # Los mensajes pendientes son propios del visitante y no deben quedar en caché
+    return 'messages' in request.COOKIES or '_messages' in request.session
+
+
+def cache_publico(*grupos, timeout=TIMEOUT_PAGINAS):
+    """
+    Decorador que cachea la respuesta completa de una vista pública para visitantes
+    anónimos, con clave URL + parámetros GET y la versión de los grupos de los que
+    depende. Los usuarios autenticados y los socios siempre reciben la página fresca.
+
+    Uso:
+        @cache_publico(EMPRESAS)
+        def lista_empresas(request):
+            ...
+    """
+    def decorador(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _es_anonimo(request) or _tiene_mensajes(request):
+                return view_func(request, *args, **kwargs)
+
+            url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            clave = f"cache_publico:pagina:{':'.join(_versiones(grupos))}:{url}"
+            guardada = cache.get(clave)
+            if guardada is not None:
+                contenido, content_type = guardada
+                return HttpResponse(contenido, content_type=content_type)
+
+            respuesta = view_func(request, *args, **kwargs)
+            # Una página que usó el token CSRF es propia del visitante que la pidió
+            if (
+                respuesta.status_code == 200
+                and not respuesta.streaming
+                and not respuesta.cookies
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            ):
+                cache.set(clave, (respuesta.content, respuesta['Content-Type']), timeout)
+            return respuesta
+        return _wrapped_view
+    return decorador
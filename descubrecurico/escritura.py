@@ -0,0 +1,49 @@
+from django.db import models, router, transaction
+
+
+class EscrituraAtomica(models.Model):
+    """
+    Base para modelos cuyas señales necesitan saber cómo estaba la fila al escribirla.
+
+    save() y delete() corren en una transacción que primero bloquea la fila con
+    select_for_update() y deja en `_valores_previos` sus CAMPOS_PREVIOS leídos de la
+    base (None si la fila es nueva o ya no existe). save() se salta ese paso si no hay
+    CAMPOS_PREVIOS o si su update_fields no incluye ninguno. Las señales post_save y post_delete
+    corren dentro de esa misma transacción, así que lo que escriban se confirma o se
+    revierte junto con la fila, y dos escrituras concurrentes de la misma fila se
+    ordenan en vez de partir ambas del mismo estado.
+    """
+    CAMPOS_PREVIOS = ()
+
+    class Meta:
+        abstract = True
+
+    def _leer_previos(self, using):
+        if self._state.adding or self.pk is None:
+            return None
+        return (
+            type(self)._base_manager.using(using).select_for_update()
+            .filter(pk=self.pk).values('pk', *self.CAMPOS_PREVIOS).first()
+        )
+
+    def _necesita_previos(self, update_fields):
+        # Un guardado que no toca CAMPOS_PREVIOS (p. ej. el rehash de una contraseña) no
+        # cambia lo que leen las señales: no vale un bloqueo ni una consulta extra
+        if not self.CAMPOS_PREVIOS:
+            return False
+        return update_fields is None or not set(update_fields).isdisjoint(self.CAMPOS_PREVIOS)
+
+    def save(self, *args, **kwargs):
+        if not self._necesita_previos(kwargs.get('update_fields')):
+            self._valores_previos = None
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self._valores_previos = self._leer_previos(using)
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self._valores_previos = self._leer_previos(using)
+            return super().delete(using=using, keep_parents=keep_parents)
@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def _serializar(valor):
+    # isoformat conserva los microsegundos, necesarios para comparar por igualdad
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Valor no serializable en el cursor: {valor!r}")
+
+
+class PaginaCursor:
+    """Página obtenida por cursor, con tokens opacos hacia la página siguiente y anterior."""
+
+    def __init__(self, object_list, next_token=None, prev_token=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.prev_token = prev_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.prev_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginación por cursor (keyset) sobre un orden total, p. ej. ("-publicado_en", "-id").
+
+    Cada página se pide con un WHERE sobre los valores de la última fila vista en lugar
+    de un OFFSET, por lo que las páginas profundas cuestan lo mismo que la primera y no
+    se necesita un COUNT de la tabla.
+    """
+
+    def __init__(self, orden, por_pagina=12):
+        self.orden = list(orden)
+        self.por_pagina = por_pagina
+
+    def get_page(self, consulta, token=None):
+        """
+        `consulta` puede ser un QuerySet o un callable(condicion, orden) que retorne uno
+        ya filtrado y ordenado; lo segundo permite aplicar el cursor a cada parte de un
+        UNION, donde Django no admite filtrar el queryset combinado.
+        """
+        direccion, valores = self._decodificar(token)
+        hacia_atras = direccion == "prev"
+        orden = [self._invertir(campo) for campo in self.orden] if hacia_atras else self.orden
+        try:
+            filas = self._filas(consulta, orden, valores)
+        except (ValidationError, ValueError, TypeError):
+            # Token bien formado con valores que no calzan con los tipos de los campos
+            # (p. ej. un texto donde va una fecha): se vuelve a la primera página
+            if not valores:
+                raise
+            return self.get_page(consulta)
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[: self.por_pagina]
+
+        if hacia_atras:
+            filas.reverse()
+            tiene_siguiente, tiene_anterior = True, hay_mas
+        else:
+            tiene_siguiente, tiene_anterior = hay_mas, bool(valores)
+
+        next_token = self._codificar("next", filas[-1]) if filas and tiene_siguiente else None
+        prev_token = self._codificar("prev", filas[0]) if filas and tiene_anterior else None
+        return PaginaCursor(filas, next_token=next_token, prev_token=prev_token)
+
+    def _filas(self, consulta, orden, valores):
+        condicion = self._condicion(orden, valores) if valores else None
+        if callable(consulta):
+            qs = consulta(condicion, orden)
+        else:
+            qs = consulta.filter(condicion) if condicion is not None else consulta
+            qs = qs.order_by(*orden)
+        return list(qs[: self.por_pagina + 1])
+
+    @staticmethod
+    def _invertir(campo):
+        return campo[1:] if campo.startswith("-") else f"-{campo}"
+
+    @staticmethod
+    def _condicion(orden, valores):
+        # (a, b) "después de" (va, vb)  ->  a > va  OR  (a = va AND b > vb), según la dirección
+        condicion = Q()
+        iguales = {}
+        for campo, valor in zip(orden, valores):
+            nombre = campo.lstrip("-")
+            lookup = "lt" if campo.startswith("-") else "gt"
+            condicion |= Q(**iguales, **{f"{nombre}__{lookup}": valor})
+            iguales[nombre] = valor
+        return condicion
+
+    def _valores(self, fila):
+        nombres = [campo.lstrip("-") for campo in self.orden]
+        if isinstance(fila, dict):
+            return [fila[nombre] for nombre in nombres]
+        return [getattr(fila, nombre) for nombre in nombres]
+
+    def _codificar(self, direccion, fila):
+        datos = json.dumps([direccion, self._valores(fila)], default=_serializar)
+        return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+    def _decodificar(self, token):
+        if not token:
+            return "next", None
+        try:
+            relleno = "=" * (-len(token) % 4)
+            direccion, valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+        except (ValueError, TypeError, binascii.Error):
+            # Un token inválido o manipulado vuelve a la primera página
+            return "next", None
+        if direccion not in ("next", "prev") or not isinstance(valores, list) or len(valores) != len(self.orden):
+            return "next", None
+        return direccion, valores
@@ -0,0 +1,273 @@
+"""
+Perfilado opcional de peticiones.
+
+PerfiladoMiddleware mide, solo en las peticiones que se eligen para perfilar, el
+tiempo total, el tiempo y número de consultas SQL (con las repetidas y el lugar del
+código que las lanzó), el tiempo de renderizado de plantillas y los aciertos de caché.
+El resultado viaja en la cabecera Server-Timing y se acumula por vista en la caché,
+donde lo lee la página de perfilado del dashboard.
+
+Una petición se perfila si:
+  - trae la cabecera X-Perfilado con el valor de settings.PERFILADO_TOKEN,
+  - la sesión la activó un administrador desde el dashboard (clave SESION_PERFILADO), o
+  - cae en la muestra aleatoria settings.PERFILADO_MUESTREO (0 a 1, por defecto 0).
+
+Debe ir después de SessionMiddleware y AuthenticationMiddleware.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.crypto import constant_time_compare
+
+SESION_PERFILADO = "perfilado_activo"
+CABECERA = "HTTP_X_PERFILADO"
+# Cada vista acumula en su propia clave; el índice lista las vistas con datos
+CLAVE_VISTAS = "perfilado:vistas"
+# Peticiones que no resolvieron a ninguna vista (404, estáticos): una sola entrada
+SIN_RUTA = "<sin_ruta>"
+
+# Vistas que se conservan en el resumen; las nuevas que no quepan no se acumulan
+MAX_VISTAS = 200
+# Consultas repetidas y lugares de llamada que se conservan por vista
+MAX_REPETIDAS = 10
+
+_local = threading.local()
+_fallo = object()
+
+
+def _perfil_actual():
+    return getattr(_local, 'perfil', None)
+
+
+class Perfil:
+    """Mediciones de una petición."""
+
+    def __init__(self):
+        self.consultas = []
+        self.db_ms = 0.0
+        self.plantillas_ms = 0.0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+
+    def repetidas(self):
+        """Consultas con el mismo SQL ejecutadas más de una vez, con sus lugares de llamada."""
+        conteo = Counter(sql for sql, _ in self.consultas)
+        lugares = {}
+        for sql, lugar in self.consultas:
+            if conteo[sql] > 1:
+                lugares.setdefault(sql, Counter())[lugar] += 1
+        return [
+            {'sql': sql, 'veces': conteo[sql], 'lugares': dict(lugares[sql].most_common(3))}
+            for sql in sorted(lugares, key=conteo.__getitem__, reverse=True)
+        ]
+
+
+# --- Instrumentación ---
+
+def _lugar_de_llamada():
+    # Primer marco del proyecto (fuera de Django y de las librerías) que llevó a la consulta
+    base = str(settings.BASE_DIR)
+    marco = sys._getframe(2)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(base) and 'site-packages' not in archivo and archivo != __file__:
+            return f"{os.path.relpath(archivo, base)}:{marco.f_lineno} ({marco.f_code.co_name})"
+        marco = marco.f_back
+    return "?"
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    perfil = _perfil_actual()
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if perfil is not None:
+            perfil.db_ms += (time.perf_counter() - inicio) * 1000
+            perfil.consultas.append((sql, _lugar_de_llamada()))
+
+
+_render_original = Template.render
+
+
+def _render_medido(self, context=None, request=None):
+    perfil = _perfil_actual()
+    # Solo cuenta el render más externo; los include quedan dentro de su tiempo
+    if perfil is None or getattr(_local, 'renderizando', False):
+        return _render_original(self, context, request)
+    _local.renderizando = True
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        perfil.plantillas_ms += (time.perf_counter() - inicio) * 1000
+        _local.renderizando = False
+
+
+def _instrumentar_cache(perfil):
+    """Envuelve get/get_many de la caché de este hilo para contar aciertos y fallos."""
+    backend = caches['default']
+    get_original, get_many_original = backend.get, backend.get_many
+
+    def get(key, default=None, version=None):
+        valor = get_original(key, _fallo, version=version)
+        if valor is _fallo:
+            perfil.cache_fallos += 1
+            return default
+        perfil.cache_aciertos += 1
+        return valor
+
+    def get_many(keys, version=None):
+        keys = list(keys)
+        valores = get_many_original(keys, version=version)
+        perfil.cache_aciertos += len(valores)
+        perfil.cache_fallos += len(keys) - len(valores)
+        return valores
+
+    backend.get, backend.get_many = get, get_many
+
+    def restaurar():
+        del backend.get, backend.get_many
+    return restaurar
+
+
+# --- Resumen acumulado ---
+
+def _clave_vista(vista):
+    return f"perfilado:vista:{vista}"
+
+
+def _registrar_vista(vista):
+    """Agrega la vista al índice; False si ya hay MAX_VISTAS y no estaba."""
+    vistas = cache.get(CLAVE_VISTAS) or []
+    if vista in vistas:
+        return True
+    if len(vistas) >= MAX_VISTAS:
+        return False
+    # Solo se escribe al aparecer una vista nueva; si dos la agregan a la vez y una se
+    # pierde, la siguiente petición de esa vista la vuelve a agregar
+    cache.set(CLAVE_VISTAS, vistas + [vista], None)
+    return True
+
+
+def _acumular(vista, total_ms, perfil):
+    if not _registrar_vista(vista):
+        return
+    clave = _clave_vista(vista)
+    datos = cache.get(clave) or {
+        'peticiones': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0, 'consultas': 0,
+        'plantillas_ms': 0.0, 'cache_aciertos': 0, 'cache_fallos': 0, 'repetidas': {},
+    }
+    datos['peticiones'] += 1
+    datos['total_ms'] += total_ms
+    datos['max_ms'] = max(datos['max_ms'], total_ms)
+    datos['db_ms'] += perfil.db_ms
+    datos['consultas'] += len(perfil.consultas)
+    datos['plantillas_ms'] += perfil.plantillas_ms
+    datos['cache_aciertos'] += perfil.cache_aciertos
+    datos['cache_fallos'] += perfil.cache_fallos
+
+    for repetida in perfil.repetidas():
+        previa = datos['repetidas'].setdefault(repetida['sql'], {'veces': 0, 'lugares': {}})
+        previa['veces'] += repetida['veces']
+        for lugar, veces in repetida['lugares'].items():
+            previa['lugares'][lugar] = previa['lugares'].get(lugar, 0) + veces
+    datos['repetidas'] = dict(
+        sorted(datos['repetidas'].items(), key=lambda item: item[1]['veces'], reverse=True)[:MAX_REPETIDAS]
+    )
+    # Lectura y escritura no atómicas, pero por vista: solo dos peticiones simultáneas
+    # a la misma vista pueden pisarse una muestra, no las de todo el sitio
+    cache.set(clave, datos, None)
+
+
+def resumen():
+    """Estadísticas acumuladas por vista, de la más costosa en tiempo total a la menos."""
+    vistas = cache.get(CLAVE_VISTAS) or []
+    guardados = cache.get_many([_clave_vista(vista) for vista in vistas])
+    filas = []
+    for vista in vistas:
+        datos = guardados.get(_clave_vista(vista))
+        if datos is None:
+            continue
+        n = datos['peticiones']
+        filas.append({
+            'vista': vista,
+            **datos,
+            'media_ms': datos['total_ms'] / n,
+            'media_db_ms': datos['db_ms'] / n,
+            'media_consultas': datos['consultas'] / n,
+            'media_plantillas_ms': datos['plantillas_ms'] / n,
+            'repetidas': [{'sql': sql, **info} for sql, info in datos['repetidas'].items()],
+        })
+    return sorted(filas, key=lambda fila: fila['total_ms'], reverse=True)
+
+
+def reiniciar_resumen():
+    vistas = cache.get(CLAVE_VISTAS) or []
+    cache.delete_many([CLAVE_VISTAS] + [_clave_vista(vista) for vista in vistas])
+
+
+# --- Middleware ---
+
+def debe_perfilar(request):
+    token = getattr(settings, 'PERFILADO_TOKEN', None)
+    if token and constant_time_compare(request.META.get(CABECERA, ''), token):
+        return True
+    if hasattr(request, 'session') and request.session.get(SESION_PERFILADO):
+        return True
+    muestreo = getattr(settings, 'PERFILADO_MUESTREO', 0)
+    return muestreo > 0 and random.random() < muestreo
+
+
+def _server_timing(total_ms, perfil):
+    metricas = [
+        f'total;dur={total_ms:.1f}',
+        f'db;dur={perfil.db_ms:.1f};desc="{len(perfil.consultas)} consultas"',
+        f'tpl;dur={perfil.plantillas_ms:.1f}',
+        f'cache;desc="{perfil.cache_aciertos} aciertos, {perfil.cache_fallos} fallos"',
+    ]
+    repetidas = perfil.repetidas()
+    if repetidas:
+        metricas.append(f'dup;desc="{sum(r["veces"] for r in repetidas)} consultas repetidas"')
+    return ', '.join(metricas)
+
+
+class PerfiladoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if Template.render is not _render_medido:
+            Template.render = _render_medido
+
+    def __call__(self, request):
+        if not debe_perfilar(request):
+            return self.get_response(request)
+
+        perfil = Perfil()
+        _local.perfil = perfil
+        restaurar_cache = _instrumentar_cache(perfil)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(_medir_consulta))
+                response = self.get_response(request)
+        finally:
+            total_ms = (time.perf_counter() - inicio) * 1000
+            restaurar_cache()
+            _local.perfil = None
+
+        response['Server-Timing'] = _server_timing(total_ms, perfil)
+        coincidencia = getattr(request, 'resolver_match', None)
+        # Las rutas sin vista se agrupan: request.path haría crecer el resumen sin límite
+        vista = coincidencia.view_name if coincidencia else SIN_RUTA
+        _acumular(vista, total_ms, perfil)
+        return response